@@ -61,10 +61,13 @@ class SYNServiceManager {
         args: ['launcher.py'],
         cwd: mlBackendDir,
         port: 8001,
-        healthEndpoint: '/health',
+        // Answers as soon as the server accepts connections; the client
+        // checks /health/ready before relying on the models
+        healthEndpoint: '/health/live',
         env: {
           PYTHONUNBUFFERED: '1',
           ML_BACKEND_PORT: '8001',
+          ML_BACKEND_FAST_START: '1',
         },
       })
       this.isAvailable = true
@@ -97,9 +100,9 @@ class SYNServiceManager {
     return this.isAvailable && this.configs.size > 0
   }
 
-  private async isServiceRunning(port: number): Promise<boolean> {
+  private async isServiceRunning(config: ServiceConfig): Promise<boolean> {
     try {
-      const response = await fetch(`http://127.0.0.1:${port}/health`, {
+      const response = await fetch(`http://127.0.0.1:${config.port}${config.healthEndpoint}`, {
         method: 'GET',
         signal: AbortSignal.timeout(1000),
       })
@@ -110,15 +113,15 @@ class SYNServiceManager {
     }
   }
 
-  private async waitForService(port: number, maxAttempts = 30, serviceName = 'Service'): Promise<boolean> {
-    console.log(`[SYN] ${serviceName}: Waiting up to ${maxAttempts} seconds to start...`)
+  private async waitForService(config: ServiceConfig, maxAttempts = 30): Promise<boolean> {
+    console.log(`[SYN] ${config.name}: Waiting up to ${maxAttempts} seconds to start...`)
     for (let i = 0; i < maxAttempts; i++) {
-      if (await this.isServiceRunning(port)) {
+      if (await this.isServiceRunning(config)) {
         return true
       }
       // Log progress every 30 seconds for long-running services
       if ((i + 1) % 30 === 0) {
-        console.log(`[SYN] ${serviceName}: Still starting... (${i + 1}/${maxAttempts} seconds)`)
+        console.log(`[SYN] ${config.name}: Still starting... (${i + 1}/${maxAttempts} seconds)`)
       }
       await new Promise(resolve => setTimeout(resolve, 1000))
     }
@@ -131,7 +134,7 @@ class SYNServiceManager {
       return { name: serviceId, running: false, port: 0, error: 'Unknown service' }
     }
 
-    if (await this.isServiceRunning(config.port)) {
+    if (await this.isServiceRunning(config)) {
       console.log(`[SYN] ${config.name} is already running on port ${config.port}`)
       return { name: config.name, running: true, port: config.port }
     }
@@ -192,7 +195,7 @@ class SYNServiceManager {
 
       this.services.set(serviceId, child)
 
-      const isReady = await this.waitForService(config.port, maxWaitSeconds, config.name)
+      const isReady = await this.waitForService(config, maxWaitSeconds)
 
       if (isReady) {
         console.log(`[SYN] ✓ ${config.name} is ready on port ${config.port}`)
@@ -238,8 +241,9 @@ class SYNServiceManager {
 
     const results: ServiceStatus[] = []
 
-    // Start ML Backend with extended timeout (600s = 10 minutes for model loading)
-    // This runs asynchronously - app continues while model loads
+    // Start ML Backend with extended timeout (600s = 10 minutes, for a first-run
+    // dependency install). With fast start it answers within seconds and loads
+    // its models in the background; this runs asynchronously either way
     if (this.configs.has('ml-backend')) {
       console.log('[SYN] ML Backend: Starting with 600 second timeout (model loading may take several minutes)...')
       // Start ML Backend asynchronously so app doesn't block
@@ -302,7 +306,7 @@ class SYNServiceManager {
     const statuses: ServiceStatus[] = []
 
     for (const [id, config] of this.configs) {
-      const running = await this.isServiceRunning(config.port)
+      const running = await this.isServiceRunning(config)
       const child = this.services.get(id)
       statuses.push({
         name: config.name,
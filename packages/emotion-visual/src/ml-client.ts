@@ -12,6 +12,7 @@
  */
 
 const ML_BACKEND_URL = 'http://127.0.0.1:8001'
+const ML_BACKEND_WS_URL = ML_BACKEND_URL.replace(/^http/, 'ws')
 
 export interface EmotionResult {
   emotion: string
@@ -20,6 +21,24 @@ export interface EmotionResult {
   processing_time_ms: number
 }
 
+export interface EmotionBatchResult {
+  results: EmotionResult[]
+  processing_time_ms: number
+}
+
+export interface EmotionStreamEvent extends EmotionResult {
+  type: 'emotion'
+  index: number
+  text: string
+}
+
+export interface EmotionStream {
+  push: (token: string) => void
+  flush: () => void
+  reset: () => void
+  close: () => void
+}
+
 export interface PhonemeTimestamp {
   phoneme: string
   ipa: string
@@ -36,14 +55,81 @@ export interface PhonemeAlignment {
 
 export interface HealthStatus {
   status: string
-  device: string
+  device: string | null
   models_loaded: {
     emotion: boolean
     aligner: boolean
   }
+  model_states: Record<string, 'unloaded' | 'loading' | 'ready' | 'failed'>
+  load_times_ms: Record<string, number>
+  emotion_backend: 'torch' | 'torch-int8' | 'onnx' | 'onnx-int8' | null
   timestamp: string
 }
 
+export interface RequestOptions {
+  /** Abort the request, e.g. when the user interrupts the avatar */
+  signal?: AbortSignal
+  /** Give up after this many ms; the backend drops the work at the same deadline */
+  timeoutMs?: number
+  /** Receive the backend's per-stage timing for this request */
+  onTiming?: (timing: RequestTiming) => void
+}
+
+export interface RequestTiming {
+  /** Server-side ms per stage: queue, tokenize, forward, postprocess, serialize, total, ... */
+  stages: Record<string, number>
+  /** Client-measured ms from sending the request to receiving the response headers */
+  roundTripMs: number
+  /** roundTripMs minus the server's total: time spent in transport */
+  transportMs: number
+}
+
+/**
+ * Headers and abort signal for an inference request
+ * The timeout is sent as X-Deadline-Ms so the backend stops working on a
+ * request the client has already given up on
+ */
+function requestInit(options: RequestOptions = {}): { headers: Record<string, string>, signal?: AbortSignal } {
+  const headers: Record<string, string> = {}
+  const signals: AbortSignal[] = []
+  if (options.signal)
+    signals.push(options.signal)
+  if (options.timeoutMs !== undefined) {
+    headers['X-Deadline-Ms'] = String(Math.round(options.timeoutMs))
+    signals.push(AbortSignal.timeout(options.timeoutMs))
+  }
+  if (options.onTiming)
+    headers['X-Server-Timing'] = '1'
+  return {
+    headers,
+    signal: signals.length > 1 ? AbortSignal.any(signals) : signals[0],
+  }
+}
+
+/**
+ * Pass the response's Server-Timing breakdown to options.onTiming
+ */
+function reportTiming(response: Response, started: number, options: RequestOptions = {}) {
+  const header = response.headers.get('Server-Timing')
+  if (!options.onTiming || !header)
+    return
+
+  const stages: Record<string, number> = {}
+  for (const entry of header.split(',')) {
+    const [name, ...params] = entry.trim().split(';')
+    const duration = params.find(param => param.trim().startsWith('dur='))
+    if (name && duration)
+      stages[name] = Number(duration.trim().slice(4))
+  }
+
+  const roundTripMs = performance.now() - started
+  options.onTiming({
+    stages,
+    roundTripMs,
+    transportMs: roundTripMs - (stages.total ?? 0),
+  })
+}
+
 /**
  * Check if ML Backend service is healthy
  */
@@ -55,19 +141,46 @@ export async function checkHealth(): Promise<HealthStatus> {
   return response.json()
 }
 
+export interface ReadinessStatus {
+  ready: boolean
+  status: 'starting' | 'ready' | 'failed'
+  model_states: Record<string, 'unloaded' | 'loading' | 'ready' | 'failed'>
+  timestamp: string
+}
+
+/**
+ * Check if ML Backend has finished loading its models
+ * Resolves (rather than throwing) while the service is still starting
+ */
+export async function checkReadiness(): Promise<ReadinessStatus> {
+  const response = await fetch(`${ML_BACKEND_URL}/health/ready`)
+  if (!response.ok && response.status !== 503) {
+    throw new Error(`Readiness check failed: ${response.status}`)
+  }
+  return response.json()
+}
+
 /**
  * Detect emotion from text
  * Uses j-hartmann/emotion-english-distilroberta-base model
  * Returns 7 emotions: anger, disgust, fear, joy, neutral, sadness, surprise
  */
-export async function detectEmotion(text: string): Promise<EmotionResult> {
+export async function detectEmotion(
+  text: string,
+  options?: RequestOptions,
+): Promise<EmotionResult> {
+  const { headers, signal } = requestInit(options)
+  const started = performance.now()
   const response = await fetch(`${ML_BACKEND_URL}/emotion/detect`, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
+      ...headers,
     },
     body: JSON.stringify({ text }),
+    signal,
   })
+  reportTiming(response, started, options)
 
   if (!response.ok) {
     const error = await response.text()
@@ -77,24 +190,103 @@ export async function detectEmotion(text: string): Promise<EmotionResult> {
   return response.json()
 }
 
+/**
+ * Detect emotion for many texts in a single request
+ * Results are returned in the same order as the input texts
+ */
+export async function detectEmotionBatch(
+  texts: string[],
+  options?: RequestOptions,
+): Promise<EmotionBatchResult> {
+  const { headers, signal } = requestInit(options)
+  const started = performance.now()
+  const response = await fetch(`${ML_BACKEND_URL}/emotion/detect/batch`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      ...headers,
+    },
+    body: JSON.stringify({ texts }),
+    signal,
+  })
+  reportTiming(response, started, options)
+
+  if (!response.ok) {
+    const error = await response.text()
+    throw new Error(`Batch emotion detection failed: ${error}`)
+  }
+
+  return response.json()
+}
+
+/**
+ * Open a streaming emotion session
+ *
+ * Push LLM tokens as they arrive; the backend splits them into sentences /
+ * clauses and calls onEmotion for each completed chunk, in order.
+ * Call flush() at the end of a reply to classify any trailing text.
+ */
+export function openEmotionStream(
+  onEmotion: (event: EmotionStreamEvent) => void,
+  onError?: (detail: string) => void,
+): EmotionStream {
+  const socket = new WebSocket(`${ML_BACKEND_WS_URL}/emotion/stream`)
+  const pending: string[] = []
+
+  const send = (message: object) => {
+    const payload = JSON.stringify(message)
+    if (socket.readyState === WebSocket.OPEN)
+      socket.send(payload)
+    else
+      pending.push(payload)
+  }
+
+  socket.addEventListener('open', () => {
+    for (const payload of pending.splice(0))
+      socket.send(payload)
+  })
+
+  socket.addEventListener('message', (event) => {
+    const data = JSON.parse(event.data)
+    if (data.type === 'emotion')
+      onEmotion(data)
+    else if (data.type === 'error')
+      onError?.(data.detail)
+  })
+
+  return {
+    push: token => send({ type: 'token', text: token }),
+    flush: () => send({ type: 'flush' }),
+    reset: () => send({ type: 'reset' }),
+    close: () => socket.close(),
+  }
+}
+
 /**
  * Align phonemes to audio using Bournemouth Forced Aligner (BFA)
  *
  * @param text - The text transcript
  * @param audioPath - Path to audio file (temporary, accessible to backend)
+ * @param options - Abort signal, timeout (forwarded as a deadline) and/or timing callback
  * @returns Precise phoneme timestamps with IPA notation
  */
 export async function alignPhonemes(
   text: string,
   audioPath: string,
+  options?: RequestOptions,
 ): Promise<PhonemeAlignment> {
+  const { headers, signal } = requestInit(options)
+  const started = performance.now()
   const response = await fetch(`${ML_BACKEND_URL}/align/phonemes`, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
+      ...headers,
     },
     body: JSON.stringify({ text, audio_path: audioPath }),
+    signal,
   })
+  reportTiming(response, started, options)
 
   if (!response.ok) {
     const error = await response.text()
@@ -104,24 +296,128 @@ export async function alignPhonemes(
   return response.json()
 }
 
+/**
+ * Align phonemes to in-memory audio (no temp file)
+ *
+ * @param text - The text transcript
+ * @param audio - WAV/FLAC/OGG audio, or raw 16-bit PCM when sampleRate is given
+ * @param sampleRate - Sample rate of raw PCM audio
+ * @param options - Abort signal, timeout (forwarded as a deadline) and/or timing callback
+ * @returns Precise phoneme timestamps with IPA notation
+ */
+export async function alignPhonemesAudio(
+  text: string,
+  audio: Blob,
+  sampleRate?: number,
+  options?: RequestOptions,
+): Promise<PhonemeAlignment> {
+  const form = new FormData()
+  form.append('text', text)
+  form.append('audio', audio, 'audio')
+  if (sampleRate)
+    form.append('sample_rate', String(sampleRate))
+
+  const { headers, signal } = requestInit(options)
+  const started = performance.now()
+  const response = await fetch(`${ML_BACKEND_URL}/align/phonemes/upload`, {
+    method: 'POST',
+    headers,
+    body: form,
+    signal,
+  })
+  reportTiming(response, started, options)
+
+  if (!response.ok) {
+    const error = await response.text()
+    throw new Error(`Phoneme alignment failed: ${error}`)
+  }
+
+  return response.json()
+}
+
+export interface PhonemeStreamEvent extends PhonemeAlignment {
+  type: 'phonemes'
+  segment: number
+  text: string
+  offset_ms: number
+}
+
+export interface AlignmentStream {
+  pushAudio: (pcm: ArrayBuffer) => void
+  endSegment: (text: string) => void
+  end: () => void
+}
+
+/**
+ * Open a streaming phoneme alignment session
+ *
+ * Push raw 16-bit PCM as TTS produces it and call endSegment() with the text
+ * each finished chunk speaks. onPhonemes receives globally-timed phonemes
+ * per segment, so lip-sync can start before the utterance is complete.
+ */
+export function openAlignmentStream(
+  sampleRate: number,
+  transcript: string,
+  onPhonemes: (event: PhonemeStreamEvent) => void,
+  onError?: (detail: string) => void,
+): AlignmentStream {
+  const socket = new WebSocket(`${ML_BACKEND_WS_URL}/align/stream`)
+  socket.binaryType = 'arraybuffer'
+  const pending: Array<string | ArrayBuffer> = [
+    JSON.stringify({ type: 'start', sample_rate: sampleRate, text: transcript }),
+  ]
+
+  const send = (payload: string | ArrayBuffer) => {
+    if (socket.readyState === WebSocket.OPEN)
+      socket.send(payload)
+    else
+      pending.push(payload)
+  }
+
+  socket.addEventListener('open', () => {
+    for (const payload of pending.splice(0))
+      socket.send(payload)
+  })
+
+  socket.addEventListener('message', (event) => {
+    const data = JSON.parse(event.data)
+    if (data.type === 'phonemes')
+      onPhonemes(data)
+    else if (data.type === 'error')
+      onError?.(data.detail)
+  })
+
+  return {
+    pushAudio: pcm => send(pcm),
+    endSegment: text => send(JSON.stringify({ type: 'segment', text })),
+    end: () => send(JSON.stringify({ type: 'end' })),
+  }
+}
+
 /**
  * Wait for ML Backend service to be ready
- * Polls health endpoint until service responds
+ * Polls /health/live until the server answers, then /health/ready until
+ * the models have loaded (with fast start the server is up long before that)
  */
 export async function waitForService(maxRetries = 30, delayMs = 1000): Promise<void> {
   for (let i = 0; i < maxRetries; i++) {
+    let state = 'not responding'
     try {
-      const health = await checkHealth()
-      if (health.status === 'healthy') {
-        console.log('[ML Client] ✓ Service ready')
-        return
+      const live = await fetch(`${ML_BACKEND_URL}/health/live`)
+      if (live.ok) {
+        const readiness = await checkReadiness()
+        if (readiness.ready) {
+          console.log('[ML Client] ✓ Service ready')
+          return
+        }
+        state = readiness.status
       }
     }
     catch {
-      // Service not ready yet
+      // Service not up yet
     }
 
-    console.log(`[ML Client] Waiting for service... (${i + 1}/${maxRetries})`)
+    console.log(`[ML Client] Waiting for service (${state})... (${i + 1}/${maxRetries})`)
     await new Promise(resolve => setTimeout(resolve, delayMs))
   }
 
@@ -63,10 +63,11 @@ class ServiceManager {
         args: ['launcher.py'],
         cwd: mlBackendDir,
         port: 8001,
-        healthEndpoint: '/health',
+        healthEndpoint: '/health/live',
         env: {
           PYTHONUNBUFFERED: '1',
-          ML_BACKEND_PORT: '8001'
+          ML_BACKEND_PORT: '8001',
+          ML_BACKEND_FAST_START: '1'
         }
       })
     }
@@ -102,11 +103,11 @@ class ServiceManager {
   }
 
   /**
-   * Check if a service is already running on its port
+   * Check if a service is already running (its health endpoint answers)
    */
-  private async isServiceRunning(port: number): Promise<boolean> {
+  private async isServiceRunning(config: ServiceConfig): Promise<boolean> {
     try {
-      const response = await fetch(`http://127.0.0.1:${port}/health`, {
+      const response = await fetch(`http://127.0.0.1:${config.port}${config.healthEndpoint}`, {
         method: 'GET',
         signal: AbortSignal.timeout(1000)
       })
@@ -119,9 +120,9 @@ class ServiceManager {
   /**
    * Wait for a service to become healthy
    */
-  private async waitForService(port: number, maxAttempts = 30): Promise<boolean> {
+  private async waitForService(config: ServiceConfig, maxAttempts = 30): Promise<boolean> {
     for (let i = 0; i < maxAttempts; i++) {
-      if (await this.isServiceRunning(port)) {
+      if (await this.isServiceRunning(config)) {
         return true
       }
       await new Promise(resolve => setTimeout(resolve, 1000))
@@ -139,7 +140,7 @@ class ServiceManager {
     }
 
     // Check if already running
-    if (await this.isServiceRunning(config.port)) {
+    if (await this.isServiceRunning(config)) {
       console.log(`[ServiceManager] ${config.name} is already running on port ${config.port}`)
       return { name: config.name, running: true, port: config.port }
     }
@@ -185,7 +186,7 @@ class ServiceManager {
       this.services.set(serviceId, child)
 
       // Wait for service to be ready
-      const isReady = await this.waitForService(config.port)
+      const isReady = await this.waitForService(config)
       
       if (isReady) {
         console.log(`[ServiceManager] ✓ ${config.name} is ready on port ${config.port}`)
@@ -276,7 +277,7 @@ class ServiceManager {
     const statuses: ServiceStatus[] = []
     
     for (const [id, config] of this.configs) {
-      const running = await this.isServiceRunning(config.port)
+      const running = await this.isServiceRunning(config)
       const child = this.services.get(id)
       statuses.push({
         name: config.name,
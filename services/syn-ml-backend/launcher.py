@@ -5,13 +5,16 @@
 # This script is called by Tauri to start the ML backend service
 # It handles:
 # - Virtual environment activation
-# - Dependency checks
+# - Dependency checks (pip only runs when requirements.txt or the
+#   interpreter changed since the last successful install)
 # - Service startup with proper logging
 # - Graceful shutdown on SIGTERM
 #
 
 import os
 import sys
+import json
+import hashlib
 import subprocess
 import signal
 import argparse
@@ -22,6 +25,35 @@ SERVICE_DIR = Path(__file__).parent.absolute()
 VENV_DIR = SERVICE_DIR / "venv"
 SRC_DIR = SERVICE_DIR / "src"
 REQUIREMENTS_FILE = SERVICE_DIR / "requirements.txt"
+STAMP_FILE = VENV_DIR / ".requirements-stamp.json"
+
+# Run inside the venv: checks every requirement is installed (at the pinned
+# version, for == pins) using only importlib.metadata, so it works offline
+VERIFY_SCRIPT = r"""
+import re, sys
+from importlib import metadata
+
+problems = []
+for line in open(sys.argv[1], encoding="utf-8"):
+    line = line.split("#", 1)[0].strip()
+    if not line or line.startswith("-"):
+        continue
+    match = re.match(r"([A-Za-z0-9._-]+)(\[[^\]]*\])?\s*(==\s*([^\s;]+))?", line)
+    if not match:
+        continue
+    name, pinned = match.group(1), match.group(4)
+    try:
+        installed = metadata.version(name)
+    except metadata.PackageNotFoundError:
+        problems.append(f"{name}: not installed")
+        continue
+    if pinned and installed != pinned:
+        problems.append(f"{name}: {installed} installed, {pinned} required")
+
+for problem in problems:
+    print(problem)
+sys.exit(1 if problems else 0)
+"""
 
 
 def check_venv():
@@ -42,16 +74,88 @@ def check_venv():
     return python_exe, pip_exe
 
 
-def install_dependencies(pip_exe):
-    """Install required packages"""
-    print("Checking dependencies...")
+def venv_python_version():
+    """Interpreter version the venv was created with (from pyvenv.cfg)"""
+    cfg = VENV_DIR / "pyvenv.cfg"
+    if cfg.exists():
+        for line in cfg.read_text(encoding="utf-8").splitlines():
+            key, _, value = line.partition("=")
+            if key.strip() in ("version", "version_info"):
+                return value.strip()
+    return sys.version.split()[0]
+
+
+def requirements_fingerprint():
+    """Hash of requirements.txt plus the venv's interpreter version"""
+    digest = hashlib.sha256()
+    digest.update(REQUIREMENTS_FILE.read_bytes())
+    digest.update(venv_python_version().encode())
+    digest.update(sys.platform.encode())
+    return digest.hexdigest()
+
+
+def read_stamp():
+    try:
+        return json.loads(STAMP_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def write_stamp(fingerprint):
+    STAMP_FILE.write_text(
+        json.dumps({"fingerprint": fingerprint, "python": venv_python_version()}),
+        encoding="utf-8",
+    )
+
+
+def verify_dependencies(python_exe):
+    """Offline check that the venv satisfies requirements.txt"""
+    result = subprocess.run(
+        [str(python_exe), "-c", VERIFY_SCRIPT, str(REQUIREMENTS_FILE)],
+        capture_output=True,
+        text=True,
+    )
+    for line in result.stdout.splitlines():
+        print(f"  {line}")
+    return result.returncode == 0
+
+
+def install_dependencies(python_exe, pip_exe, force=False, verify=False):
+    """
+    Install required packages if requirements.txt (or the interpreter)
+    changed since the last install
+
+    A matching stamp skips pip entirely. Without one, the venv is checked
+    offline first, so an up-to-date venv (e.g. from install.sh) never needs
+    the network.
+    """
+    fingerprint = requirements_fingerprint()
+    stamp = read_stamp()
+
+    if not force and stamp and stamp.get("fingerprint") == fingerprint:
+        if not verify:
+            print("✓ Dependencies up to date")
+            return
+        if verify_dependencies(python_exe):
+            print("✓ Dependencies verified")
+            return
+        print("Installed packages don't match requirements.txt")
+    elif not force:
+        print("Checking dependencies...")
+        if verify_dependencies(python_exe):
+            write_stamp(fingerprint)
+            print("✓ Dependencies already installed")
+            return
+
+    print("Installing dependencies...")
     subprocess.run(
         [str(pip_exe), "install", "-r", str(REQUIREMENTS_FILE), "--quiet"], check=True
     )
+    write_stamp(fingerprint)
     print("✓ Dependencies installed")
 
 
-def start_service(python_exe, host, port):
+def start_service(python_exe, host, port, workers=1):
     """Start the FastAPI service"""
     print(f"Starting ML Backend Service on {host}:{port}...")
     print("=" * 60)
@@ -61,9 +165,8 @@ def start_service(python_exe, host, port):
     env["ML_BACKEND_PORT"] = str(port)
     env["PYTHONUNBUFFERED"] = "1"
 
-    # Start the service
-    process = subprocess.Popen(
-        [
+    if workers == 1:
+        command = [
             str(python_exe),
             "-m",
             "uvicorn",
@@ -74,7 +177,15 @@ def start_service(python_exe, host, port):
             str(port),
             "--log-level",
             "info",
-        ],
+        ]
+    else:
+        # Pre-forked workers sharing one copy of the model weights
+        env["ML_BACKEND_WORKERS"] = str(workers)
+        command = [str(python_exe), "prefork.py"]
+
+    # Start the service
+    process = subprocess.Popen(
+        command,
         cwd=SRC_DIR,
         env=env,
         stdout=subprocess.PIPE,
@@ -111,11 +222,28 @@ def main():
     parser = argparse.ArgumentParser(description="AI Assistant ML Backend Launcher")
     parser.add_argument("--host", default="127.0.0.1", help="Host to bind to")
     parser.add_argument("--port", type=int, default=8001, help="Port to bind to")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("ML_BACKEND_WORKERS", "1")),
+        help="Worker processes sharing the loaded models (0 = one per core)",
+    )
     parser.add_argument(
         "--setup-only",
         action="store_true",
         help="Only setup venv and deps, don't start",
     )
+    parser.add_argument(
+        "--reinstall",
+        action="store_true",
+        help="Run pip even if requirements.txt hasn't changed",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Check installed packages against requirements.txt (offline) "
+        "even if the stamp is current",
+    )
     args = parser.parse_args()
 
     print("=" * 60)
@@ -135,7 +263,9 @@ def main():
 
     # Install dependencies
     try:
-        install_dependencies(pip_exe)
+        install_dependencies(
+            python_exe, pip_exe, force=args.reinstall, verify=args.verify
+        )
     except subprocess.CalledProcessError as e:
         print(f"Error installing dependencies: {e}")
         sys.exit(1)
@@ -146,7 +276,7 @@ def main():
 
     # Start service
     try:
-        return_code = start_service(python_exe, args.host, args.port)
+        return_code = start_service(python_exe, args.host, args.port, args.workers)
         sys.exit(return_code)
     except Exception as e:
         print(f"Error starting service: {e}")
@@ -0,0 +1,601 @@
+#!/usr/bin/env python3
+#
+# ML Backend Service - Offline Benchmark
+#
+# Measures throughput, tail latency and memory under load, reproducibly and
+# without network access or the real models:
+#
+# - A tiny randomly initialised RoBERTa classifier (built once from a fixed
+#   seed) stands in for the emotion model, and a stand-in aligner doing a
+#   fixed amount of CPU work per second of audio stands in for BFA. The
+#   whole serving path (admission, micro-batching, tokenization, executors,
+#   audio decode) is the real one
+# - Open-loop load: requests arrive on a seeded Poisson schedule whatever
+#   the response times, and latency is measured from the scheduled arrival,
+#   so a slow server can't hide its queueing (no coordinated omission)
+# - Each concurrency level L offers L x --per-client-rps requests/second for
+#   --duration seconds after a --warmup that isn't recorded
+# - Runs in-process (httpx ASGI transport, lifespan included) and/or over
+#   loopback HTTP against a server subprocess
+#
+# Results go to stdout (or --output) as JSON: p50/p95/p99 latency, achieved
+# requests/second, errors by status and server RSS / threads per run.
+#
+# Usage:
+#   cd services/syn-ml-backend
+#   python scripts/benchmark.py
+#   python scripts/benchmark.py --mode http --workloads emotion,align \
+#       --levels 1,4,16 --duration 20 --output bench.json
+#
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(SERVICE_DIR, "src")
+
+SEED = 1234
+DEFAULT_MODEL_DIR = os.path.join(tempfile.gettempdir(), "syn-ml-bench-emotion-model")
+EMOTION_LABELS = ["anger", "disgust", "fear", "joy", "neutral", "sadness", "surprise"]
+ALIGN_SAMPLE_RATE = 16000
+
+# Fixed corpus: chat-sized interjections through paragraph-length replies
+EMOTION_CORPUS = [
+    "hi",
+    "ok",
+    "thanks!",
+    "wow",
+    "no way",
+    "I am so happy today!",
+    "This makes me really angry.",
+    "I'm scared of what happens next.",
+    "That is disgusting, please stop.",
+    "Oh! I did not expect that at all.",
+    "The weather is cloudy and it might rain later.",
+    "I went to the store and bought some bread and milk.",
+    "Honestly I don't know how I feel about this, it is a lot to take in.",
+    "You always do this and I'm tired of pretending it doesn't bother me.",
+    "What a wonderful surprise, I can't believe you remembered my birthday!",
+    "It was a long day at work, the meetings ran late and nothing got done, "
+    "but at least the commute home was quiet and I had time to think.",
+    "When I heard the news I just sat there for a while. I didn't cry, I "
+    "didn't call anyone, I just watched the light move across the floor "
+    "until it got dark and I realised I hadn't eaten anything all day.",
+    "Okay so here is the plan: we meet at the station at nine, grab coffee, "
+    "take the early train, and if everything goes well we should be at the "
+    "lake before lunch. Bring a jacket, it gets cold by the water, and don't "
+    "forget the charger this time because last trip was a disaster.",
+]
+
+# (transcript, seconds of audio)
+ALIGN_CORPUS = [
+    ("Hello there.", 1.0),
+    ("How are you doing today?", 1.6),
+    ("The quick brown fox jumps over the lazy dog.", 2.8),
+    ("I think we should leave before it gets dark outside.", 3.2),
+    ("Please remember to water the plants while I am away next week.", 4.0),
+]
+
+WORKLOADS = ("emotion", "emotion_batch", "align")
+BATCH_TEXTS = 16
+
+
+def build_tiny_emotion_model(model_dir: str) -> str:
+    """Create (once) a tiny seeded RoBERTa classifier with a word-level tokenizer"""
+    if os.path.exists(os.path.join(model_dir, "config.json")):
+        return model_dir
+
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors
+    from transformers import (
+        PreTrainedTokenizerFast,
+        RobertaConfig,
+        RobertaForSequenceClassification,
+    )
+
+    vocab = {"<s>": 0, "<pad>": 1, "</s>": 2, "<unk>": 3}
+    for text in EMOTION_CORPUS:
+        for word in text.lower().replace(",", " ").replace(".", " ").split():
+            vocab.setdefault(word, len(vocab))
+
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    tokenizer.normalizer = None
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="<s> $A </s>", special_tokens=[("<s>", 0), ("</s>", 2)]
+    )
+    fast = PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer,
+        bos_token="<s>",
+        eos_token="</s>",
+        pad_token="<pad>",
+        unk_token="<unk>",
+        model_max_length=512,
+    )
+
+    config = RobertaConfig(
+        vocab_size=len(vocab),
+        hidden_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        intermediate_size=128,
+        max_position_embeddings=520,
+        pad_token_id=1,
+        num_labels=len(EMOTION_LABELS),
+        id2label=dict(enumerate(EMOTION_LABELS)),
+        label2id={label: i for i, label in enumerate(EMOTION_LABELS)},
+    )
+    torch.manual_seed(SEED)
+    model = RobertaForSequenceClassification(config).eval()
+
+    os.makedirs(model_dir, exist_ok=True)
+    model.save_pretrained(model_dir)
+    fast.save_pretrained(model_dir)
+    return model_dir
+
+
+class StandInAligner:
+    """
+    Offline stand-in for PhonemeTimestampAligner
+
+    Does a fixed amount of torch work per second of audio (roughly the shape
+    of a CTC acoustic model) and returns evenly spaced BFA-style timestamps.
+    """
+
+    resampler_sample_rate = ALIGN_SAMPLE_RATE
+
+    def __init__(self, duration_max: int = 30):
+        import torch
+
+        self.duration_max = duration_max
+        generator = torch.Generator().manual_seed(SEED)
+        self._frame_weights = torch.randn(400, 256, generator=generator) / 20
+        self._layer_weights = torch.randn(256, 256, generator=generator) / 16
+
+    def load_audio(self, path: str):
+        from audio_io import decode_audio_bytes
+
+        with open(path, "rb") as f:
+            return decode_audio_bytes(f.read(), target_rate=ALIGN_SAMPLE_RATE)
+
+    def process_sentence(self, text, audio_wav, do_groups=True, debug=False):
+        import torch
+
+        samples = audio_wav.reshape(-1)
+        frames = samples[: samples.shape[0] // 400 * 400].reshape(-1, 400)
+        with torch.inference_mode():
+            hidden = torch.tanh(frames @ self._frame_weights)
+            for _ in range(8):
+                hidden = torch.tanh(hidden @ self._layer_weights)
+
+        duration_ms = samples.shape[0] / ALIGN_SAMPLE_RATE * 1000
+        words = text.split() or ["_"]
+        step = duration_ms / len(words)
+        return {
+            "segments": [
+                {
+                    "phoneme_ts": [
+                        {
+                            "phoneme_label": word[0].lower(),
+                            "start_ms": i * step,
+                            "end_ms": (i + 1) * step,
+                            "confidence": 0.9,
+                        }
+                        for i, word in enumerate(words)
+                    ],
+                    "words_ts": [
+                        {"word": word, "start_ms": i * step, "end_ms": (i + 1) * step}
+                        for i, word in enumerate(words)
+                    ],
+                }
+            ]
+        }
+
+
+def import_service(model_dir: str, cache: bool):
+    """Import main with the stand-in models wired in"""
+    # Settings the stand-ins need; anything else can be set in the environment
+    os.environ["ML_BACKEND_ALIGNER_PROCESSES"] = "0"
+    os.environ["ML_BACKEND_ALIGNER_WARMUP"] = "0"
+    os.environ.setdefault("ML_BACKEND_ALIGNER_STARTUP", "eager")
+    os.environ["ML_BACKEND_EMOTION_CACHE"] = "1" if cache else "0"
+    os.environ["ML_BACKEND_ALIGN_CACHE"] = "1" if cache else "0"
+    # Runs start cold, and the stand-in model must not reset the app's store
+    os.environ.setdefault("ML_BACKEND_EMOTION_CACHE_DB", "")
+    # Read at import, so the cache keys follow the stand-in; its ONNX export is temporary
+    os.environ["ML_BACKEND_EMOTION_MODEL_ID"] = build_tiny_emotion_model(model_dir)
+    os.environ.setdefault("ML_BACKEND_EMOTION_ONNX_DIR", "")
+
+    sys.path.insert(0, SRC_DIR)
+    import main
+
+    # Keep per-request logging out of the timings
+    logging.getLogger().setLevel(logging.WARNING)
+
+    main._load_aligner = lambda: StandInAligner(main.ALIGNER_DURATION_MAX_S)
+    return main
+
+
+def synth_pcm(seconds: float, seed: int) -> bytes:
+    """Deterministic 16-bit mono PCM: a few harmonics plus noise"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * ALIGN_SAMPLE_RATE)) / ALIGN_SAMPLE_RATE
+    wave = sum(0.1 / k * np.sin(2 * np.pi * 140 * k * t) for k in range(1, 4))
+    wave = wave + 0.01 * rng.standard_normal(t.shape[0])
+    return (np.clip(wave, -1, 1) * 32767).astype("<i2").tobytes()
+
+
+def build_requests(workload: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """The fixed request corpus for a workload, as (path, httpx kwargs)"""
+    if workload == "emotion":
+        return [("/emotion/detect", {"json": {"text": text}}) for text in EMOTION_CORPUS]
+
+    if workload == "emotion_batch":
+        rng = random.Random(SEED)
+        return [
+            ("/emotion/detect/batch", {"json": {"texts": rng.sample(EMOTION_CORPUS, BATCH_TEXTS)}})
+            for _ in range(8)
+        ]
+
+    if workload == "align":
+        return [
+            (
+                "/align/phonemes/raw",
+                {
+                    "params": {"text": text},
+                    "content": synth_pcm(seconds, SEED + i),
+                    "headers": {"X-Sample-Rate": str(ALIGN_SAMPLE_RATE)},
+                },
+            )
+            for i, (text, seconds) in enumerate(ALIGN_CORPUS)
+        ]
+
+    raise ValueError(f"Unknown workload: {workload}")
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(q / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """Unlabelled samples from a /metrics response"""
+    values = {}
+    for line in text.splitlines():
+        if line.startswith("#") or "{" in line:
+            continue
+        parts = line.split()
+        if len(parts) == 2:
+            values[parts[0]] = float(parts[1])
+    return values
+
+
+async def server_resources(client) -> Dict[str, Optional[float]]:
+    response = await client.get("/metrics")
+    values = parse_metrics(response.text)
+    return {
+        "rss_bytes": values.get("ml_backend_process_resident_memory_bytes"),
+        "threads": values.get("ml_backend_process_threads"),
+    }
+
+
+async def run_level(
+    client,
+    requests: List[Tuple[str, Dict[str, Any]]],
+    rate: float,
+    duration_s: float,
+    warmup_s: float,
+    timeout_s: float,
+) -> Dict[str, Any]:
+    """Offer `rate` requests/second on a Poisson schedule and collect latencies"""
+    loop = asyncio.get_running_loop()
+    rng = random.Random(SEED)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    in_flight = 0
+    peak_in_flight = 0
+    last_done = 0.0
+
+    async def one(path: str, kwargs: Dict[str, Any], scheduled: float, record: bool):
+        nonlocal in_flight, peak_in_flight, last_done
+        in_flight += 1
+        peak_in_flight = max(peak_in_flight, in_flight)
+        try:
+            response = await client.post(path, timeout=timeout_s, **kwargs)
+            status = str(response.status_code)
+        except Exception as e:
+            status = type(e).__name__
+        finally:
+            in_flight -= 1
+
+        if record:
+            last_done = loop.time()
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "200":
+                latencies.append(loop.time() - scheduled)
+
+    tasks = []
+    start = loop.time()
+    offset = 0.0
+    index = 0
+    while True:
+        offset += rng.expovariate(rate)
+        if offset >= warmup_s + duration_s:
+            break
+        delay = start + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        path, kwargs = requests[index % len(requests)]
+        index += 1
+        tasks.append(
+            asyncio.create_task(one(path, kwargs, start + offset, offset >= warmup_s))
+        )
+
+    # Rates are over the arrivals window; the tail after it is reported as
+    # drain time, so a backlog finishing late doesn't inflate or dilute them
+    window_end = start + warmup_s + duration_s
+    if window_end > loop.time():
+        await asyncio.sleep(window_end - loop.time())
+    arrivals_s = loop.time() - start - warmup_s
+
+    await asyncio.gather(*tasks)
+    drain_s = max(last_done - start - warmup_s - arrivals_s, 0.0)
+
+    latencies.sort()
+    completed = len(latencies)
+    requests_sent = sum(statuses.values())
+    ms = [value * 1000 for value in latencies]
+    return {
+        "offered_rps": rate,
+        "requests": requests_sent,
+        "completed": completed,
+        "errors": {status: count for status, count in statuses.items() if status != "200"},
+        "arrival_rps": requests_sent / arrivals_s if arrivals_s > 0 else None,
+        "achieved_rps": completed / arrivals_s if arrivals_s > 0 else None,
+        "drain_s": drain_s,
+        "peak_in_flight": peak_in_flight,
+        "latency_ms": {
+            "p50": percentile(ms, 50),
+            "p95": percentile(ms, 95),
+            "p99": percentile(ms, 99),
+            "max": ms[-1] if ms else None,
+            "mean": sum(ms) / completed if completed else None,
+        },
+    }
+
+
+async def run_suite(client, mode: str, args) -> List[Dict[str, Any]]:
+    runs = []
+    for workload in args.workloads:
+        requests = build_requests(workload)
+        for level in args.levels:
+            before = await server_resources(client)
+            result = await run_level(
+                client,
+                requests,
+                rate=level * args.per_client_rps,
+                duration_s=args.duration,
+                warmup_s=args.warmup,
+                timeout_s=args.timeout,
+            )
+            after = await server_resources(client)
+
+            run = {
+                "mode": mode,
+                "workload": workload,
+                "concurrency": level,
+                **result,
+                "rss_bytes_before": before["rss_bytes"],
+                "rss_bytes_after": after["rss_bytes"],
+                "threads": after["threads"],
+            }
+            runs.append(run)
+            print_run(run)
+    return runs
+
+
+def print_run(run: Dict[str, Any]):
+    latency = run["latency_ms"]
+
+    def fmt(value):
+        return f"{value:8.1f}" if value is not None else "       -"
+
+    rss = run["rss_bytes_after"]
+    print(
+        f"{run['mode']:10} {run['workload']:14} c={run['concurrency']:<4} "
+        f"offered={run['offered_rps']:7.1f}/s arrived={run['arrival_rps'] or 0:7.1f}/s "
+        f"achieved={run['achieved_rps'] or 0:7.1f}/s "
+        f"drain={run['drain_s']:5.1f}s "
+        f"p50={fmt(latency['p50'])} p95={fmt(latency['p95'])} p99={fmt(latency['p99'])} ms "
+        f"errors={sum(run['errors'].values())} "
+        f"rss={rss / 2**20 if rss else 0:.0f}MiB",
+        file=sys.stderr,
+    )
+
+
+async def run_in_process(args) -> List[Dict[str, Any]]:
+    import httpx
+
+    main = import_service(args.model_dir, args.cache)
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run_suite(client, "inprocess", args)
+
+
+async def run_http(args) -> List[Dict[str, Any]]:
+    import httpx
+
+    # Build the model before starting the clock on server startup
+    build_tiny_emotion_model(args.model_dir)
+
+    command = [
+        sys.executable,
+        os.path.abspath(__file__),
+        "--serve",
+        "--port",
+        str(args.port),
+        "--model-dir",
+        args.model_dir,
+    ]
+    if args.cache:
+        command.append("--cache")
+    server = subprocess.Popen(command)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+            deadline = time.monotonic() + 300
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError("Benchmark server exited during startup")
+                try:
+                    if (await client.get("/health/ready")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError("Benchmark server did not become ready")
+                await asyncio.sleep(0.2)
+
+            return await run_suite(client, "http", args)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def serve(args):
+    """Server side of --mode http"""
+    import uvicorn
+
+    main = import_service(args.model_dir, args.cache)
+    uvicorn.run(main.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def environment() -> Dict[str, Any]:
+    info = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    try:
+        info["git_commit"] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SERVICE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        info["git_commit"] = None
+    try:
+        import torch
+
+        info["torch"] = torch.__version__
+        info["torch_threads"] = torch.get_num_threads()
+    except ImportError:
+        pass
+    info["settings"] = {
+        key: value for key, value in sorted(os.environ.items()) if key.startswith("ML_BACKEND_")
+    }
+    return info
+
+
+def csv_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ML backend benchmark")
+    parser.add_argument(
+        "--mode", choices=["inprocess", "http", "both"], default="inprocess"
+    )
+    parser.add_argument(
+        "--workloads",
+        type=csv_list,
+        default=["emotion"],
+        help=f"Comma-separated: {', '.join(WORKLOADS)}",
+    )
+    parser.add_argument(
+        "--levels",
+        type=lambda value: [int(v) for v in csv_list(value)],
+        default=[1, 4, 16],
+        help="Concurrency levels (virtual clients)",
+    )
+    parser.add_argument(
+        "--per-client-rps",
+        type=float,
+        default=5.0,
+        help="Requests/second each virtual client offers (open loop)",
+    )
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds measured per run")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unrecorded seconds per run")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout")
+    parser.add_argument("--cache", action="store_true", help="Keep the result caches on")
+    parser.add_argument("--model-dir", default=DEFAULT_MODEL_DIR)
+    parser.add_argument("--port", type=int, default=8765, help="Server port for --mode http")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    for workload in args.workloads:
+        if workload not in WORKLOADS:
+            parser.error(f"Unknown workload: {workload}")
+
+    runs = []
+    if args.mode in ("inprocess", "both"):
+        runs += asyncio.run(run_in_process(args))
+    if args.mode in ("http", "both"):
+        runs += asyncio.run(run_http(args))
+
+    result = {
+        "environment": environment(),
+        "config": {
+            "workloads": args.workloads,
+            "levels": args.levels,
+            "per_client_rps": args.per_client_rps,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "cache": args.cache,
+            "seed": SEED,
+        },
+        "runs": runs,
+    }
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#
+# Admission control for inference endpoints
+#
+# Without a limit every request that arrives is started: a burst makes
+# memory grow with the number of requests in flight and pushes all of them
+# past their client timeouts at once. Each endpoint group gets a gate:
+#
+# - At most max_concurrent requests run; the rest wait in FIFO order
+# - At most max_queue requests wait; beyond that new ones are rejected
+# - A request whose estimated wait (queue position x average service time)
+#   exceeds max_wait_s is rejected on arrival instead of after waiting,
+#   and one that has waited max_wait_s gives up
+# - A request with a client deadline is held to it as well: it is rejected
+#   if its estimated wait exceeds the time it has left
+#
+# Rejections carry a retry-after estimate, so overload shows up as a fast,
+# explicit shed signal with bounded latency for the requests that do run.
+#
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+# Weight of the newest sample in the service time average
+SERVICE_TIME_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    """A request was shed by an admission gate"""
+
+    def __init__(self, gate: str, reason: str, retry_after: float):
+        super().__init__(f"{gate}: {reason}")
+        self.gate = gate
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """Concurrency and queue-depth limit for one group of endpoints"""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int,
+        max_queue: int,
+        max_wait_s: float,
+    ):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be >= 1")
+
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max(max_queue, 0)
+        self.max_wait_s = max_wait_s
+
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._service_time_s: Optional[float] = None
+
+        # Counters for diagnostics
+        self.admitted = 0
+        self.completed = 0
+        self.rejected_queue_full = 0
+        self.rejected_deadline = 0
+        self.timed_out = 0
+
+    def estimated_wait(self, position: Optional[int] = None) -> float:
+        """Expected wait for a request at a queue position, in seconds"""
+        if position is None:
+            position = len(self._waiters)
+        if self._service_time_s is None:
+            return 0.0
+        return self._service_time_s * (position + 1) / self.max_concurrent
+
+    def _retry_after(self) -> float:
+        return max(self.estimated_wait(), 1.0)
+
+    def _max_wait(self, budget_s: Optional[float]) -> float:
+        if budget_s is None:
+            return self.max_wait_s
+        return min(self.max_wait_s, max(budget_s, 0.0))
+
+    def check(self, budget_s: Optional[float] = None):
+        """
+        Raise Overloaded if a request arriving now would be shed on arrival
+
+        Takes no slot: lets a caller refuse a request before doing any of
+        its work (e.g. reading its body) and acquire only if it still needs to
+        """
+        if self.active < self.max_concurrent and not self._waiters:
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise Overloaded(self.name, "queue is full", self._retry_after())
+
+        if self.estimated_wait() > self._max_wait(budget_s):
+            self.rejected_deadline += 1
+            raise Overloaded(
+                self.name, "estimated wait exceeds deadline", self._retry_after()
+            )
+
+    async def acquire(self, budget_s: Optional[float] = None):
+        """
+        Wait for a slot, or raise Overloaded
+
+        budget_s is the time the caller has left before its own deadline
+        """
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        self.check(budget_s)
+        max_wait_s = self._max_wait(budget_s)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # Not wait_for: it can swallow a cancellation that races the
+            # slot being handed over
+            await asyncio.wait((waiter,), timeout=max_wait_s)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+        if not waiter.done():
+            self._abandon(waiter)
+            self.timed_out += 1
+            raise Overloaded(self.name, "timed out waiting", self._retry_after())
+
+        self.admitted += 1
+
+    def _abandon(self, waiter: asyncio.Future):
+        """Leave the queue; pass the slot on if it was already handed over"""
+        if waiter.done() and not waiter.cancelled():
+            self.release()
+            return
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, service_time_s: Optional[float] = None):
+        """Free a slot, handing it straight to the next waiter if any"""
+        if service_time_s is not None:
+            self.completed += 1
+            if self._service_time_s is None:
+                self._service_time_s = service_time_s
+            else:
+                self._service_time_s += SERVICE_TIME_ALPHA * (
+                    service_time_s - self._service_time_s
+                )
+
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # Slot moves over; active is unchanged
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block"""
+        await self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "max_wait_s": self.max_wait_s,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "completed": self.completed,
+            "rejected": {
+                "queue_full": self.rejected_queue_full,
+                "deadline": self.rejected_deadline,
+                "timed_out": self.timed_out,
+            },
+            "avg_service_ms": self._service_time_s * 1000
+            if self._service_time_s is not None
+            else None,
+        }
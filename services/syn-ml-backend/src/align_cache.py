@@ -0,0 +1,261 @@
+#
+# Alignment result cache
+#
+# The app replays canned lines and re-sends identical TTS audio for the
+# same text and voice. Each replay used to run the full aligner again;
+# cached results make repeated lines lip-sync with no model compute.
+#
+# Content-addressed: the key is a BLAKE2b hash of the decoded samples, the
+# sample rate, the normalized transcript and a namespace naming the aligner
+# (package version, preset, windowing), so a different aligner never serves
+# another's results.
+#
+# - Memory tier: bounded LRU of results
+# - Disk tier (optional): one JSON file per key under a directory, bounded
+#   by total size with least-recently-used eviction, so results survive
+#   restarts. Disk access is blocking; call those methods off the event loop.
+#   The directory is indexed on first use (or ensure_disk_index()), not when
+#   the cache is created, so importing the service doesn't walk it
+#
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Partly written files older than this are removed at startup
+STALE_TMP_S = 600.0
+
+# A result: {"phonemes": [...], "words": [...]} (plain JSON types)
+Result = Dict[str, Any]
+
+
+class AlignmentCache:
+    """Two-tier (memory LRU + optional disk) cache of alignment results"""
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = 256,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = 256 * 1024 * 1024,
+        enabled: bool = True,
+    ):
+        self.namespace = namespace
+        self.max_entries = max(max_entries, 0)
+        self.enabled = enabled and (self.max_entries > 0 or bool(disk_dir))
+        self.disk_dir = disk_dir if self.enabled else None
+        self.disk_max_bytes = disk_max_bytes
+
+        self._entries: "OrderedDict[str, Result]" = OrderedDict()
+        # key -> file size, least recently used first
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._indexed = not self.disk_dir
+        self._index_lock = threading.Lock()
+
+        # Counters for diagnostics
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self.disk_errors = 0
+
+    def key(self, text: str, samples: np.ndarray, sample_rate: int) -> str:
+        """Content hash of one alignment input (blocking for long audio)"""
+        digest = hashlib.blake2b(digest_size=20)
+        header = f"{self.namespace}\0{sample_rate}\0{' '.join(text.split())}\0"
+        digest.update(header.encode())
+        digest.update(np.ascontiguousarray(samples, dtype=np.float32).tobytes())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Result]:
+        """Memory tier lookup; doesn't count a miss (see get_disk)"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def get_disk(self, key: str) -> Optional[Result]:
+        """Disk tier lookup, promoting hits to memory (blocking)"""
+        if not self.enabled:
+            return None
+        self.ensure_disk_index()
+        if not self.disk_dir:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            known = key in self._disk_index
+        result = None
+        if known:
+            try:
+                with open(self._path(key)) as f:
+                    result = json.load(f)
+                os.utime(self._path(key))
+            except FileNotFoundError:
+                # Evicted by another worker process
+                self._remove_disk(key)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Alignment cache: dropping unreadable entry {key}: {e}")
+                self._remove_disk(key)
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            if key in self._disk_index:
+                self._disk_index.move_to_end(key)
+            self.disk_hits += 1
+        self._put_memory(key, result)
+        return result
+
+    def put(self, key: str, result: Result):
+        """Store in memory (call put_disk as well for the disk tier)"""
+        if self.enabled:
+            self._put_memory(key, result)
+
+    def put_disk(self, key: str, result: Result):
+        """Write a result to the disk tier, evicting old ones (blocking)"""
+        self.ensure_disk_index()
+        if not self.disk_dir:
+            return
+
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump(result, f, separators=(",", ":"))
+            os.replace(tmp, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            with self._lock:
+                self.disk_errors += 1
+            logger.warning(f"Alignment cache: could not write {path}: {e}")
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return
+
+        evicted = []
+        with self._lock:
+            self._disk_bytes += size - self._disk_index.pop(key, 0)
+            self._disk_index[key] = size
+            while self._disk_bytes > self.disk_max_bytes and len(self._disk_index) > 1:
+                old_key, old_size = self._disk_index.popitem(last=False)
+                self._disk_bytes -= old_size
+                self.disk_evictions += 1
+                evicted.append(old_key)
+
+        for old_key in evicted:
+            try:
+                os.unlink(self._path(old_key))
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _put_memory(self, key: str, result: Result):
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _remove_disk(self, key: str):
+        with self._lock:
+            self._disk_bytes -= self._disk_index.pop(key, 0)
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+    def ensure_disk_index(self):
+        """Index the disk tier if that hasn't happened yet (blocking)"""
+        if self._indexed:
+            return
+        with self._index_lock:
+            if not self._indexed:
+                self._load_disk_index()
+                self._indexed = True
+
+    def _load_disk_index(self):
+        """Index existing entries, oldest use first (blocking)"""
+        entries = []
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            for root, _, files in os.walk(self.disk_dir):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if name.endswith(".tmp"):
+                        # Left behind by a crash mid-write (not one in progress)
+                        if time.time() - os.stat(path).st_mtime > STALE_TMP_S:
+                            os.unlink(path)
+                        continue
+                    if name.endswith(".json"):
+                        stat = os.stat(path)
+                        entries.append((stat.st_mtime, name[:-5], stat.st_size))
+        except OSError as e:
+            logger.warning(f"Alignment cache: disk tier disabled ({self.disk_dir}: {e})")
+            self.disk_dir = None
+            return
+
+        with self._lock:
+            for _, key, size in sorted(entries):
+                self._disk_index[key] = size
+                self._disk_bytes += size
+        logger.info(
+            f"Alignment cache: {len(entries)} entries "
+            f"({self._disk_bytes / 2**20:.1f} MiB) on disk in {self.disk_dir}"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "disk": {
+                    "dir": self.disk_dir,
+                    "indexed": self._indexed,
+                    "entries": len(self._disk_index),
+                    "bytes": self._disk_bytes,
+                    "max_bytes": self.disk_max_bytes,
+                    "evictions": self.disk_evictions,
+                    "errors": self.disk_errors,
+                }
+                if self.disk_dir
+                else None,
+            }
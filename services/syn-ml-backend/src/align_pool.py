@@ -0,0 +1,348 @@
+#
+# Alignment process pool
+#
+# BFA alignment on CPU is heavy numeric work. Run in the server process it
+# competes with request handling and emotion inference for the GIL and
+# cores, and a crash inside it takes the whole service down. This pool
+# runs each aligner in its own process instead:
+#
+# - One PhonemeTimestampAligner per worker process (spawned, not forked,
+#   so no torch / CUDA state is inherited)
+# - Jobs wait in a bounded queue; when it is full, submissions fail fast
+#   with AlignerBusy and a retry-after estimate instead of piling up
+# - A job that runs past its timeout gets its worker killed and restarted
+# - A worker that dies only fails its own job; it is restarted in the
+#   background
+#
+
+import asyncio
+import contextvars
+import logging
+import multiprocessing
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WORKER_START_TIMEOUT_S = 300.0
+RESTART_BACKOFF_S = 5.0
+
+# Called with (seconds queued, seconds running) for each completed job, in the
+# context of the caller that submitted it
+JobHook = Callable[[float, float], None]
+
+
+class AlignerBusy(Exception):
+    """The job queue is full"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Alignment queue is full")
+        self.retry_after = retry_after
+
+
+class AlignerTimeout(Exception):
+    """A job ran past the per-job timeout (its worker was restarted)"""
+
+
+class AlignerCrashed(Exception):
+    """The worker process died while running a job"""
+
+
+def _worker_main(conn, config: Dict[str, Any]):
+    """Worker process: build an aligner, then serve jobs until told to stop"""
+    try:
+        import torch
+        from bournemouth_aligner import PhonemeTimestampAligner
+
+        if config.get("threads"):
+            torch.set_num_threads(config["threads"])
+
+        aligner = PhonemeTimestampAligner(
+            preset=config["preset"],
+            device=config["device"],
+            duration_max=config["duration_max"],
+        )
+        sample_rate = getattr(aligner, "resampler_sample_rate", 16000)
+
+        if config.get("warmup"):
+            t = torch.arange(sample_rate, dtype=torch.float32) / sample_rate
+            clip = (0.1 * torch.sin(2 * torch.pi * 220 * t)).unsqueeze(0)
+            aligner.process_sentence(text="hello", audio_wav=clip, do_groups=True, debug=False)
+    except Exception as e:
+        conn.send(("failed", f"{type(e).__name__}: {e}"))
+        return
+
+    conn.send(("ready", sample_rate))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+
+        text, samples = message
+        try:
+            wav = torch.from_numpy(samples).unsqueeze(0)
+            result = aligner.process_sentence(
+                text=text, audio_wav=wav, do_groups=True, debug=False
+            )
+            conn.send(("ok", result))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    """One aligner process and the parent's end of its pipe"""
+
+    def __init__(self, index: int, config: Dict[str, Any]):
+        self.index = index
+        self.config = config
+        self.process = None
+        self.conn = None
+        self.sample_rate: Optional[int] = None
+
+    def start(self):
+        """Spawn the process and wait until its aligner is loaded (blocking)"""
+        context = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, self.config),
+            name=f"aligner-{self.index}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+
+        if not self.conn.poll(WORKER_START_TIMEOUT_S):
+            self.kill()
+            raise RuntimeError(f"aligner-{self.index} did not start in time")
+        try:
+            status, value = self.conn.recv()
+        except EOFError:
+            self.kill()
+            raise RuntimeError(f"aligner-{self.index} exited during startup")
+        if status != "ready":
+            self.kill()
+            raise RuntimeError(value)
+        self.sample_rate = value
+
+    def call(self, text: str, samples: np.ndarray) -> Any:
+        """Run one job on the worker (blocking)"""
+        try:
+            self.conn.send((text, samples))
+            status, value = self.conn.recv()
+        except (EOFError, OSError):
+            raise AlignerCrashed(f"aligner-{self.index} exited")
+        if status == "error":
+            raise RuntimeError(value)
+        return value
+
+    def kill(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=5)
+        if self.conn is not None:
+            self.conn.close()
+        self.conn = None
+
+    def stop(self):
+        """Ask the worker to exit, killing it if it doesn't (blocking)"""
+        if self.conn is not None:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        if self.process is not None:
+            self.process.join(timeout=5)
+        self.kill()
+
+
+class AlignerProcessPool:
+    """Runs BFA alignment jobs on a pool of worker processes"""
+
+    def __init__(
+        self,
+        processes: int,
+        queue_limit: int = 8,
+        job_timeout_s: float = 120.0,
+        preset: str = "en-us",
+        device: str = "cpu",
+        duration_max: int = 30,
+        warmup: bool = True,
+        threads_per_process: Optional[int] = None,
+        on_job: Optional[JobHook] = None,
+    ):
+        if processes < 1:
+            raise ValueError("processes must be >= 1")
+
+        self.processes = processes
+        self.queue_limit = queue_limit
+        self.job_timeout_s = job_timeout_s
+        self.sample_rate: Optional[int] = None
+        self.on_job = on_job
+
+        config = {
+            "preset": preset,
+            "device": device,
+            "duration_max": duration_max,
+            "warmup": warmup,
+            "threads": threads_per_process,
+        }
+        self._workers = [_Worker(i, config) for i in range(processes)]
+        self._queue: Optional[asyncio.Queue] = None
+        self._dispatchers: List[asyncio.Task] = []
+
+        # Counters for diagnostics
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self.busy = 0
+        self._job_time_s = 0.0
+
+    async def start(self):
+        """Start all workers; fails only if none of them could start"""
+        results = await asyncio.gather(
+            *[asyncio.to_thread(worker.start) for worker in self._workers],
+            return_exceptions=True,
+        )
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if len(errors) == len(self._workers):
+            raise RuntimeError(f"No aligner process started: {errors[0]}")
+        for error in errors:
+            logger.error(f"Aligner process failed to start: {error}")
+
+        self.sample_rate = next(w.sample_rate for w in self._workers if w.sample_rate)
+        self._queue = asyncio.Queue(maxsize=self.queue_limit)
+        self._dispatchers = [
+            asyncio.create_task(self._dispatch(worker), name=f"aligner-{worker.index}")
+            for worker in self._workers
+        ]
+        logger.info(
+            f"Aligner pool: {self.processes - len(errors)}/{self.processes} processes, "
+            f"queue limit {self.queue_limit}, job timeout {self.job_timeout_s:.0f}s"
+        )
+
+    async def stop(self):
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._dispatchers = []
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, _, future, _, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Aligner pool stopped"))
+
+        await asyncio.gather(
+            *[asyncio.to_thread(worker.stop) for worker in self._workers]
+        )
+
+    def retry_after(self) -> float:
+        """Rough time until a queued job would start, in seconds"""
+        average = self._job_time_s / self.completed if self.completed else 1.0
+        backlog = (self._queue.qsize() if self._queue else 0) + self.busy
+        return max(average * backlog / self.processes, 1.0)
+
+    def check_capacity(self):
+        """Raise AlignerBusy if a new job would be rejected"""
+        if self._queue is None:
+            raise RuntimeError("Aligner pool is not running")
+        if self._queue.full():
+            self.rejected += 1
+            raise AlignerBusy(self.retry_after())
+
+    async def align(self, text: str, samples: np.ndarray, wait: bool = False) -> Any:
+        """
+        Align mono float32 samples (at sample_rate) against text
+
+        With wait=False a full queue raises AlignerBusy; with wait=True the
+        job waits for a free slot (for follow-up jobs of an admitted request,
+        such as the windows of a long recording).
+        """
+        future = asyncio.get_running_loop().create_future()
+        job = (text, samples, future, time.monotonic(), contextvars.copy_context())
+        if wait:
+            await self._queue.put(job)
+        else:
+            self.check_capacity()
+            self._queue.put_nowait(job)
+        return await future
+
+    async def _dispatch(self, worker: _Worker):
+        """Feed queued jobs to one worker, restarting it when it fails"""
+        while True:
+            if worker.conn is None:
+                await self._restart(worker)
+
+            text, samples, future, queued_at, context = await self._queue.get()
+            if future.done():  # Caller went away
+                continue
+
+            self.busy += 1
+            start = time.monotonic()
+            try:
+                result = await asyncio.wait_for(
+                    asyncio.to_thread(worker.call, text, samples), self.job_timeout_s
+                )
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                self.failed += 1
+                await asyncio.to_thread(worker.kill)
+                if not future.done():
+                    future.set_exception(
+                        AlignerTimeout(f"Alignment timed out after {self.job_timeout_s:.0f}s")
+                    )
+                continue
+            except Exception as e:
+                self.failed += 1
+                if isinstance(e, AlignerCrashed):
+                    await asyncio.to_thread(worker.kill)
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            finally:
+                self.busy -= 1
+
+            self.completed += 1
+            run_time = time.monotonic() - start
+            self._job_time_s += run_time
+            if self.on_job is not None:
+                context.run(self.on_job, start - queued_at, run_time)
+            if not future.done():
+                future.set_result(result)
+
+    async def _restart(self, worker: _Worker):
+        while True:
+            try:
+                self.restarts += 1
+                await asyncio.to_thread(worker.start)
+                logger.info(f"aligner-{worker.index} restarted")
+                return
+            except Exception as e:
+                logger.error(f"aligner-{worker.index} restart failed: {e}")
+                await asyncio.sleep(RESTART_BACKOFF_S)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "processes": self.processes,
+            "alive": sum(
+                1 for w in self._workers if w.process is not None and w.process.is_alive()
+            ),
+            "busy": self.busy,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "queue_limit": self.queue_limit,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+        }
@@ -0,0 +1,104 @@
+#
+# Streaming phoneme alignment session state
+#
+# TTS produces audio a sentence or clause at a time. Instead of waiting for
+# the whole utterance, the client pushes raw PCM as it is synthesized and
+# marks each finished region with the text it speaks. Every marked region
+# is aligned on its own and its timestamps are shifted by the region's
+# offset, so lip-sync can start after the first chunk.
+#
+# Audio that was never marked is aligned at the end of the stream against
+# whatever part of the session transcript has not been consumed yet.
+#
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+PCM_SAMPLE_WIDTHS = {"s16": 2, "f32": 4}
+
+
+@dataclass
+class AudioRegion:
+    """A span of buffered audio paired with the text it speaks"""
+
+    index: int
+    text: str
+    data: bytes
+    offset_ms: float
+
+
+class AlignmentStreamSession:
+    """Buffers streamed PCM and cuts it into text-labelled regions"""
+
+    def __init__(
+        self,
+        sample_rate: int,
+        channels: int = 1,
+        sample_format: str = "s16",
+        transcript: str = "",
+        max_buffer_s: float = 60.0,
+    ):
+        if sample_rate <= 0:
+            raise ValueError("sample_rate must be positive")
+        if channels <= 0:
+            raise ValueError("channels must be positive")
+        if sample_format not in PCM_SAMPLE_WIDTHS:
+            raise ValueError(f"Unsupported sample format: {sample_format}")
+
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self.frame_size = PCM_SAMPLE_WIDTHS[sample_format] * channels
+        self.max_buffer_bytes = int(max_buffer_s * sample_rate) * self.frame_size
+
+        self._transcript_words: List[str] = transcript.split()
+        self._consumed_words = 0
+
+        self._buffer = bytearray()
+        self._committed_frames = 0
+        self._next_index = 0
+
+    @property
+    def buffered_ms(self) -> float:
+        return self._frames_to_ms(len(self._buffer) // self.frame_size)
+
+    @property
+    def remaining_text(self) -> str:
+        return " ".join(self._transcript_words[self._consumed_words :])
+
+    def append(self, data: bytes):
+        """Add a chunk of raw PCM"""
+        if len(self._buffer) + len(data) > self.max_buffer_bytes:
+            raise ValueError("Unmarked audio exceeds the session buffer limit")
+        self._buffer.extend(data)
+
+    def commit(self, text: str) -> Optional[AudioRegion]:
+        """Cut all buffered audio into a region that speaks `text`"""
+        text = text.strip()
+        frames = len(self._buffer) // self.frame_size
+        if not text or frames == 0:
+            return None
+
+        # Keep any trailing partial frame for the next region
+        size = frames * self.frame_size
+        region = AudioRegion(
+            index=self._next_index,
+            text=text,
+            data=bytes(self._buffer[:size]),
+            offset_ms=self._frames_to_ms(self._committed_frames),
+        )
+        del self._buffer[:size]
+
+        self._committed_frames += frames
+        self._next_index += 1
+        self._consumed_words = min(
+            self._consumed_words + len(text.split()), len(self._transcript_words)
+        )
+        return region
+
+    def finish(self) -> Optional[AudioRegion]:
+        """Cut remaining audio against the unconsumed transcript"""
+        return self.commit(self.remaining_text)
+
+    def _frames_to_ms(self, frames: int) -> float:
+        return frames * 1000.0 / self.sample_rate
@@ -0,0 +1,154 @@
+#
+# In-memory audio decoding
+#
+# Lets TTS output be aligned straight from the bytes it was produced as,
+# instead of writing a temp file that BFA then re-reads from disk.
+#
+# Supported inputs:
+# - Containers soundfile can read (WAV, FLAC, OGG)
+# - Raw PCM (16-bit int or 32-bit float), which needs the sample rate
+#   supplied out of band. It is little-endian, except audio/L16, which is
+#   big-endian per RFC 2586 unless the content type says otherwise
+#
+# Output matches PhonemeTimestampAligner.load_audio: a mono float32 tensor
+# of shape (1, samples) at the aligner's sample rate.
+#
+# soundfile/torch/torchaudio are imported on first use so importing this
+# module doesn't slow down server startup.
+#
+
+import io
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import torch
+
+ALIGNER_SAMPLE_RATE = 16000
+
+CONTAINER_TYPES = {
+    "audio/wav",
+    "audio/x-wav",
+    "audio/wave",
+    "audio/vnd.wave",
+    "audio/flac",
+    "audio/x-flac",
+    "audio/ogg",
+}
+CONTAINER_MAGIC = (b"RIFF", b"fLaC", b"OggS")
+
+
+class AudioDecodeError(ValueError):
+    """Audio bytes couldn't be decoded"""
+
+
+PCM_FORMATS = {
+    "s16": ("i2", 32768.0),
+    "f32": ("f4", 1.0),
+}
+
+# Byte order per RFC 2586 for audio/L16; raw bodies otherwise default to
+# little-endian, which is what TTS engines and sound cards produce
+BIG_ENDIAN_TYPES = {"audio/l16"}
+ENDIANNESS = {"big-endian": ">", "big": ">", "little-endian": "<", "little": "<"}
+
+
+def parse_content_type(content_type: Optional[str]) -> tuple:
+    """Split 'audio/L16; rate=24000; channels=1' into (mime, params)"""
+    if not content_type:
+        return "", {}
+    parts = [p.strip() for p in content_type.split(";")]
+    params = {}
+    for part in parts[1:]:
+        if "=" in part:
+            key, value = part.split("=", 1)
+            params[key.strip().lower()] = value.strip()
+    return parts[0].lower(), params
+
+
+def is_container(data: bytes, mime: str = "") -> bool:
+    return mime in CONTAINER_TYPES or data[:4] in CONTAINER_MAGIC
+
+
+def decode_audio_bytes(
+    data: bytes,
+    content_type: Optional[str] = None,
+    sample_rate: Optional[int] = None,
+    channels: Optional[int] = None,
+    sample_format: str = "s16",
+    target_rate: int = ALIGNER_SAMPLE_RATE,
+) -> "torch.Tensor":
+    """
+    Decode audio bytes to a mono float32 tensor of shape (1, samples)
+
+    Raises AudioDecodeError if the bytes can't be decoded.
+    """
+    import soundfile as sf
+    import torch
+    import torchaudio
+
+    if not data:
+        raise AudioDecodeError("Empty audio")
+
+    mime, params = parse_content_type(content_type)
+
+    if is_container(data, mime):
+        try:
+            samples, source_rate = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+        except Exception as e:
+            raise AudioDecodeError(f"Could not decode audio: {e}")
+        mono = samples.mean(axis=1)
+    else:
+        source_rate = sample_rate if sample_rate is not None else _int_param(params, "rate")
+        if source_rate is None:
+            raise AudioDecodeError("Raw PCM audio needs a sample rate")
+        if source_rate <= 0:
+            raise AudioDecodeError(f"Invalid sample rate: {source_rate}")
+        if channels is None:
+            channels = _int_param(params, "channels") or 1
+        if channels <= 0:
+            raise AudioDecodeError(f"Invalid channel count: {channels}")
+
+        if sample_format not in PCM_FORMATS:
+            raise AudioDecodeError(f"Unsupported sample format: {sample_format}")
+        if mime in BIG_ENDIAN_TYPES and sample_format != "s16":
+            raise AudioDecodeError(f"{mime} is 16-bit PCM, not {sample_format}")
+        dtype, scale = PCM_FORMATS[sample_format]
+        dtype = _byte_order(mime, params) + dtype
+
+        width = np.dtype(dtype).itemsize * channels
+        if len(data) % width != 0:
+            raise AudioDecodeError(
+                f"PCM length {len(data)} is not a multiple of the frame size {width}"
+            )
+
+        samples = np.frombuffer(data, dtype=dtype).astype(np.float32) / scale
+        mono = samples.reshape(-1, channels).mean(axis=1)
+
+    wav = torch.from_numpy(np.ascontiguousarray(mono, dtype=np.float32)).unsqueeze(0)
+
+    if source_rate != target_rate:
+        wav = torchaudio.functional.resample(wav, int(source_rate), target_rate)
+
+    return wav
+
+
+def _byte_order(mime: str, params: dict) -> str:
+    """numpy byte order prefix for raw PCM of this content type"""
+    endianness = params.get("endianness")
+    if endianness is not None:
+        if endianness.lower() not in ENDIANNESS:
+            raise AudioDecodeError(f"Invalid endianness in content type: {endianness}")
+        return ENDIANNESS[endianness.lower()]
+    return ">" if mime in BIG_ENDIAN_TYPES else "<"
+
+
+def _int_param(params: dict, key: str) -> Optional[int]:
+    value = params.get(key)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise AudioDecodeError(f"Invalid {key} in content type: {value}")
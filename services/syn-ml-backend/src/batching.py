@@ -0,0 +1,224 @@
+#
+# Micro-batching scheduler
+#
+# Collects requests that arrive within a short window into a single batch
+# so the model runs one padded forward pass instead of one pass per request.
+#
+# A batch is dispatched as soon as either:
+# - max_batch_size items are queued, or
+# - max_wait_ms has elapsed since the first item of the batch arrived
+#
+# With max_in_flight > 1 the next batch is collected and dispatched while
+# the previous one is still running, so a batch function with several
+# stages (e.g. tokenize, then forward pass) can overlap them.
+#
+# Items whose callers went away (their future was cancelled) are dropped
+# before a batch starts, and a running batch whose callers have all gone is
+# cancelled, so later stages of its batch function never run.
+#
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+BatchFn = Callable[[List[Any]], Awaitable[List[Any]]]
+# Called with each dispatched item's time in the queue, in seconds
+DispatchHook = Callable[[List[float]], None]
+
+
+class MicroBatcher:
+    """Groups concurrent submissions into batches for one batch function"""
+
+    def __init__(
+        self,
+        batch_fn: BatchFn,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        name: str = "batcher",
+        max_in_flight: int = 1,
+        on_dispatch: Optional[DispatchHook] = None,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be >= 1")
+
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0.0) / 1000
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.on_dispatch = on_dispatch
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+        # Counters for diagnostics
+        self.batches_run = 0
+        self.items_run = 0
+        self.largest_batch = 0
+        self.items_dropped = 0
+        self.batches_abandoned = 0
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def start(self):
+        """Start the dispatch loop (must be called from a running event loop)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._worker = asyncio.create_task(self._run(), name=f"{self.name}-worker")
+        logger.info(
+            f"{self.name}: started (max_batch_size={self.max_batch_size}, "
+            f"max_wait_ms={self.max_wait * 1000:.1f}, "
+            f"max_in_flight={self.max_in_flight})"
+        )
+
+    async def stop(self):
+        """Stop the dispatch loop and fail anything still queued"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        for task in list(self._in_flight):
+            task.cancel()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError(f"{self.name} stopped"))
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its individual result"""
+        if not self.running:
+            raise RuntimeError(f"{self.name} is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches_run,
+            "items": self.items_run,
+            "avg_batch_size": self.items_run / self.batches_run
+            if self.batches_run
+            else 0.0,
+            "largest_batch": self.largest_batch,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": len(self._in_flight),
+            "items_dropped": self.items_dropped,
+            "batches_abandoned": self.batches_abandoned,
+        }
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future, float]]:
+        """Wait for the first item, then gather more until full or timed out"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            # Items keep queueing while every slot is busy, so the next
+            # batch is larger under load
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+
+            # Callers that went away don't need a forward pass
+            live = [entry for entry in batch if not entry[1].done()]
+            self.items_dropped += len(batch) - len(live)
+            batch = [(item, future) for item, future, _ in live]
+            if not batch:
+                self._slots.release()
+                continue
+
+            if self.on_dispatch is not None:
+                now = time.perf_counter()
+                self.on_dispatch([now - enqueued for _, _, enqueued in live])
+
+            task = asyncio.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._dispatch_done)
+
+    def _dispatch_done(self, task: asyncio.Task):
+        self._in_flight.discard(task)
+        self._slots.release()
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        items = [item for item, _ in batch]
+        work = asyncio.ensure_future(self.batch_fn(items))
+        abandoned = False
+
+        def caller_gone(_):
+            nonlocal abandoned
+            if not work.done() and all(future.done() for _, future in batch):
+                abandoned = True
+                work.cancel()
+
+        for _, future in batch:
+            future.add_done_callback(caller_gone)
+
+        try:
+            results = await work
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"{self.name}: batch returned {len(results)} results "
+                    f"for {len(items)} items"
+                )
+        except asyncio.CancelledError:
+            if abandoned:
+                self.batches_abandoned += 1
+                return
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError(f"{self.name} stopped"))
+            raise
+        except Exception as e:
+            logger.error(f"{self.name}: batch of {len(items)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches_run += 1
+        self.items_run += len(items)
+        self.largest_batch = max(self.largest_batch, len(items))
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,208 @@
+#
+# Request deadlines and client disconnects
+#
+# When the app gives up on a request (its timeout fired, or the user
+# interrupted the avatar) the backend used to keep going and throw the
+# result away. This ASGI middleware ties each HTTP request's work to the
+# client:
+#
+# - Clients may send `X-Deadline-Ms: <n>`, the milliseconds they will wait.
+#   The deadline is available to handlers through remaining()
+# - Once the deadline passes, or the client disconnects, the handler task is
+#   cancelled. Cancellation propagates through the awaits: queued jobs
+#   (admission queue, micro-batcher, worker pools, aligner processes) are
+#   dropped before they start, and a batch whose callers have all gone is
+#   abandoned between stages
+# - The disconnect is listened for from the start, so it is noticed even
+#   when the handler has no body to read or hasn't got to it yet
+# - An expired request gets 504; a disconnected one gets no response
+#
+# A response that has already started is always allowed to finish.
+#
+
+import asyncio
+import contextvars
+import json
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = b"x-deadline-ms"
+
+# Request body read ahead of the handler while listening for a disconnect
+READ_AHEAD_BYTES = 64 * 1024
+
+# Monotonic deadline of the request being handled, if the client sent one
+request_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+# Requests cut short, for /stats
+_counters = {"deadline_exceeded": 0, "disconnected": 0}
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline (None = no deadline)"""
+    deadline = request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def _parse_budget_ms(scope: Dict[str, Any]) -> Optional[float]:
+    for name, value in scope.get("headers", []):
+        if name == DEADLINE_HEADER:
+            try:
+                return float(value)
+            except ValueError:
+                return None
+    return None
+
+
+class _RequestReader:
+    """
+    Sole reader of a request's receive channel, so a disconnect is seen
+    even while the handler isn't reading (no body, or one it hasn't got to)
+
+    Body messages are passed on to the handler in order. At most
+    READ_AHEAD_BYTES are read ahead of it; past that the rest of the body
+    is left to the server's flow control, so a request waiting for
+    admission doesn't buffer its whole upload.
+    """
+
+    def __init__(self, receive, read_ahead: Optional[int] = None):
+        self._receive = receive
+        self._read_ahead = READ_AHEAD_BYTES if read_ahead is None else read_ahead
+        self._messages: Deque[Dict[str, Any]] = deque()
+        self._buffered = 0
+        self._body_done = False
+        self._changed = asyncio.Condition()
+        self.disconnected = asyncio.Event()
+
+    async def pump(self):
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(
+                    lambda: self._body_done or self._buffered < self._read_ahead
+                )
+
+            message = await self._receive()
+            async with self._changed:
+                if message["type"] == "http.disconnect":
+                    self.disconnected.set()
+                    self._changed.notify_all()
+                    return
+                if message["type"] == "http.request" and not self._body_done:
+                    self._body_done = not message.get("more_body", False)
+                    self._buffered += len(message.get("body", b""))
+                    self._messages.append(message)
+                    self._changed.notify_all()
+
+    async def receive(self) -> Dict[str, Any]:
+        async with self._changed:
+            await self._changed.wait_for(
+                lambda: self._messages or self.disconnected.is_set()
+            )
+            if not self._messages:
+                return {"type": "http.disconnect"}
+            message = self._messages.popleft()
+            self._buffered -= len(message.get("body", b""))
+            self._changed.notify_all()
+            return message
+
+
+class DeadlineMiddleware:
+    """Cancels HTTP handlers whose deadline passed or whose client went away"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget_ms = _parse_budget_ms(scope)
+        if budget_ms is not None and budget_ms <= 0:
+            _counters["deadline_exceeded"] += 1
+            await _send_expired(send)
+            return
+
+        deadline = time.monotonic() + budget_ms / 1000 if budget_ms is not None else None
+
+        reader = _RequestReader(receive)
+        response_started = False
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        token = request_deadline.set(deadline)
+        try:
+            handler = asyncio.ensure_future(self.app(scope, reader.receive, send_wrapper))
+        finally:
+            request_deadline.reset(token)
+
+        watcher = asyncio.ensure_future(reader.pump())
+        gone = asyncio.ensure_future(reader.disconnected.wait())
+        try:
+            timeout = max(deadline - time.monotonic(), 0.0) if deadline is not None else None
+            done, _ = await asyncio.wait(
+                {handler, gone}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+
+            # Finished, or already responding: let it complete
+            if handler in done or response_started:
+                try:
+                    await handler
+                except Exception:
+                    # e.g. the client left while the body was being read
+                    if not reader.disconnected.is_set():
+                        raise
+                    _counters["disconnected"] += 1
+                return
+
+            handler.cancel()
+            try:
+                await handler
+            except asyncio.CancelledError:
+                pass
+
+            if reader.disconnected.is_set():
+                _counters["disconnected"] += 1
+                logger.info(f"{scope['path']}: client disconnected, work cancelled")
+                return
+
+            _counters["deadline_exceeded"] += 1
+            logger.info(f"{scope['path']}: deadline exceeded, work cancelled")
+            if not response_started:
+                await _send_expired(send)
+        finally:
+            watcher.cancel()
+            gone.cancel()
+            if not handler.done():
+                handler.cancel()
+
+
+async def _send_expired(send):
+    body = json.dumps({"detail": "Deadline exceeded"}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def stats() -> Dict[str, int]:
+    return dict(_counters)
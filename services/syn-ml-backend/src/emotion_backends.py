@@ -0,0 +1,187 @@
+#
+# Emotion model inference backends
+#
+# All backends return a transformers text-classification pipeline, so the
+# batching and response code doesn't care which one is running:
+#
+# - torch       PyTorch weights (default; uses CUDA when available)
+# - torch-int8  PyTorch with Linear layers dynamically quantized to int8
+#               (CPU only, no extra dependencies)
+# - onnx        ONNX Runtime graph exported with optimum
+# - onnx-int8   ONNX Runtime graph with dynamic int8 quantization
+#
+# The ONNX backends need `optimum[onnxruntime]`. The export is written to
+# ONNX_DIR (if set) and reused on later startups, since exporting takes
+# longer than loading. If the dependency is missing the loader falls back
+# to torch and reports the backend it actually used.
+#
+# onnx-int8 quantizes for the CPU it runs on: arm64 kernels on Apple
+# Silicon and other ARM machines, AVX-512 VNNI or AVX-512 where the CPU has
+# them, and AVX2 otherwise.
+#
+
+import logging
+import os
+import platform
+import subprocess
+import sys
+from typing import Any, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+EMOTION_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+ONNX_FILE = "model.onnx"
+ONNX_INT8_FILE = "model_quantized.onnx"
+
+
+def load_emotion_pipeline(
+    backend: str,
+    model_id: str,
+    device: str,
+    onnx_dir: Optional[str] = None,
+) -> Tuple[Any, str]:
+    """
+    Build the emotion pipeline for a backend (blocking)
+
+    Returns (pipeline, backend actually used).
+    """
+    if backend not in EMOTION_BACKENDS:
+        raise ValueError(
+            f"Unknown emotion backend '{backend}' (expected one of {', '.join(EMOTION_BACKENDS)})"
+        )
+
+    if backend.startswith("onnx"):
+        try:
+            return _load_onnx(model_id, device, onnx_dir, quantize=backend == "onnx-int8"), backend
+        except ImportError as e:
+            logger.warning(f"{backend} backend unavailable ({e}); falling back to torch")
+            backend = "torch"
+
+    if backend == "torch-int8":
+        return _load_torch_int8(model_id, device), backend
+
+    return _load_torch(model_id, device), backend
+
+
+def _load_torch(model_id: str, device: str):
+    from transformers import pipeline
+
+    return pipeline(
+        "text-classification",
+        model=model_id,
+        device=0 if device == "cuda" else -1,
+        top_k=None,
+    )
+
+
+def _load_torch_int8(model_id: str, device: str):
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+    if device != "cpu":
+        logger.warning("torch-int8 runs on CPU only; ignoring device " + device)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = AutoModelForSequenceClassification.from_pretrained(model_id).eval()
+    model = torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+    return pipeline(
+        "text-classification", model=model, tokenizer=tokenizer, device=-1, top_k=None
+    )
+
+
+def _load_onnx(model_id: str, device: str, onnx_dir: Optional[str], quantize: bool):
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    from transformers import AutoTokenizer, pipeline
+
+    provider = "CPUExecutionProvider"
+    if device == "cuda" and not quantize:
+        if "CUDAExecutionProvider" in onnxruntime.get_available_providers():
+            provider = "CUDAExecutionProvider"
+
+    file_name = ONNX_INT8_FILE if quantize else ONNX_FILE
+
+    if onnx_dir and os.path.exists(os.path.join(onnx_dir, file_name)):
+        logger.info(f"Loading exported ONNX model from {onnx_dir}")
+        model = ORTModelForSequenceClassification.from_pretrained(
+            onnx_dir, file_name=file_name, provider=provider
+        )
+        tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+    else:
+        model, tokenizer = _export_onnx(model_id, onnx_dir, quantize, provider)
+
+    return pipeline(
+        "text-classification", model=model, tokenizer=tokenizer, top_k=None
+    )
+
+
+def _export_onnx(model_id: str, onnx_dir: Optional[str], quantize: bool, provider: str):
+    """Export (and optionally quantize) the model, saving it for next time"""
+    import tempfile
+
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    logger.info(f"Exporting {model_id} to ONNX (one-time)")
+    save_dir = onnx_dir or tempfile.mkdtemp(prefix="emotion-onnx-")
+
+    model = ORTModelForSequenceClassification.from_pretrained(model_id, export=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model.save_pretrained(save_dir)
+    tokenizer.save_pretrained(save_dir)
+
+    if quantize:
+        quantizer = ORTQuantizer.from_pretrained(model)
+        target = quantization_target(platform.machine(), _cpu_flags())
+        logger.info(f"Quantizing ONNX model for {target}")
+        config = getattr(AutoQuantizationConfig, target)(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=save_dir, quantization_config=config)
+        return (
+            ORTModelForSequenceClassification.from_pretrained(
+                save_dir, file_name=ONNX_INT8_FILE, provider=provider
+            ),
+            tokenizer,
+        )
+
+    if provider != "CPUExecutionProvider":
+        model = ORTModelForSequenceClassification.from_pretrained(
+            save_dir, file_name=ONNX_FILE, provider=provider
+        )
+    return model, tokenizer
+
+
+def quantization_target(machine: str, cpu_flags: Set[str]) -> str:
+    """The AutoQuantizationConfig preset for a CPU architecture and its flags"""
+    if machine.lower() in ("arm64", "aarch64", "armv8l"):
+        return "arm64"
+    if "avx512_vnni" in cpu_flags or "avx512vnni" in cpu_flags:
+        return "avx512_vnni"
+    if "avx512f" in cpu_flags:
+        return "avx512"
+    return "avx2"
+
+
+def _cpu_flags() -> Set[str]:
+    """Lower-case CPU feature flags, or an empty set if they can't be read"""
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/cpuinfo") as f:
+                for line in f:
+                    if line.startswith("flags"):
+                        return set(line.split(":", 1)[1].lower().split())
+        elif sys.platform == "darwin":
+            out = subprocess.run(
+                ["sysctl", "-n", "machdep.cpu.features", "machdep.cpu.leaf7_features"],
+                capture_output=True,
+                text=True,
+                timeout=5,
+            ).stdout
+            return set(out.lower().split())
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return set()
@@ -0,0 +1,152 @@
+#
+# Emotion result cache
+#
+# The avatar re-sends the same short texts (greetings, filler phrases,
+# retried sentences) over and over. Caching their scores skips the forward
+# pass entirely.
+#
+# Bounded LRU keyed on (model id, normalized text), with TTL expiry.
+#
+# An optional EmotionStore sits behind the LRU and keeps results across
+# restarts: memory misses are looked up there and hits promoted to memory.
+# The store has no TTL; it is emptied when the model version changes.
+# Store lookups are blocking: handlers call get_memory() inline and
+# get_stored() off the event loop, once for all of a request's misses.
+#
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from emotion_store import EmotionStore
+
+CacheKey = Tuple[str, str]
+
+
+class EmotionCache:
+    """Thread-safe LRU cache of emotion scores with size and TTL eviction"""
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl_s: float = 3600.0,
+        enabled: bool = True,
+        store: Optional[EmotionStore] = None,
+    ):
+        self.max_entries = max(max_entries, 0)
+        self.ttl_s = ttl_s
+        self.enabled = enabled and self.max_entries > 0
+        self.store = store if self.enabled else None
+
+        self._entries: "OrderedDict[CacheKey, Tuple[float, List[Dict[str, Any]]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapse whitespace so trivially different strings share an entry"""
+        return " ".join(text.split())
+
+    def get(self, model_id: str, text: str) -> Optional[List[Dict[str, Any]]]:
+        """Return cached scores, or None on miss / expiry / disabled (blocking)"""
+        results = self.get_memory(model_id, text)
+        if results is None:
+            results = self.get_stored(model_id, [text])[0]
+        return results
+
+    def get_memory(self, model_id: str, text: str) -> Optional[List[Dict[str, Any]]]:
+        """Memory lookup; doesn't count a miss (see get_stored)"""
+        if not self.enabled:
+            return None
+
+        key = (model_id, self.normalize(text))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, results = entry
+            if self.ttl_s <= 0 or now - stored_at <= self.ttl_s:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return results
+            del self._entries[key]
+            self.expirations += 1
+            return None
+
+    def get_stored(
+        self, model_id: str, texts: List[str]
+    ) -> List[Optional[List[Dict[str, Any]]]]:
+        """
+        Look memory misses up in the store, in one query, promoting hits to
+        memory (blocking)
+        """
+        if not self.enabled:
+            return [None] * len(texts)
+
+        normalized = [self.normalize(text) for text in texts]
+        found = self.store.get_many(normalized) if self.store is not None else {}
+        now = time.monotonic()
+
+        results = []
+        with self._lock:
+            for text in normalized:
+                scores = found.get(text)
+                if scores is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self.store_hits += 1
+                    self._insert((model_id, text), (now, scores))
+                results.append(scores)
+        return results
+
+    def put(self, model_id: str, text: str, results: List[Dict[str, Any]]):
+        if not self.enabled:
+            return
+
+        key = (model_id, self.normalize(text))
+        entry = (time.monotonic(), [dict(r) for r in results])
+
+        with self._lock:
+            self._insert(key, entry)
+        if self.store is not None:
+            self.store.put(key[1], entry[1])
+
+    def _insert(self, key: CacheKey, entry: Tuple[float, List[Dict[str, Any]]]):
+        # Caller holds the lock
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "store_hits": self.store_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "store": self.store.stats() if self.store is not None else None,
+            }
@@ -0,0 +1,311 @@
+#
+# Persistent emotion result store
+#
+# The in-memory emotion cache starts empty every time the sidecar starts,
+# which is every app launch. This SQLite store keeps results across
+# restarts, behind the memory cache:
+#
+# - Entries are keyed by normalized text and belong to one model version
+#   (model id, revision, backend, max length, truncation). Opening the store
+#   for a different version deletes everything stored for the old one
+# - Size-bounded: when the data outgrows max_bytes the least recently used
+#   entries are deleted
+# - Lookups are primary-key reads on a memory-mapped WAL database (one
+#   `IN (...)` query for many texts). They can still wait on the disk, so
+#   callers run them off the event loop. Inserts and last-used updates are
+#   queued to a writer thread and committed in batches, so no request waits
+#   on a disk write. The queue is bounded: when the disk can't keep up,
+#   writes are dropped (and counted) rather than held in memory
+#
+# Several worker processes can share one file (SQLite locking, WAL mode),
+# but each needs its own connections and writer thread: neither survives
+# fork(), and SQLite's lock bookkeeping goes wrong in a child that inherits
+# an open connection. Close the store before forking and call ensure_open()
+# in each child. A store left open across a fork does nothing in the child.
+#
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Connections inherited across fork() are kept referenced, never used or
+# closed in the child
+_inherited: List[Any] = []
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS emotions (
+    text TEXT PRIMARY KEY,
+    results TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS emotions_last_used ON emotions (last_used);
+"""
+
+MMAP_BYTES = 64 * 1024 * 1024
+WRITE_BATCH = 256
+# Texts per lookup query (SQLite's default limit on bound parameters is 999)
+READ_BATCH = 500
+# Writes waiting for the writer thread; more than this are dropped
+MAX_PENDING_WRITES = 4096
+# Trim to this fraction of max_bytes, so eviction doesn't run on every insert
+EVICT_TO = 0.9
+
+Results = List[Dict[str, Any]]
+
+
+class EmotionStore:
+    """SQLite-backed emotion scores for one model version"""
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version: Optional[str] = None
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._writes: "queue.Queue[Optional[Tuple[str, Any]]]" = queue.Queue(
+            MAX_PENDING_WRITES
+        )
+        self._writer: Optional[threading.Thread] = None
+
+        # Counters for diagnostics
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+        self.dropped = 0
+        self.entries = 0
+        self.bytes = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._conn is not None and self._pid == os.getpid()
+
+    def open(self, version: str):
+        """Open for a model version, dropping other versions' entries (blocking)"""
+        self.close()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        with conn:
+            conn.executescript(SCHEMA)
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != version:
+                dropped = conn.execute("DELETE FROM emotions").rowcount
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                    (version,),
+                )
+                if row is not None:
+                    logger.info(
+                        f"Emotion store: model changed ({row[0]} -> {version}), "
+                        f"dropped {dropped} entries"
+                    )
+            self.entries, self.bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM emotions"
+            ).fetchone()
+
+        self._conn = conn
+        self._pid = os.getpid()
+        self.version = version
+        self._writer = threading.Thread(
+            target=self._write_loop, args=(self._connect(),), name="emotion-store", daemon=True
+        )
+        self._writer.start()
+        logger.info(
+            f"Emotion store: {self.entries} entries ({self.bytes / 2**20:.1f} MiB) in {self.path}"
+        )
+
+    def ensure_open(self):
+        """Open again in a forked child for the last opened version (blocking)"""
+        if self.version is None or self.ready:
+            return
+        if self._conn is not None:
+            self._forget_parent()
+            logger.warning("Emotion store was still open at fork; disabled in this process")
+            return
+        self.open(self.version)
+
+    def _forget_parent(self):
+        """Drop the state a fork copied from the parent, without using it"""
+        if self._conn is not None:
+            _inherited.append(self._conn)
+        # The parent's writer thread doesn't exist here, and its queue and
+        # lock may have been mid-operation when the process forked
+        self._conn = None
+        self._writer = None
+        self._lock = threading.Lock()
+        self._writes = queue.Queue(MAX_PENDING_WRITES)
+        # Disabled here for good: a new connection would share SQLite's
+        # lock bookkeeping with the inherited one
+        self.version = None
+
+    def close(self):
+        """Flush pending writes and close (blocking)"""
+        if self._conn is not None and self._pid != os.getpid():
+            self._forget_parent()
+        if self._writer is not None:
+            self._writes.put(None)
+            self._writer.join()
+            self._writer = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def get(self, text: str) -> Optional[Results]:
+        """Stored scores for a normalized text, or None (blocking)"""
+        return self.get_many([text]).get(text)
+
+    def get_many(self, texts: List[str]) -> Dict[str, Results]:
+        """Stored scores for those of the normalized texts that have them (blocking)"""
+        if not self.ready or not texts:
+            return {}
+        unique = list(dict.fromkeys(texts))
+        rows = []
+        try:
+            with self._lock:
+                for offset in range(0, len(unique), READ_BATCH):
+                    chunk = unique[offset : offset + READ_BATCH]
+                    rows.extend(
+                        self._conn.execute(
+                            "SELECT text, results FROM emotions WHERE text IN "
+                            f"({', '.join('?' * len(chunk))})",
+                            chunk,
+                        ).fetchall()
+                    )
+        except sqlite3.Error as e:
+            with self._lock:
+                self.errors += 1
+            logger.warning(f"Emotion store read failed: {e}")
+            return {}
+
+        found = {text: json.loads(results) for text, results in rows}
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        now = time.time()
+        for text in found:
+            self._queue_write(("touch", (text, now)))
+        return found
+
+    def put(self, text: str, results: Results):
+        """Queue scores to be stored"""
+        if self.ready:
+            self._queue_write(("put", (text, json.dumps(results, separators=(",", ":")))))
+
+    def _queue_write(self, op: Tuple[str, Any]):
+        try:
+            self._writes.put_nowait(op)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Wait until queued writes are committed (blocking)"""
+        if self.ready:
+            done = threading.Event()
+            self._writes.put(("flush", done))
+            done.wait()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+        return conn
+
+    def _write_loop(self, conn: sqlite3.Connection):
+        """Writer thread: commit queued operations in batches"""
+        try:
+            while True:
+                batch = [self._writes.get()]
+                while len(batch) < WRITE_BATCH:
+                    try:
+                        batch.append(self._writes.get_nowait())
+                    except queue.Empty:
+                        break
+
+                stop = None in batch
+                flushes = [arg for op, arg in filter(None, batch) if op == "flush"]
+                try:
+                    self._apply(conn, [op for op in batch if op and op[0] != "flush"])
+                except sqlite3.Error as e:
+                    self.errors += 1
+                    logger.warning(f"Emotion store write failed: {e}")
+                for done in flushes:
+                    done.set()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _apply(self, conn: sqlite3.Connection, ops: List[Tuple[str, Any]]):
+        if not ops:
+            return
+        now = time.time()
+        with conn:
+            for op, arg in ops:
+                if op == "put":
+                    text, payload = arg
+                    size = len(text.encode()) + len(payload)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO emotions (text, results, size, last_used) "
+                        "VALUES (?, ?, ?, ?)",
+                        (text, payload, size, now),
+                    )
+                    self.writes += 1
+                elif op == "touch":
+                    conn.execute("UPDATE emotions SET last_used = ? WHERE text = ?", (arg[1], arg[0]))
+
+            # Other workers write to the same file: recount rather than track
+            self.entries, self.bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM emotions"
+            ).fetchone()
+            if self.bytes > self.max_bytes:
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Delete least recently used entries down to EVICT_TO x max_bytes"""
+        target = self.max_bytes * EVICT_TO
+        excess = self.bytes
+        victims = []
+        for rowid, size in conn.execute("SELECT rowid, size FROM emotions ORDER BY last_used, rowid"):
+            if excess <= target:
+                break
+            excess -= size
+            victims.append((rowid,))
+        conn.executemany("DELETE FROM emotions WHERE rowid = ?", victims)
+        self.evictions += len(victims)
+        self.entries -= len(victims)
+        self.bytes = excess
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "version": self.version,
+            "entries": self.entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "pending": self._writes.qsize(),
+        }
@@ -0,0 +1,134 @@
+#
+# Inference executors
+#
+# Model calls (transformers pipeline, BFA load_audio / process_sentence) are
+# blocking. Running them directly in an `async def` handler freezes the event
+# loop, so /health and every other request stall behind a long alignment.
+#
+# Each model gets its own bounded thread pool so a slow alignment can't
+# starve emotion inference and vice versa. Jobs run in the caller's context
+# (as with asyncio.to_thread), so context variables such as the request's
+# stage timings reach the worker thread.
+#
+
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, ContextManager, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Called with (pool name, seconds a job waited for a worker), on the worker
+# thread in the caller's context
+WaitHook = Callable[[str, float], None]
+# Called with the pool name on the worker thread; the job runs inside the
+# context manager it returns (e.g. a profiler)
+JobHook = Callable[[str], ContextManager]
+
+
+class _Pool:
+    """A thread pool plus in-flight counters"""
+
+    def __init__(
+        self,
+        name: str,
+        workers: int,
+        on_wait: Optional[WaitHook] = None,
+        around_job: Optional[JobHook] = None,
+    ):
+        self.name = name
+        self.workers = workers
+        self.on_wait = on_wait
+        self.around_job = around_job
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"{name}-inference"
+        )
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+
+    def wrap(self, fn: Callable[[], Any]) -> Callable[[], Any]:
+        submitted = time.perf_counter()
+
+        def run():
+            with self.lock:
+                self.queued -= 1
+                self.active += 1
+            try:
+                if self.on_wait is not None:
+                    self.on_wait(self.name, time.perf_counter() - submitted)
+                if self.around_job is not None:
+                    with self.around_job(self.name):
+                        return fn()
+                return fn()
+            finally:
+                with self.lock:
+                    self.active -= 1
+                    self.completed += 1
+
+        return run
+
+
+class InferenceExecutor:
+    """Runs blocking model calls on a dedicated worker pool per model"""
+
+    def __init__(
+        self,
+        workers: Dict[str, int],
+        on_wait: Optional[WaitHook] = None,
+        around_job: Optional[JobHook] = None,
+    ):
+        self._pools: Dict[str, _Pool] = {}
+        for name, count in workers.items():
+            if count < 1:
+                raise ValueError(f"{name}: worker count must be >= 1")
+            self._pools[name] = _Pool(name, count, on_wait, around_job)
+
+        logger.info(
+            "Inference executor ready: "
+            + ", ".join(f"{name}={count}" for name, count in workers.items())
+        )
+
+    async def run(self, model: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the pool for `model` and await the result"""
+        pool = self._pools[model]
+        call = pool.wrap(functools.partial(fn, *args, **kwargs))
+
+        with pool.lock:
+            pool.queued += 1
+        try:
+            future = pool.executor.submit(contextvars.copy_context().run, call)
+        except Exception:
+            with pool.lock:
+                pool.queued -= 1
+            raise
+
+        def on_done(f):
+            # A job cancelled before it started never ran wrap()
+            if f.cancelled():
+                with pool.lock:
+                    pool.queued -= 1
+
+        future.add_done_callback(on_done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        result = {}
+        for name, pool in self._pools.items():
+            with pool.lock:
+                result[name] = {
+                    "workers": pool.workers,
+                    "queued": pool.queued,
+                    "active": pool.active,
+                    "completed": pool.completed,
+                }
+        return result
+
+    def shutdown(self, wait: bool = True):
+        for pool in self._pools.values():
+            pool.executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,177 @@
+#
+# Long-form alignment planning
+#
+# BFA is built with a fixed duration_max, so long narration has to be
+# aligned in windows. Forced alignment also needs to know which words each
+# window speaks, so audio and transcript are cut together:
+#
+# 1. The transcript is split into sentences (words, if a single sentence is
+#    too long for one window)
+# 2. The speaking rate over the remaining audio decides roughly where the
+#    next window's last sentence should end
+# 3. The cut is snapped to the quietest frame near that point, so it lands
+#    in a pause between sentences rather than inside a word
+#
+# No window owns more than window_s of audio. If the last unit left is a
+# sentence, it is split into words; a single word facing more than one
+# window of audio is given to the loudest of equal time slices, and the
+# other slices get no text.
+#
+# Each window is aligned with a little padding on both sides. Every window
+# speaks its own part of the transcript, so when stitching nothing is
+# dropped: timestamps are shifted by the window's offset and clamped into
+# the window's own region, which keeps the stitched result in order.
+#
+
+import re
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?…])\s+")
+
+# Bumped whenever planning or stitching changes the output for the same
+# input, so cached alignments are recomputed
+PLAN_VERSION = 1
+
+
+@dataclass
+class AlignWindow:
+    """One alignment window, in samples"""
+
+    index: int
+    text: str
+    start: int  # Region this window owns in the stitched result
+    end: int
+    slice_start: int  # Padded region actually sent to the aligner
+    slice_end: int
+
+
+def split_text_units(text: str, max_chars: int) -> List[str]:
+    """Split text into sentences, breaking any over max_chars into words"""
+    units = []
+    for sentence in SENTENCE_SPLIT.split(text.strip()):
+        if not sentence:
+            continue
+        if len(sentence) > max_chars:
+            units.extend(sentence.split())
+        else:
+            units.append(sentence)
+    return units
+
+
+def frame_energy(samples: np.ndarray, frame: int) -> np.ndarray:
+    """RMS energy of consecutive non-overlapping frames"""
+    count = len(samples) // frame
+    if count == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[: count * frame].reshape(count, frame).astype(np.float32)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def plan_windows(
+    samples: np.ndarray,
+    sample_rate: int,
+    text: str,
+    window_s: float = 20.0,
+    search_s: float = 2.0,
+    pad_s: float = 0.2,
+) -> List[AlignWindow]:
+    """Cut mono audio and its transcript into windows of at most ~window_s"""
+    total = len(samples)
+    window = int(window_s * sample_rate)
+    pad = int(pad_s * sample_rate)
+
+    def make(index: int, words: List[str], start: int, end: int) -> AlignWindow:
+        return AlignWindow(
+            index=index,
+            text=" ".join(words),
+            start=start,
+            end=end,
+            slice_start=max(0, start - pad),
+            slice_end=min(total, end + pad),
+        )
+
+    if total <= window:
+        return [make(0, [text.strip()], 0, total)]
+
+    # Characters per second is only an estimate, so leave room to snap
+    budget = max(int((window_s - search_s) * sample_rate), sample_rate)
+    search = int(search_s * sample_rate)
+    chars_per_window = max(int(len(text) * budget / total), 1)
+
+    units = split_text_units(text, chars_per_window)
+    cum = np.cumsum([0] + [len(u) + 1 for u in units])
+
+    frame = max(int(0.02 * sample_rate), 1)
+    energy = frame_energy(samples, frame)
+
+    windows: List[AlignWindow] = []
+    cursor = 0
+    first = 0
+
+    while first < len(units):
+        remaining = total - cursor
+        if remaining <= window:
+            windows.append(make(len(windows), units[first:], cursor, total))
+            break
+
+        if len(units) - first == 1:
+            words = units[first].split()
+            if len(words) > 1:
+                units = units[:first] + words
+                cum = np.cumsum([0] + [len(u) + 1 for u in units])
+                continue
+
+            # One word and more audio than a window: slice by time
+            count = -(-remaining // window)
+            bounds = [cursor + remaining * i // count for i in range(count + 1)]
+            slices = list(zip(bounds, bounds[1:]))
+            loudness = [np.mean(np.square(samples[a:b], dtype=np.float32)) for a, b in slices]
+            loudest = int(np.argmax(loudness))
+            for i, (a, b) in enumerate(slices):
+                windows.append(make(len(windows), units[first:] if i == loudest else [], a, b))
+            break
+
+        # Where a unit boundary is expected to fall at the remaining rate
+        def expected(k: int) -> int:
+            share = (cum[k] - cum[first]) / (cum[-1] - cum[first])
+            return cursor + int(remaining * share)
+
+        last = first + 1
+        while last + 1 < len(units) and expected(last + 1) - cursor <= budget:
+            last += 1
+
+        target = expected(last)
+        lo = max(cursor + sample_rate // 2, target - search)
+        hi = min(cursor + window, target + search, total)
+
+        if hi - lo >= frame:
+            f0, f1 = lo // frame, hi // frame
+            quietest = f0 + int(np.argmin(energy[f0:f1]))
+
+            # Cut in the middle of the pause, not at its edge
+            floor = energy[quietest] * 1.5 + 1e-6
+            left, right = quietest, quietest
+            while left > f0 and energy[left - 1] <= floor:
+                left -= 1
+            while right + 1 < f1 and energy[right + 1] <= floor:
+                right += 1
+            cut = ((left + right) // 2) * frame + frame // 2
+        else:
+            cut = min(target, cursor + window)
+        cut = max(cut, cursor + 1)
+
+        windows.append(make(len(windows), units[first:last], cursor, cut))
+        cursor = cut
+        first = last
+
+    return windows
+
+
+def clamp_span(start_ms: float, end_ms: float, lo_ms: float, hi_ms: float) -> Tuple[float, float]:
+    """Clamp an item's span into [lo_ms, hi_ms]"""
+    start = min(max(start_ms, lo_ms), hi_ms)
+    end = min(max(end_ms, start), hi_ms)
+    return start, end
@@ -11,6 +11,8 @@
 # - FastAPI for HTTP server
 # - Models loaded once on startup
 # - GPU acceleration via CUDA
+# - torch/transformers are only imported at startup (or, in fast-start
+#   mode, in the background after the server has bound its port)
 #
 # Models:
 # - Emotion: j-hartmann/emotion-english-distilroberta-base (7 emotions)
@@ -19,17 +21,79 @@
 
 import os
 import sys
-import torch
+import hmac
+import json
+import math
+import sqlite3
+import time
+import importlib.metadata
+import asyncio
 import logging
-from typing import Optional, List, Dict, Any
+from typing import TYPE_CHECKING, AsyncContextManager, Optional, List, Dict, Any, Tuple
 from contextlib import asynccontextmanager
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    BackgroundTasks,
+    WebSocket,
+    WebSocketDisconnect,
+    Request,
+    Query,
+    Response,
+)
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import uvicorn
 
+# Allow sibling modules to be imported when run as `src.main:app`
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from admission import AdmissionGate, Overloaded
+from align_cache import AlignmentCache
+from align_pool import AlignerBusy, AlignerCrashed, AlignerProcessPool, AlignerTimeout
+from align_stream import AlignmentStreamSession, AudioRegion
+from audio_io import ALIGNER_SAMPLE_RATE, AudioDecodeError, decode_audio_bytes
+from batching import MicroBatcher
+from deadlines import DeadlineMiddleware, remaining, stats as deadline_stats
+from emotion_backends import load_emotion_pipeline
+from emotion_cache import EmotionCache
+from emotion_store import EmotionStore
+from executors import InferenceExecutor
+from long_align import PLAN_VERSION, AlignWindow, clamp_span, plan_windows
+from metrics import (
+    BATCH_SIZE_BUCKETS,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    MetricsMiddleware,
+    MetricsRegistry,
+    process_stats,
+)
+from model_registry import READY, ModelRegistry, ModelUnavailable
+from profiling import ProfilerBusy, SamplingProfiler, TorchProfile, annotate, profile_job
+from streaming import SentenceSegmenter
+from timing import (
+    ServerTimingMiddleware,
+    Timings,
+    current as timings_current,
+    handler_done,
+    record as record_timing,
+    shared_by,
+    stage,
+)
+from tokenization import (
+    VALID_TRUNCATION_SIDES,
+    EmotionTokenizer,
+    PaddingStats,
+    bucket_indices,
+    length_buckets,
+    pad_batch,
+)
+
+if TYPE_CHECKING:
+    import torch
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -39,11 +103,248 @@ logger = logging.getLogger(__name__)
 # Global model instances
 emotion_model = None
 aligner_model = None
+emotion_batcher: Optional[MicroBatcher] = None
+inference_executor: Optional[InferenceExecutor] = None
+
+# Startup (torch import + model loading); a background task in fast-start mode
+runtime_task: Optional[asyncio.Future] = None
+startup_task: Optional[asyncio.Task] = None
+startup_complete = False
+
+# Aligner load started by ML_BACKEND_ALIGNER_STARTUP=background
+aligner_preload_task: Optional[asyncio.Task] = None
+
+# BFA aligner loaded by the pre-fork parent, published by each worker
+preforked_aligner = None
+
+# Tokenizer stage for the loaded emotion model, and its length buckets
+emotion_tokenizer: Optional[EmotionTokenizer] = None
+emotion_length_limits: List[int] = []
+emotion_padding = PaddingStats()
+
+# Emotion backend actually in use (may differ from the configured one if
+# its dependencies are missing)
+emotion_backend: Optional[str] = None
+
+# Load timings (load and warm-up), reported on /health
+model_load_times_ms: Dict[str, float] = {}
 
 # Configuration
 HOST = os.getenv("ML_BACKEND_HOST", "127.0.0.1")
 PORT = int(os.getenv("ML_BACKEND_PORT", "8001"))
-DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+DEVICE: Optional[str] = None  # Resolved once torch is imported
+EMOTION_MODEL_ID = os.getenv(
+    "ML_BACKEND_EMOTION_MODEL_ID", "j-hartmann/emotion-english-distilroberta-base"
+)
+
+# Emotion inference backend: torch, torch-int8, onnx or onnx-int8. The int8
+# and ONNX backends are much faster on CPU-only machines
+EMOTION_BACKEND = os.getenv("ML_BACKEND_EMOTION_BACKEND", "torch")
+
+# Exports, stores and other files kept between runs
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+
+# The ONNX export is kept per model id, so it is only done once (set
+# ML_BACKEND_EMOTION_ONNX_DIR= to export to a temporary directory instead)
+EMOTION_ONNX_DIR = (
+    os.getenv(
+        "ML_BACKEND_EMOTION_ONNX_DIR",
+        os.path.join(CACHE_DIR, "onnx", EMOTION_MODEL_ID.replace("/", "--")),
+    )
+    or None
+)
+
+# Micro-batching for /emotion/detect: concurrent requests that arrive within
+# EMOTION_MAX_WAIT_MS of each other share one padded forward pass
+EMOTION_MAX_BATCH_SIZE = int(os.getenv("ML_BACKEND_EMOTION_MAX_BATCH_SIZE", "16"))
+EMOTION_MAX_WAIT_MS = float(os.getenv("ML_BACKEND_EMOTION_MAX_WAIT_MS", "5"))
+
+# Worker threads per model. Inference runs off the event loop so /health and
+# emotion requests keep flowing while a long alignment is in progress
+EMOTION_WORKERS = int(os.getenv("ML_BACKEND_EMOTION_WORKERS", "1"))
+ALIGNER_WORKERS = int(os.getenv("ML_BACKEND_ALIGNER_WORKERS", "1"))
+
+# Uploaded audio is decoded on its own workers, so it doesn't queue behind
+# alignments already waiting for the aligner
+AUDIO_DECODE_WORKERS = int(os.getenv("ML_BACKEND_AUDIO_DECODE_WORKERS", "1"))
+
+# /emotion/detect/batch: texts are scored in chunks of this size
+EMOTION_BATCH_CHUNK_SIZE = int(os.getenv("ML_BACKEND_EMOTION_BATCH_CHUNK_SIZE", "32"))
+EMOTION_BATCH_MAX_TEXTS = int(os.getenv("ML_BACKEND_EMOTION_BATCH_MAX_TEXTS", "256"))
+
+# Emotion tokenization: texts longer than EMOTION_MAX_SEQ_LEN tokens are
+# truncated, keeping the start ("right") or the end ("left")
+EMOTION_MAX_SEQ_LEN = int(os.getenv("ML_BACKEND_EMOTION_MAX_SEQ_LEN", "512"))
+EMOTION_TRUNCATION = os.getenv("ML_BACKEND_EMOTION_TRUNCATION", "right")
+
+# Tokenization runs on its own workers (and is cached by text) so the next
+# batch is tokenized while the current one is on the model
+TOKENIZER_WORKERS = int(os.getenv("ML_BACKEND_TOKENIZER_WORKERS", "1"))
+TOKEN_CACHE_SIZE = int(os.getenv("ML_BACKEND_TOKEN_CACHE_SIZE", "4096"))
+EMOTION_MAX_IN_FLIGHT = int(os.getenv("ML_BACKEND_EMOTION_MAX_IN_FLIGHT", "2"))
+
+# Emotion result cache (set ML_BACKEND_EMOTION_CACHE=0 to disable)
+EMOTION_CACHE_ENABLED = os.getenv("ML_BACKEND_EMOTION_CACHE", "1") != "0"
+EMOTION_CACHE_SIZE = int(os.getenv("ML_BACKEND_EMOTION_CACHE_SIZE", "2048"))
+EMOTION_CACHE_TTL_S = float(os.getenv("ML_BACKEND_EMOTION_CACHE_TTL_S", "3600"))
+
+# On-disk store behind the emotion cache, so results survive restarts (set
+# ML_BACKEND_EMOTION_CACHE_DB= to disable). Emptied when the model changes
+EMOTION_CACHE_DB = os.getenv(
+    "ML_BACKEND_EMOTION_CACHE_DB", os.path.join(CACHE_DIR, "emotion.sqlite3")
+)
+EMOTION_CACHE_DB_MB = float(os.getenv("ML_BACKEND_EMOTION_CACHE_DB_MB", "64"))
+
+emotion_store = (
+    EmotionStore(EMOTION_CACHE_DB, max_bytes=int(EMOTION_CACHE_DB_MB * 1024 * 1024))
+    if EMOTION_CACHE_DB
+    else None
+)
+emotion_cache = EmotionCache(
+    max_entries=EMOTION_CACHE_SIZE,
+    ttl_s=EMOTION_CACHE_TTL_S,
+    enabled=EMOTION_CACHE_ENABLED,
+    store=emotion_store,
+)
+
+# /emotion/stream: clause boundaries only split once a chunk is this long
+STREAM_MIN_CLAUSE_CHARS = int(os.getenv("ML_BACKEND_STREAM_MIN_CLAUSE_CHARS", "24"))
+STREAM_MAX_CHUNK_CHARS = int(os.getenv("ML_BACKEND_STREAM_MAX_CHUNK_CHARS", "300"))
+
+# /align/stream: max seconds of unmarked audio a session may buffer
+ALIGN_STREAM_MAX_BUFFER_S = float(os.getenv("ML_BACKEND_ALIGN_STREAM_MAX_BUFFER_S", "60"))
+
+# Fast start: bind the port immediately and import torch / load models in
+# the background. /health/live answers right away; /health/ready turns 200
+# once the emotion model is usable
+FAST_START = os.getenv("ML_BACKEND_FAST_START", "0") != "0"
+
+# When to load the BFA aligner:
+#   lazy       - on the first alignment request
+#   background - in a background task at startup (server accepts requests
+#                immediately; alignment requests wait for the load)
+#   eager      - before the server accepts requests
+VALID_ALIGNER_STARTUPS = ("lazy", "background", "eager")
+ALIGNER_STARTUP = os.getenv("ML_BACKEND_ALIGNER_STARTUP", "background").lower()
+ALIGNER_WARMUP = os.getenv("ML_BACKEND_ALIGNER_WARMUP", "1") != "0"
+
+# A failed model load is retried no sooner than this, doubling per failure
+MODEL_RETRY_BACKOFF_S = float(os.getenv("ML_BACKEND_MODEL_RETRY_BACKOFF_S", "5"))
+MODEL_RETRY_BACKOFF_MAX_S = float(os.getenv("ML_BACKEND_MODEL_RETRY_BACKOFF_MAX_S", "300"))
+
+# Single-flight loading: concurrent first callers share one load
+model_registry = ModelRegistry(
+    backoff_base_s=MODEL_RETRY_BACKOFF_S, backoff_max_s=MODEL_RETRY_BACKOFF_MAX_S
+)
+
+# Alignment process pool: with ALIGNER_PROCESSES > 0, BFA runs in that many
+# separate processes (one aligner each) instead of in the server process.
+# At most ALIGN_QUEUE_LIMIT jobs wait; beyond that requests get 429
+ALIGNER_PROCESSES = int(os.getenv("ML_BACKEND_ALIGNER_PROCESSES", "0"))
+ALIGN_QUEUE_LIMIT = int(os.getenv("ML_BACKEND_ALIGN_QUEUE_LIMIT", "8"))
+ALIGN_JOB_TIMEOUT_S = float(os.getenv("ML_BACKEND_ALIGN_JOB_TIMEOUT_S", "120"))
+ALIGNER_PROCESS_THREADS = int(os.getenv("ML_BACKEND_ALIGNER_PROCESS_THREADS", "0")) or None
+
+# Admission control: per endpoint group, at most MAX_CONCURRENT requests run
+# and MAX_QUEUE wait. Requests that would wait longer than MAX_QUEUE_WAIT_S
+# are rejected up front with 429. ALIGN_MAX_CONCURRENT 0 = one per aligner
+# worker (thread or process)
+EMOTION_MAX_CONCURRENT = int(os.getenv("ML_BACKEND_EMOTION_MAX_CONCURRENT", "64"))
+EMOTION_MAX_QUEUE = int(os.getenv("ML_BACKEND_EMOTION_MAX_QUEUE", "256"))
+EMOTION_MAX_QUEUE_WAIT_S = float(os.getenv("ML_BACKEND_EMOTION_MAX_QUEUE_WAIT_S", "2"))
+EMOTION_BATCH_MAX_CONCURRENT = int(os.getenv("ML_BACKEND_EMOTION_BATCH_MAX_CONCURRENT", "2"))
+EMOTION_BATCH_MAX_QUEUE = int(os.getenv("ML_BACKEND_EMOTION_BATCH_MAX_QUEUE", "8"))
+EMOTION_BATCH_MAX_QUEUE_WAIT_S = float(
+    os.getenv("ML_BACKEND_EMOTION_BATCH_MAX_QUEUE_WAIT_S", "10")
+)
+ALIGN_MAX_CONCURRENT = int(os.getenv("ML_BACKEND_ALIGN_MAX_CONCURRENT", "0")) or max(
+    ALIGNER_PROCESSES, ALIGNER_WORKERS
+)
+ALIGN_MAX_QUEUE = int(os.getenv("ML_BACKEND_ALIGN_MAX_QUEUE", "8"))
+ALIGN_MAX_QUEUE_WAIT_S = float(os.getenv("ML_BACKEND_ALIGN_MAX_QUEUE_WAIT_S", "30"))
+
+admission_gates = {
+    "emotion": AdmissionGate(
+        "emotion", EMOTION_MAX_CONCURRENT, EMOTION_MAX_QUEUE, EMOTION_MAX_QUEUE_WAIT_S
+    ),
+    "emotion_batch": AdmissionGate(
+        "emotion_batch",
+        EMOTION_BATCH_MAX_CONCURRENT,
+        EMOTION_BATCH_MAX_QUEUE,
+        EMOTION_BATCH_MAX_QUEUE_WAIT_S,
+    ),
+    "align": AdmissionGate(
+        "align", ALIGN_MAX_CONCURRENT, ALIGN_MAX_QUEUE, ALIGN_MAX_QUEUE_WAIT_S
+    ),
+}
+
+# Add a Server-Timing header to every HTTP response, not just to requests
+# that send X-Server-Timing: 1
+SERVER_TIMING = os.getenv("ML_BACKEND_SERVER_TIMING", "0") != "0"
+
+# Admin endpoints (/debug/profile) are disabled unless a token is set; callers
+# send it as `Authorization: Bearer <token>`. Profiles run for at most
+# PROFILE_MAX_S seconds
+ADMIN_TOKEN = os.getenv("ML_BACKEND_ADMIN_TOKEN", "")
+PROFILE_MAX_S = float(os.getenv("ML_BACKEND_PROFILE_MAX_S", "120"))
+
+# Metrics for GET /metrics: latency per endpoint and per stage, queue waits
+# and emotion batch sizes (read-at-scrape values are registered further down)
+metrics = MetricsRegistry("ml_backend")
+REQUEST_DURATION = metrics.histogram(
+    "request_duration_seconds", "HTTP request latency by route", ["endpoint"]
+)
+REQUESTS = metrics.counter(
+    "requests_total", "HTTP requests by route and status", ["endpoint", "status"]
+)
+QUEUE_WAIT = metrics.histogram(
+    "queue_wait_seconds", "Time spent queued before work started", ["queue"]
+)
+STAGE_DURATION = metrics.histogram(
+    "stage_duration_seconds", "Time spent in each inference stage", ["stage"]
+)
+EMOTION_BATCH_SIZE = metrics.histogram(
+    "emotion_batch_size", "Texts per emotion forward pass", buckets=BATCH_SIZE_BUCKETS
+)
+http_in_flight: Dict[str, int] = {}  # path -> requests being handled
+
+# Long-form alignment: audio longer than ALIGN_WINDOW_S is cut into windows
+# (snapped to pauses) that each fit within the aligner's duration_max
+ALIGNER_DURATION_MAX_S = int(os.getenv("ML_BACKEND_ALIGNER_DURATION_MAX_S", "30"))
+ALIGN_WINDOW_PAD_S = float(os.getenv("ML_BACKEND_ALIGN_WINDOW_PAD_S", "0.2"))
+ALIGN_WINDOW_S = min(
+    float(os.getenv("ML_BACKEND_ALIGN_WINDOW_S", "20")),
+    ALIGNER_DURATION_MAX_S - 2 * ALIGN_WINDOW_PAD_S,
+)
+
+ALIGNER_PRESET = "en-us"
+
+# Alignment result cache, keyed on the decoded audio, transcript and aligner
+# (set ML_BACKEND_ALIGN_CACHE=0 to disable). ALIGN_CACHE_DIR adds an on-disk
+# tier that survives restarts, capped at ALIGN_CACHE_DISK_MB
+ALIGN_CACHE_ENABLED = os.getenv("ML_BACKEND_ALIGN_CACHE", "1") != "0"
+ALIGN_CACHE_SIZE = int(os.getenv("ML_BACKEND_ALIGN_CACHE_SIZE", "256"))
+ALIGN_CACHE_DIR = os.getenv("ML_BACKEND_ALIGN_CACHE_DIR") or None
+ALIGN_CACHE_DISK_MB = float(os.getenv("ML_BACKEND_ALIGN_CACHE_DISK_MB", "256"))
+
+
+def _aligner_version() -> str:
+    try:
+        return importlib.metadata.version("bournemouth-forced-aligner")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+# Results from another aligner version, preset, windowing or stitching
+# plan never match
+alignment_cache = AlignmentCache(
+    namespace=f"bfa-{_aligner_version()}/{ALIGNER_PRESET}/"
+    f"{ALIGN_WINDOW_S:g}/{ALIGN_WINDOW_PAD_S:g}/plan{PLAN_VERSION}",
+    max_entries=ALIGN_CACHE_SIZE,
+    disk_dir=ALIGN_CACHE_DIR,
+    disk_max_bytes=int(ALIGN_CACHE_DISK_MB * 1024 * 1024),
+    enabled=ALIGN_CACHE_ENABLED,
+)
 
 
 class EmotionRequest(BaseModel):
@@ -57,6 +358,15 @@ class EmotionResponse(BaseModel):
     processing_time_ms: float
 
 
+class EmotionBatchRequest(BaseModel):
+    texts: List[str]
+
+
+class EmotionBatchResponse(BaseModel):
+    results: List[EmotionResponse]  # One per input text, in request order
+    processing_time_ms: float
+
+
 class AlignRequest(BaseModel):
     text: str
     audio_path: str  # Path to audio file (temporary)
@@ -78,19 +388,48 @@ class AlignResponse(BaseModel):
 
 class HealthResponse(BaseModel):
     status: str
-    device: str
+    device: Optional[str]  # None until torch has been imported
     models_loaded: Dict[str, bool]
+    model_states: Dict[str, str]  # unloaded / loading / ready / failed
+    load_times_ms: Dict[str, float]
+    emotion_backend: Optional[str]  # Backend actually in use, once loaded
     timestamp: str
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Load models on startup, cleanup on shutdown"""
-    global emotion_model, aligner_model
+class LivenessResponse(BaseModel):
+    status: str
+    timestamp: str
+
+
+class ReadinessResponse(BaseModel):
+    ready: bool
+    status: str  # starting / ready / failed
+    model_states: Dict[str, str]
+    timestamp: str
+
+
+class StatsResponse(BaseModel):
+    emotion_cache: Dict[str, Any]
+    alignment_cache: Dict[str, Any]
+    emotion_batcher: Optional[Dict[str, Any]]
+    executor: Optional[Dict[str, Dict[str, int]]]
+    emotion_padding: Dict[str, Any]
+    token_cache: Optional[Dict[str, Any]]
+    aligner_pool: Optional[Dict[str, Any]]
+    admission: Dict[str, Dict[str, Any]]
+    requests: Dict[str, int]  # Cut short by deadline / disconnect
+    models: Dict[str, Dict[str, Any]]
+    timestamp: str
+
+
+def _init_runtime() -> str:
+    """Import torch and pick the device (blocking)"""
+    import torch
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
 
     logger.info("=" * 60)
-    logger.info("AI Assistant ML Backend Service Starting...")
-    logger.info(f"Device: {DEVICE}")
+    logger.info(f"Device: {device}")
     logger.info(f"CUDA available: {torch.cuda.is_available()}")
     if torch.cuda.is_available():
         logger.info(f"GPU: {torch.cuda.get_device_name(0)}")
@@ -98,43 +437,145 @@ async def lifespan(app: FastAPI):
             f"VRAM: {torch.cuda.get_device_properties(0).total_memory / 1e9:.1f} GB"
         )
     logger.info("=" * 60)
+    return device
+
+
+async def _ensure_runtime():
+    """Wait until torch is imported and DEVICE is set"""
+    global DEVICE, runtime_task
+
+    if DEVICE is not None:
+        return
+    if runtime_task is None:
+        runtime_task = asyncio.ensure_future(asyncio.to_thread(_init_runtime))
+    DEVICE = await asyncio.shield(runtime_task)
 
-    # Load emotion model
-    try:
-        logger.info(
-            "Loading emotion model: j-hartmann/emotion-english-distilroberta-base"
-        )
-        from transformers import pipeline
 
-        emotion_model = pipeline(
-            "text-classification",
-            model="j-hartmann/emotion-english-distilroberta-base",
-            device=0 if DEVICE == "cuda" else -1,
-            top_k=None,
+def _check_aligner_startup():
+    """Reject an unknown ML_BACKEND_ALIGNER_STARTUP before anything loads"""
+    if ALIGNER_STARTUP not in VALID_ALIGNER_STARTUPS:
+        raise ValueError(
+            f"Invalid ML_BACKEND_ALIGNER_STARTUP '{ALIGNER_STARTUP}' "
+            f"(expected one of {', '.join(VALID_ALIGNER_STARTUPS)})"
         )
+
+
+async def _startup():
+    """Import heavy libraries and load models"""
+    global emotion_model, aligner_model, emotion_batcher, startup_complete
+    global aligner_preload_task
+
+    await _ensure_runtime()
+
+    # Load emotion model
+    try:
+        emotion_model = await model_registry.get("emotion")
         logger.info("✓ Emotion model loaded successfully")
     except Exception as e:
         logger.error(f"✗ Failed to load emotion model: {e}")
         emotion_model = None
 
-    # Load BFA aligner (lazy loading - will initialize on first use)
-    logger.info("BFA aligner ready for lazy initialization")
+    if emotion_model is not None:
+        emotion_batcher = MicroBatcher(
+            _run_emotion_batch,
+            max_batch_size=EMOTION_MAX_BATCH_SIZE,
+            max_wait_ms=EMOTION_MAX_WAIT_MS,
+            name="emotion-batcher",
+            max_in_flight=EMOTION_MAX_IN_FLIGHT,
+            on_dispatch=_observe_batcher_waits,
+        )
+        emotion_batcher.start()
+
+    # Index the alignment cache's disk tier here rather than at import, off
+    # the event loop (a lookup that comes first indexes it itself)
+    await asyncio.to_thread(alignment_cache.ensure_disk_index)
+
+    # Load BFA aligner
     aligner_model = None
+    if ALIGNER_STARTUP == "eager":
+        await _preload_aligner()
+    elif ALIGNER_STARTUP == "background":
+        logger.info("Loading BFA aligner in the background")
+        aligner_preload_task = asyncio.create_task(_preload_aligner())
+    else:
+        logger.info("BFA aligner ready for lazy initialization")
 
+    startup_complete = True
     logger.info("=" * 60)
     logger.info(f"Service ready on http://{HOST}:{PORT}")
     logger.info("=" * 60)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load models on startup, cleanup on shutdown"""
+    global emotion_batcher, inference_executor
+    global startup_task, startup_complete, aligner_preload_task
+
+    logger.info("=" * 60)
+    logger.info("AI Assistant ML Backend Service Starting...")
+    logger.info("=" * 60)
+
+    _check_aligner_startup()
+
+    inference_executor = InferenceExecutor(
+        {
+            "tokenizer": TOKENIZER_WORKERS,
+            "emotion": EMOTION_WORKERS,
+            "aligner": ALIGNER_WORKERS,
+            "audio": AUDIO_DECODE_WORKERS,
+        },
+        on_wait=_observe_executor_wait,
+        around_job=profile_job,
+    )
+
+    if emotion_cache.store is not None:
+        # Closed by the pre-fork parent before forking; each worker opens its own
+        try:
+            await asyncio.to_thread(emotion_cache.store.ensure_open)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Emotion store disabled ({EMOTION_CACHE_DB}: {e})")
+
+    startup_complete = False
+    if FAST_START:
+        logger.info("Fast start: accepting connections while models load")
+        startup_task = asyncio.create_task(_startup())
+    else:
+        await _startup()
+
     yield
 
     # Cleanup
     logger.info("Shutting down ML Backend Service...")
-    if emotion_model:
-        del emotion_model
-    if aligner_model:
-        del aligner_model
-    if torch.cuda.is_available():
-        torch.cuda.empty_cache()
+    # Stop background loads before the executors they run on go away
+    pending = [
+        task
+        for task in (startup_task, aligner_preload_task)
+        if task is not None and not task.done()
+    ]
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    startup_task = None
+    aligner_preload_task = None
+    aligner_pool = model_registry.peek("aligner")
+    if isinstance(aligner_pool, AlignerProcessPool):
+        await aligner_pool.stop()
+    model_registry.unload("aligner")
+    model_registry.unload("emotion")
+    if emotion_batcher:
+        await emotion_batcher.stop()
+        emotion_batcher = None
+    if inference_executor:
+        inference_executor.shutdown(wait=False)
+        inference_executor = None
+    if emotion_cache.store is not None:
+        emotion_cache.store.close()
+    if "torch" in sys.modules:
+        import torch
+
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
     logger.info("Cleanup complete")
 
 
@@ -145,6 +586,14 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Cancel work for requests past their X-Deadline-Ms or whose client went away
+# (added first so its 504s still get CORS headers)
+app.add_middleware(DeadlineMiddleware)
+
+# Server-Timing breakdown for requests that send X-Server-Timing: 1 (or all
+# requests with ML_BACKEND_SERVER_TIMING=1)
+app.add_middleware(ServerTimingMiddleware, always=SERVER_TIMING)
+
 # CORS middleware (allow requests from Tauri app)
 app.add_middleware(
     CORSMiddleware,
@@ -152,23 +601,484 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
+)
+
+# Outermost, so request latency includes everything above
+app.add_middleware(
+    MetricsMiddleware,
+    duration=REQUEST_DURATION,
+    requests=REQUESTS,
+    in_flight=http_in_flight,
 )
 
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
+    states = model_registry.states()
     return HealthResponse(
         status="healthy",
         device=DEVICE,
-        models_loaded={
-            "emotion": emotion_model is not None,
-            "aligner": True,  # Lazy loaded
-        },
+        models_loaded={name: state == READY for name, state in states.items()},
+        model_states=states,
+        load_times_ms=dict(model_load_times_ms),
+        emotion_backend=emotion_backend,
+        timestamp=datetime.now().isoformat(),
+    )
+
+
+@app.get("/health/live", response_model=LivenessResponse)
+async def liveness():
+    """The process is up and serving HTTP (models may still be loading)"""
+    return LivenessResponse(status="alive", timestamp=datetime.now().isoformat())
+
+
+@app.get("/health/ready", response_model=ReadinessResponse)
+async def readiness(response: Response):
+    """200 once startup has finished and the emotion model is loaded, else 503"""
+    states = model_registry.states()
+    ready = startup_complete and states.get("emotion") == READY
+
+    if ready:
+        status = "ready"
+    elif startup_complete or (startup_task is not None and startup_task.done()):
+        status = "failed"
+    else:
+        status = "starting"
+
+    if not ready:
+        response.status_code = 503
+    return ReadinessResponse(
+        ready=ready,
+        status=status,
+        model_states=states,
+        timestamp=datetime.now().isoformat(),
+    )
+
+
+PreparedBatch = List[Tuple[List[int], Dict[str, "torch.Tensor"]]]
+
+
+def _tokenize_texts(texts: List[str]) -> PreparedBatch:
+    """
+    Tokenize a batch and pad it per token length bucket (blocking)
+
+    Returns (indices, padded inputs) for each bucket, shortest first
+    """
+    with stage("tokenize", STAGE_DURATION), annotate("tokenize"):
+        input_ids = emotion_tokenizer.encode(texts)
+        lengths = [len(ids) for ids in input_ids]
+
+        prepared = []
+        for bucket in bucket_indices(lengths, emotion_length_limits):
+            inputs = pad_batch([input_ids[i] for i in bucket], emotion_tokenizer.pad_token_id)
+            emotion_padding.record([lengths[i] for i in bucket])
+            prepared.append((bucket, inputs))
+    return prepared
+
+
+def _score_batch(prepared: PreparedBatch, count: int) -> List[List[Dict[str, Any]]]:
+    """
+    Run one forward pass per bucket (blocking)
+
+    Returns the emotion scores for each text (in input order), sorted by
+    score descending
+    """
+    results: List[Optional[List[Dict[str, Any]]]] = [None] * count
+    for bucket, inputs in prepared:
+        for index, scores in zip(bucket, _emotion_forward(inputs)):
+            results[index] = scores
+    return results
+
+
+def _emotion_forward(inputs: Dict[str, "torch.Tensor"]) -> List[List[Dict[str, Any]]]:
+    """Run the emotion model on padded inputs (blocking)"""
+    import torch
+
+    model = emotion_model.model
+    EMOTION_BATCH_SIZE.observe(len(inputs["input_ids"]))
+
+    with stage("forward", STAGE_DURATION), annotate("forward"):
+        inputs = {name: tensor.to(emotion_model.device) for name, tensor in inputs.items()}
+        with torch.inference_mode():
+            logits = model(**inputs).logits
+
+    with stage("postprocess", STAGE_DURATION), annotate("postprocess"):
+        probabilities = torch.softmax(logits.float(), dim=-1).cpu().tolist()
+
+        labels = model.config.id2label
+        return [
+            sorted(
+                ({"label": labels[i], "score": score} for i, score in enumerate(row)),
+                key=lambda x: x["score"],
+                reverse=True,
+            )
+            for row in probabilities
+        ]
+
+
+async def _tokenize_batch(texts: List[str]) -> PreparedBatch:
+    return await inference_executor.run("tokenizer", _tokenize_texts, texts)
+
+
+async def _run_emotion_batch(
+    items: List[Tuple[str, Optional[Timings], int]]
+) -> List[List[Dict[str, Any]]]:
+    """
+    Batch function for the emotion micro-batcher
+
+    Items are (text, caller's stage timings, perf_counter_ns when queued);
+    the batch's stages count for every caller that asked for timings
+    """
+    dispatched = time.perf_counter_ns()
+    for _, timings, queued in items:
+        if timings is not None:
+            timings.add("queue", dispatched - queued)
+
+    texts = [text for text, _, _ in items]
+    with shared_by(timings for _, timings, _ in items):
+        prepared = await _tokenize_batch(texts)
+        return await inference_executor.run("emotion", _score_batch, prepared, len(texts))
+
+
+def _neutral_emotion_response() -> EmotionResponse:
+    """Response for empty or whitespace-only text"""
+    return EmotionResponse(
+        emotion="neutral",
+        confidence=1.0,
+        all_emotions=[{"label": "neutral", "score": 1.0}],
+        processing_time_ms=0.0,
+    )
+
+
+def _emotion_response(
+    results: List[Dict[str, Any]], processing_time: float
+) -> EmotionResponse:
+    """Build a response from sorted emotion scores"""
+    top_result = results[0]
+    return EmotionResponse(
+        emotion=top_result["label"],
+        confidence=top_result["score"],
+        all_emotions=results,
+        processing_time_ms=processing_time,
+    )
+
+
+@app.get("/stats", response_model=StatsResponse)
+async def stats():
+    """Cache, batching and worker pool counters"""
+    return StatsResponse(
+        emotion_cache=emotion_cache.stats(),
+        alignment_cache=alignment_cache.stats(),
+        emotion_batcher=emotion_batcher.stats() if emotion_batcher else None,
+        executor=inference_executor.stats() if inference_executor else None,
+        emotion_padding=emotion_padding.stats(),
+        token_cache=emotion_tokenizer.stats() if emotion_tokenizer else None,
+        aligner_pool=aligner_model.stats()
+        if isinstance(aligner_model, AlignerProcessPool)
+        else None,
+        admission={name: gate.stats() for name, gate in admission_gates.items()},
+        requests=deadline_stats(),
+        models=model_registry.stats(),
         timestamp=datetime.now().isoformat(),
     )
 
 
+def _observe_executor_wait(pool: str, seconds: float):
+    QUEUE_WAIT.observe(seconds, f"executor_{pool}")
+    record_timing("queue", int(seconds * 1e9))
+
+
+def _observe_batcher_waits(waits: List[float]):
+    for seconds in waits:
+        QUEUE_WAIT.observe(seconds, "emotion_batcher")
+
+
+def _observe_aligner_job(queued_s: float, run_s: float):
+    QUEUE_WAIT.observe(queued_s, "aligner_pool")
+    STAGE_DURATION.observe(run_s, "align")
+    record_timing("queue", int(queued_s * 1e9))
+    record_timing("align", int(run_s * 1e9))
+
+
+def _collect_caches():
+    caches = {"emotion": emotion_cache.stats(), "alignment": alignment_cache.stats()}
+    if emotion_tokenizer is not None:
+        caches["token"] = emotion_tokenizer.stats()
+    return caches
+
+
+def _collect_queues():
+    """(queue, queued, active) for every place inference work waits"""
+    rows = [
+        (f"admission_{name}", gate.stats()["queued"], gate.active)
+        for name, gate in admission_gates.items()
+    ]
+    if emotion_batcher is not None:
+        batcher = emotion_batcher.stats()
+        rows.append(("emotion_batcher", batcher["queued"], batcher["in_flight"]))
+    if inference_executor is not None:
+        for name, pool in inference_executor.stats().items():
+            rows.append((f"executor_{name}", pool["queued"], pool["active"]))
+    if isinstance(aligner_model, AlignerProcessPool):
+        pool = aligner_model.stats()
+        rows.append(("aligner_pool", pool["queued"], pool["busy"]))
+    return rows
+
+
+metrics.gauge_callback(
+    "in_flight_requests",
+    "HTTP requests being handled, by path",
+    ["path"],
+    lambda: [((path,), count) for path, count in list(http_in_flight.items())],
+)
+metrics.gauge_callback(
+    "queue_depth",
+    "Work items waiting, by queue",
+    ["queue"],
+    lambda: [((queue,), queued) for queue, queued, _ in _collect_queues()],
+)
+metrics.gauge_callback(
+    "queue_active",
+    "Work items running (or batches in flight), by queue",
+    ["queue"],
+    lambda: [((queue,), active) for queue, _, active in _collect_queues()],
+)
+metrics.counter_callback(
+    "cache_hits_total",
+    "Cache hits",
+    ["cache"],
+    lambda: [((name,), cache["hits"]) for name, cache in _collect_caches().items()],
+)
+metrics.counter_callback(
+    "cache_misses_total",
+    "Cache misses",
+    ["cache"],
+    lambda: [((name,), cache["misses"]) for name, cache in _collect_caches().items()],
+)
+metrics.gauge_callback(
+    "cache_hit_ratio",
+    "Cache hits / lookups since start",
+    ["cache"],
+    lambda: [((name,), cache["hit_rate"]) for name, cache in _collect_caches().items()],
+)
+metrics.gauge_callback(
+    "cache_entries",
+    "Entries held in each cache",
+    ["cache"],
+    lambda: [((name,), cache["size"]) for name, cache in _collect_caches().items()],
+)
+metrics.counter_callback(
+    "admission_rejected_total",
+    "Requests shed by admission control",
+    ["gate", "reason"],
+    lambda: [
+        ((name, reason), count)
+        for name, gate in admission_gates.items()
+        for reason, count in gate.stats()["rejected"].items()
+    ],
+)
+metrics.counter_callback(
+    "requests_cancelled_total",
+    "Requests cut short by their deadline or a client disconnect",
+    ["reason"],
+    lambda: [((reason,), count) for reason, count in deadline_stats().items()],
+)
+metrics.gauge_callback(
+    "model_ready",
+    "1 if the model is loaded",
+    ["model"],
+    lambda: [((name,), state == READY) for name, state in model_registry.states().items()],
+)
+metrics.gauge_callback(
+    "process_resident_memory_bytes",
+    "Resident set size of this process",
+    [],
+    lambda: [((), process_stats()["rss_bytes"])],
+)
+metrics.gauge_callback(
+    "process_threads",
+    "OS threads in this process (includes torch / tokenizer native threads)",
+    [],
+    lambda: [((), process_stats()["os_threads"])],
+)
+metrics.gauge_callback(
+    "process_python_threads",
+    "Live Python threads",
+    [],
+    lambda: [((), process_stats()["python_threads"])],
+)
+metrics.counter_callback(
+    "process_cpu_seconds_total",
+    "User + system CPU time of this process",
+    [],
+    lambda: [((), process_stats()["cpu_seconds"])],
+)
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text-format metrics"""
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+def _require_admin(request: Request, seconds: float):
+    """404 unless admin endpoints are enabled, 403 without the token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    supplied = request.headers.get("authorization", "")
+    if not hmac.compare_digest(supplied.encode(), f"Bearer {ADMIN_TOKEN}".encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+    if seconds > PROFILE_MAX_S:
+        raise HTTPException(
+            status_code=400, detail=f"seconds must be at most {PROFILE_MAX_S:g}"
+        )
+
+
+@app.get("/debug/profile")
+async def profile_endpoint(
+    request: Request,
+    seconds: float = Query(10.0, gt=0),
+    mode: str = Query("wall"),
+    interval_ms: float = Query(10.0, ge=1, le=1000),
+):
+    """
+    Sample every thread's Python stack for `seconds` (admin only)
+
+    Returns collapsed stacks (one "thread;outer;...;inner count" line per
+    distinct stack) for flamegraph.pl / speedscope. mode=cpu leaves out
+    threads that were waiting rather than running.
+    """
+    _require_admin(request, seconds)
+
+    try:
+        profiler = SamplingProfiler(interval_ms / 1000, mode)
+        profiler.start()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    logger.info(f"Sampling profile: {seconds:g}s, {mode}, every {interval_ms:g}ms")
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        stacks = profiler.stop()
+
+    return Response(
+        content=stacks,
+        media_type="text/plain; charset=utf-8",
+        headers={"X-Profile-Samples": str(profiler.samples)},
+    )
+
+
+@app.get("/debug/profile/torch")
+async def torch_profile_endpoint(request: Request, seconds: float = Query(5.0, gt=0)):
+    """
+    Record a torch.profiler trace of the inference worker pools (admin only)
+
+    Returns Chrome trace JSON (open in Perfetto or chrome://tracing) of the
+    pool jobs that start within `seconds`, one track per worker thread.
+    Tokenize / forward / align / ... stages appear as labelled ranges.
+    """
+    _require_admin(request, seconds)
+
+    logger.info(f"torch profile: {seconds:g}s")
+    try:
+        trace = await TorchProfile(cuda=DEVICE == "cuda").record(seconds)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return JSONResponse(content=trace)
+
+
+def _overloaded(e: Overloaded) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=f"Server overloaded ({e.reason})",
+        headers={"Retry-After": str(math.ceil(e.retry_after))},
+    )
+
+
+def _check_admission(gate: str):
+    """Fail with 429 now if the gate would shed the request (takes no slot)"""
+    try:
+        admission_gates[gate].check(remaining())
+    except Overloaded as e:
+        raise _overloaded(e)
+
+
+@asynccontextmanager
+async def _admission(gate: str):
+    """Hold a slot on an admission gate for the request, or fail with 429"""
+    wait_start = time.perf_counter_ns()
+    try:
+        await admission_gates[gate].acquire(remaining())
+    except Overloaded as e:
+        raise _overloaded(e)
+    waited = time.perf_counter_ns() - wait_start
+    QUEUE_WAIT.observe(waited / 1e9, f"admission_{gate}")
+    record_timing("queue", waited)
+
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        admission_gates[gate].release(time.monotonic() - start)
+        handler_done()
+
+
+async def _run_admitted(gate: str, fn, *args, **kwargs) -> Any:
+    """Run one WebSocket work item on an admission gate (raises Overloaded)"""
+    async with admission_gates[gate].slot():
+        return await fn(*args, **kwargs)
+
+
+def _overloaded_event(e: Overloaded, **fields) -> Dict[str, Any]:
+    """WebSocket counterpart of a 429 response"""
+    return {
+        "type": "error",
+        **fields,
+        "detail": f"Server overloaded ({e.reason})",
+        "retry_after": math.ceil(e.retry_after),
+    }
+
+
+async def _stored_emotions(texts: List[str]) -> List[Optional[List[Dict[str, Any]]]]:
+    """Look memory-cache misses up in the emotion store, off the event loop"""
+    store = emotion_cache.store
+    if store is None or not store.ready:
+        # Nothing to read; only counts the misses
+        return emotion_cache.get_stored(EMOTION_MODEL_ID, texts)
+    return await asyncio.to_thread(emotion_cache.get_stored, EMOTION_MODEL_ID, texts)
+
+
+async def _detect_emotion_text(text: str) -> EmotionResponse:
+    """Classify one text through the cache and micro-batcher"""
+    if not text or not text.strip():
+        return _neutral_emotion_response()
+
+    start_time = time.perf_counter()
+    text = text.strip()
+
+    results = emotion_cache.get_memory(EMOTION_MODEL_ID, text)
+    if results is None:
+        (results,) = await _stored_emotions([text])
+    if results is None:
+        # Run inference (batched with any concurrent requests)
+        results = await emotion_batcher.submit(
+            (text, timings_current.get(), time.perf_counter_ns())
+        )
+        emotion_cache.put(EMOTION_MODEL_ID, text, results)
+
+    processing_time = (time.perf_counter() - start_time) * 1000
+
+    return _emotion_response(results, processing_time)
+
+
 @app.post("/emotion/detect", response_model=EmotionResponse)
 async def detect_emotion(request: EmotionRequest):
     """
@@ -176,128 +1086,918 @@ async def detect_emotion(request: EmotionRequest):
 
     Returns the top emotion and all emotion scores
     """
-    import time
+    if not emotion_model or not emotion_batcher:
+        raise HTTPException(status_code=503, detail="Emotion model not loaded")
+
+    async with _admission("emotion"):
+        try:
+            return await _detect_emotion_text(request.text)
+
+        except Exception as e:
+            logger.error(f"Emotion detection failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
+
+
+@app.post("/emotion/detect/batch", response_model=EmotionBatchResponse)
+async def detect_emotion_batch(request: EmotionBatchRequest):
+    """
+    Detect emotion for many texts in one request
 
-    if not emotion_model:
+    Texts are scored in chunks of EMOTION_BATCH_CHUNK_SIZE. Results come back
+    in request order; each item's processing_time_ms is its share of the
+    chunk it was scored in.
+    """
+    if not emotion_model or inference_executor is None:
         raise HTTPException(status_code=503, detail="Emotion model not loaded")
 
-    if not request.text or not request.text.strip():
-        return EmotionResponse(
-            emotion="neutral",
-            confidence=1.0,
-            all_emotions=[{"label": "neutral", "score": 1.0}],
-            processing_time_ms=0.0,
+    if len(request.texts) > EMOTION_BATCH_MAX_TEXTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many texts: {len(request.texts)} "
+            f"(max {EMOTION_BATCH_MAX_TEXTS})",
         )
 
+    async with _admission("emotion_batch"):
+        next_prepared = None
+        try:
+            start_time = time.perf_counter()
+
+            responses: List[Optional[EmotionResponse]] = [None] * len(request.texts)
+            pending = []  # (index, stripped text)
+            for i, text in enumerate(request.texts):
+                if not text or not text.strip():
+                    responses[i] = _neutral_emotion_response()
+                    continue
+
+                text = text.strip()
+                cached = emotion_cache.get_memory(EMOTION_MODEL_ID, text)
+                if cached is not None:
+                    responses[i] = _emotion_response(cached, 0.0)
+                else:
+                    pending.append((i, text))
+
+            # One store query for all the memory misses
+            if pending:
+                stored = await _stored_emotions([text for _, text in pending])
+                misses = []
+                for (i, text), cached in zip(pending, stored):
+                    if cached is not None:
+                        responses[i] = _emotion_response(cached, 0.0)
+                    else:
+                        misses.append((i, text))
+                pending = misses
+
+            chunks = [
+                pending[offset : offset + EMOTION_BATCH_CHUNK_SIZE]
+                for offset in range(0, len(pending), EMOTION_BATCH_CHUNK_SIZE)
+            ]
+
+            # Tokenize the next chunk while the current one is on the model
+            if chunks:
+                next_prepared = asyncio.ensure_future(
+                    _tokenize_batch([text for _, text in chunks[0]])
+                )
+
+            for n, chunk in enumerate(chunks):
+                chunk_start = time.perf_counter()
+
+                prepared = await next_prepared
+                if n + 1 < len(chunks):
+                    next_prepared = asyncio.ensure_future(
+                        _tokenize_batch([text for _, text in chunks[n + 1]])
+                    )
+
+                results = await inference_executor.run(
+                    "emotion", _score_batch, prepared, len(chunk)
+                )
+
+                item_time = (time.perf_counter() - chunk_start) * 1000 / len(chunk)
+                for (i, text), result in zip(chunk, results):
+                    emotion_cache.put(EMOTION_MODEL_ID, text, result)
+                    responses[i] = _emotion_response(result, item_time)
+
+            processing_time = (time.perf_counter() - start_time) * 1000
+
+            return EmotionBatchResponse(
+                results=responses, processing_time_ms=processing_time
+            )
+
+        except Exception as e:
+            logger.error(f"Batch emotion detection failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
+
+        finally:
+            # Don't leave a prefetch running if the request was cut short
+            if next_prepared is not None and not next_prepared.done():
+                next_prepared.cancel()
+
+
+@app.websocket("/emotion/stream")
+async def emotion_stream(websocket: WebSocket):
+    """
+    Incremental emotion detection over a WebSocket
+
+    Client sends JSON messages:
+      {"type": "token", "text": "..."}  - streamed LLM output
+      {"type": "flush"}                 - end of reply, classify the remainder
+      {"type": "reset"}                 - drop buffered text
+
+    Server pushes one event per completed sentence / clause:
+      {"type": "emotion", "index": n, "text": "...", "emotion": ..., ...}
+    and {"type": "flushed"} once everything before a flush has been sent.
+    A chunk shed by the "emotion" admission gate gets an error event with
+    "index" and "retry_after" instead.
+    """
+    await websocket.accept()
+
+    if not emotion_model or not emotion_batcher:
+        await websocket.send_json({"type": "error", "detail": "Emotion model not loaded"})
+        await websocket.close(code=1013)
+        return
+
+    segmenter = SentenceSegmenter(
+        min_clause_chars=STREAM_MIN_CLAUSE_CHARS, max_chars=STREAM_MAX_CHUNK_CHARS
+    )
+    # Chunks are classified concurrently but sent back in order
+    outbox: asyncio.Queue = asyncio.Queue()
+    next_index = 0
+
+    def enqueue(chunk: str):
+        nonlocal next_index
+        # Each chunk takes an "emotion" slot, like a /emotion/detect request
+        task = asyncio.create_task(_run_admitted("emotion", _detect_emotion_text, chunk))
+        outbox.put_nowait(("emotion", next_index, chunk, task))
+        next_index += 1
+
+    async def sender():
+        while True:
+            kind, index, chunk, task = await outbox.get()
+            if kind == "flushed":
+                await websocket.send_json({"type": "flushed"})
+                continue
+            try:
+                result = await task
+            except Overloaded as e:
+                await websocket.send_json(_overloaded_event(e, index=index))
+                continue
+            except Exception as e:
+                logger.error(f"Streaming emotion detection failed: {e}")
+                await websocket.send_json(
+                    {"type": "error", "index": index, "detail": str(e)}
+                )
+                continue
+            await websocket.send_json(
+                {"type": "emotion", "index": index, "text": chunk, **result.model_dump()}
+            )
+
+    sender_task = asyncio.create_task(sender())
     try:
-        start_time = time.time()
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                message = json.loads(raw)
+            except json.JSONDecodeError:
+                await websocket.send_json({"type": "error", "detail": "Invalid JSON"})
+                continue
+
+            kind = message.get("type")
+            if kind == "token":
+                for chunk in segmenter.push(str(message.get("text", ""))):
+                    enqueue(chunk)
+            elif kind == "flush":
+                chunk = segmenter.flush()
+                if chunk:
+                    enqueue(chunk)
+                outbox.put_nowait(("flushed", None, None, None))
+            elif kind == "reset":
+                segmenter.reset()
+            else:
+                await websocket.send_json(
+                    {"type": "error", "detail": f"Unknown message type: {kind}"}
+                )
+
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender_task.cancel()
+        while not outbox.empty():
+            _, _, _, task = outbox.get_nowait()
+            if task is not None:
+                task.cancel()
+
+
+def _load_aligner():
+    """Construct the BFA aligner (blocking)"""
+    from bournemouth_aligner import PhonemeTimestampAligner
+
+    return PhonemeTimestampAligner(
+        preset=ALIGNER_PRESET,
+        device=DEVICE,
+        duration_max=ALIGNER_DURATION_MAX_S,
+    )
 
-        # Run inference
-        results = emotion_model(request.text.strip())
 
-        # Handle different output formats
-        if isinstance(results, list) and len(results) > 0:
-            if isinstance(results[0], list):
-                results = results[0]  # Nested list format
+def _aligner_sample_rate() -> int:
+    if isinstance(aligner_model, AlignerProcessPool):
+        return aligner_model.sample_rate
+    return getattr(aligner_model, "resampler_sample_rate", ALIGNER_SAMPLE_RATE)
 
-        # Sort by score descending
-        results = sorted(results, key=lambda x: x["score"], reverse=True)
 
-        top_result = results[0]
+def _load_audio_file(audio_path: str) -> "torch.Tensor":
+    """Load an audio file with BFA's loader (blocking)"""
+    if isinstance(aligner_model, AlignerProcessPool):
+        # BFA lives in the worker processes; decode here instead
+        with open(audio_path, "rb") as f:
+            return _decode_audio(f.read())
+    with stage("audio_decode", STAGE_DURATION), annotate("audio_decode"):
+        return aligner_model.load_audio(audio_path)
 
-        processing_time = (time.time() - start_time) * 1000
 
-        return EmotionResponse(
-            emotion=top_result["label"],
-            confidence=top_result["score"],
-            all_emotions=results,
-            processing_time_ms=processing_time,
+def _decode_audio(data: bytes, **decode_args) -> "torch.Tensor":
+    """Decode audio bytes in memory at the aligner's sample rate (blocking)"""
+    with stage("audio_decode", STAGE_DURATION), annotate("audio_decode"):
+        return decode_audio_bytes(data, target_rate=_aligner_sample_rate(), **decode_args)
+
+
+def _align_waveform(text: str, audio_wav: "torch.Tensor") -> Dict[str, Any]:
+    """Run BFA alignment on an already-decoded waveform (blocking)"""
+    with stage("align", STAGE_DURATION), annotate("align"):
+        return aligner_model.process_sentence(
+            text=text, audio_wav=audio_wav, do_groups=True, debug=False
         )
 
-    except Exception as e:
-        logger.error(f"Emotion detection failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
+
+def _aligner_busy(e: AlignerBusy) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Alignment queue is full",
+        headers={"Retry-After": str(math.ceil(e.retry_after))},
+    )
 
 
-@app.post("/align/phonemes", response_model=AlignResponse)
-async def align_phonemes(request: AlignRequest):
+def _admit_alignment():
+    """Reject a new alignment request up front if the process pool is full"""
+    if isinstance(aligner_model, AlignerProcessPool):
+        try:
+            aligner_model.check_capacity()
+        except AlignerBusy as e:
+            raise _aligner_busy(e)
+
+
+async def _align(
+    text: str, audio_wav: "torch.Tensor", admitted: bool = False
+) -> Dict[str, Any]:
     """
-    Align phonemes to audio using Bournemouth Forced Aligner (BFA)
+    Align a decoded waveform on the process pool or the aligner threads
+
+    Pool back-pressure surfaces as HTTP errors: 429 when the queue is full
+    (unless the request was already admitted), 504 when a job times out and
+    503 when its worker process died.
+    """
+    if not isinstance(aligner_model, AlignerProcessPool):
+        return await inference_executor.run("aligner", _align_waveform, text, audio_wav)
+
+    samples = audio_wav.reshape(-1).float().cpu().numpy()
+    try:
+        return await aligner_model.align(text, samples, wait=admitted)
+    except AlignerBusy as e:
+        raise _aligner_busy(e)
+    except AlignerTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except AlignerCrashed as e:
+        raise HTTPException(status_code=503, detail=f"Aligner process crashed: {e}")
+
+
+def _plan_windows(text: str, audio_wav: "torch.Tensor") -> List[AlignWindow]:
+    """Plan long-form alignment windows (blocking)"""
+    samples = audio_wav.reshape(-1).float().cpu().numpy()
+    return plan_windows(
+        samples,
+        _aligner_sample_rate(),
+        text,
+        window_s=ALIGN_WINDOW_S,
+        pad_s=ALIGN_WINDOW_PAD_S,
+    )
+
+
+def _warm_up_aligner(model):
+    """Run one alignment on a short synthetic clip (blocking)"""
+    import torch
+
+    sample_rate = getattr(model, "resampler_sample_rate", ALIGNER_SAMPLE_RATE)
+    t = torch.arange(sample_rate, dtype=torch.float32) / sample_rate
+    clip = (0.1 * torch.sin(2 * torch.pi * 220 * t)).unsqueeze(0)
+    model.process_sentence(text="hello", audio_wav=clip, do_groups=True, debug=False)
+
+
+def _build_emotion_model():
+    """Load the emotion pipeline and set up its tokenizer stage (blocking)"""
+    global emotion_backend, emotion_tokenizer, emotion_length_limits
+
+    if EMOTION_TRUNCATION not in VALID_TRUNCATION_SIDES:
+        raise ValueError(
+            f"Invalid ML_BACKEND_EMOTION_TRUNCATION '{EMOTION_TRUNCATION}' "
+            f"(expected one of {', '.join(VALID_TRUNCATION_SIDES)})"
+        )
+
+    logger.info(f"Loading emotion model: {EMOTION_MODEL_ID} ({EMOTION_BACKEND})")
+    model, emotion_backend = load_emotion_pipeline(
+        EMOTION_BACKEND, EMOTION_MODEL_ID, DEVICE, EMOTION_ONNX_DIR
+    )
+
+    max_length = min(EMOTION_MAX_SEQ_LEN, model.tokenizer.model_max_length)
+    emotion_tokenizer = EmotionTokenizer(
+        model.tokenizer,
+        max_length,
+        truncation_side=EMOTION_TRUNCATION,
+        cache_size=TOKEN_CACHE_SIZE,
+    )
+    emotion_length_limits = length_buckets(max_length)
 
-    Takes audio file path and text, returns precise phoneme timestamps
+    if emotion_cache.store is not None:
+        # Stored scores are only valid for this exact model and tokenization
+        revision = getattr(model.model.config, "_commit_hash", None) or "local"
+        try:
+            emotion_cache.store.open(
+                f"{EMOTION_MODEL_ID}@{revision}/{emotion_backend}/"
+                f"{max_length}/{EMOTION_TRUNCATION}"
+            )
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Emotion store disabled ({EMOTION_CACHE_DB}: {e})")
+    return model
+
+
+async def _load_emotion_model():
+    """Registry loader for the emotion pipeline"""
+    await _ensure_runtime()
+
+    load_start = time.perf_counter()
+    model = await inference_executor.run("emotion", _build_emotion_model)
+    model_load_times_ms["emotion"] = (time.perf_counter() - load_start) * 1000
+    return model
+
+
+async def _load_aligner_model():
     """
-    import time
+    Registry loader for the BFA aligner (load and optional warm-up)
+
+    The model is only published once warm-up has finished, so the first
+    real request doesn't pay for lazy CUDA/kernel initialization. A lazy
+    load skips warm-up since a request is already waiting on it.
+    """
+    await _ensure_runtime()
+
+    if ALIGNER_PROCESSES > 0:
+        logger.info(f"Starting {ALIGNER_PROCESSES} BFA aligner processes...")
+        load_start = time.perf_counter()
+        pool = AlignerProcessPool(
+            ALIGNER_PROCESSES,
+            queue_limit=ALIGN_QUEUE_LIMIT,
+            job_timeout_s=ALIGN_JOB_TIMEOUT_S,
+            preset=ALIGNER_PRESET,
+            device=DEVICE,
+            duration_max=ALIGNER_DURATION_MAX_S,
+            warmup=ALIGNER_WARMUP and ALIGNER_STARTUP != "lazy",
+            threads_per_process=ALIGNER_PROCESS_THREADS,
+            on_job=_observe_aligner_job,
+        )
+        await pool.start()
+        model_load_times_ms["aligner"] = (time.perf_counter() - load_start) * 1000
+        return pool
+
+    if preforked_aligner is not None:
+        # Loaded by the pre-fork parent; warmed up here, in this worker
+        model = preforked_aligner
+    else:
+        logger.info("Initializing BFA aligner...")
+        load_start = time.perf_counter()
+        model = await inference_executor.run("aligner", _load_aligner)
+        model_load_times_ms["aligner"] = (time.perf_counter() - load_start) * 1000
+
+    if ALIGNER_WARMUP and ALIGNER_STARTUP != "lazy":
+        warmup_start = time.perf_counter()
+        try:
+            await inference_executor.run("aligner", _warm_up_aligner, model)
+            model_load_times_ms["aligner_warmup"] = (
+                time.perf_counter() - warmup_start
+            ) * 1000
+        except Exception as e:
+            logger.warning(f"BFA warm-up failed (continuing): {e}")
 
+    logger.info(f"✓ BFA aligner initialized in {model_load_times_ms['aligner']:.0f}ms")
+    return model
+
+
+model_registry.register("emotion", _load_emotion_model)
+model_registry.register("aligner", _load_aligner_model)
+
+
+def preload_models() -> bool:
+    """
+    Load models before any event loop or worker exists (blocking)
+
+    Used by the pre-fork server: forked workers inherit the loaded weights
+    copy-on-write instead of each loading their own copy. CPU only, since a
+    CUDA context can't be used across fork; returns False (and loads
+    nothing) when CUDA is available.
+    """
+    global DEVICE, preforked_aligner
+
+    _check_aligner_startup()
+
+    import torch
+
+    if torch.cuda.is_available():
+        logger.warning("CUDA available: workers will load their own models")
+        return False
+
+    DEVICE = _init_runtime()
+
+    load_start = time.perf_counter()
+    try:
+        model_registry.set_ready("emotion", _build_emotion_model())
+        model_load_times_ms["emotion"] = (time.perf_counter() - load_start) * 1000
+        logger.info("✓ Emotion model preloaded")
+    except Exception as e:
+        # As without pre-forking: keep serving. The model stays not ready
+        # and each worker's registry tries the load again itself
+        logger.error(f"✗ Failed to preload emotion model: {e}")
+
+    # SQLite connections and the writer thread can't cross fork; the
+    # workers reopen the store for the same model version
+    if emotion_cache.store is not None:
+        emotion_cache.store.close()
+
+    # No warm-up here: running inference before fork leaves thread pools
+    # in the parent that the workers can't use. Each worker's registry
+    # loader warms up its inherited copy before publishing it. A process
+    # pool is started by each worker instead
+    if ALIGNER_STARTUP != "lazy" and ALIGNER_PROCESSES == 0:
+        load_start = time.perf_counter()
+        try:
+            preforked_aligner = _load_aligner()
+            model_load_times_ms["aligner"] = (time.perf_counter() - load_start) * 1000
+        except Exception as e:
+            logger.error(f"✗ Failed to preload BFA aligner: {e}")
+
+    return True
+
+
+async def _preload_aligner():
+    """Startup aligner load; failures are reported on /health, not raised"""
     global aligner_model
 
-    # Lazy load BFA aligner
+    try:
+        aligner_model = await model_registry.get("aligner")
+    except Exception:
+        pass
+
+
+async def _ensure_aligner():
+    """Load the BFA aligner once, raising 503 if it isn't available"""
+    global aligner_model
+
+    if inference_executor is None:
+        raise HTTPException(status_code=503, detail="Service not ready")
+
     if aligner_model is None:
         try:
-            logger.info("Initializing BFA aligner...")
-            from bournemouth_aligner import PhonemeTimestampAligner
-
-            aligner_model = PhonemeTimestampAligner(
-                preset="en-us",
-                device=DEVICE,
-                duration_max=30,  # Max 30 seconds
+            aligner_model = await model_registry.get("aligner")
+        except ModelUnavailable as e:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Aligner unavailable: {e.detail}",
+                headers={"Retry-After": str(math.ceil(e.retry_after or 1))},
             )
-            logger.info("✓ BFA aligner initialized")
         except Exception as e:
-            logger.error(f"Failed to initialize BFA: {e}")
             raise HTTPException(
                 status_code=503, detail=f"Aligner initialization failed: {str(e)}"
             )
 
+
+def _alignment_response(
+    timestamps: Dict[str, Any], processing_time: float
+) -> AlignResponse:
+    """Convert BFA output (all segments) into an AlignResponse"""
+    phonemes = []
+    words = []
+
+    with stage("postprocess", STAGE_DURATION), annotate("postprocess"):
+        segments = timestamps.get("segments", []) if timestamps else []
+        for segment in segments:
+            # Extract phoneme timestamps
+            for ph in segment.get("phoneme_ts", []):
+                phonemes.append(
+                    PhonemeTimestamp(
+                        phoneme=ph.get("phoneme_label", ""),
+                        ipa=ph.get("phoneme_label", ""),  # BFA uses IPA labels
+                        start_ms=ph.get("start_ms", 0),
+                        end_ms=ph.get("end_ms", 0),
+                        confidence=ph.get("confidence", 0),
+                    )
+                )
+
+            # Extract word timestamps
+            words.extend(segment.get("words_ts", []))
+
+    return AlignResponse(
+        phonemes=phonemes, words=words, processing_time_ms=processing_time
+    )
+
+
+def _offset_alignment(response: AlignResponse, offset_ms: float) -> AlignResponse:
+    """Shift all timestamps in an alignment by offset_ms"""
+    for ph in response.phonemes:
+        ph.start_ms += offset_ms
+        ph.end_ms += offset_ms
+
+    words = []
+    for word in response.words:
+        word = dict(word)
+        for key in ("start_ms", "end_ms"):
+            if isinstance(word.get(key), (int, float)):
+                word[key] += offset_ms
+        words.append(word)
+    response.words = words
+
+    return response
+
+
+async def _align_window(
+    window: AlignWindow, audio_wav: "torch.Tensor", sample_rate: int
+) -> AlignResponse:
+    """Align one long-form window, clamping its timestamps into its own region"""
+    if not window.text:
+        # A time slice around a word that another slice was given
+        return AlignResponse(phonemes=[], words=[], processing_time_ms=0.0)
+
+    audio_slice = audio_wav[..., window.slice_start : window.slice_end]
+    timestamps = await _align(window.text, audio_slice, admitted=True)
+
+    result = _offset_alignment(
+        _alignment_response(timestamps, 0.0), window.slice_start * 1000 / sample_rate
+    )
+
+    # The window's words are its own, so items in the padding are pulled in
+    # rather than dropped
+    lo_ms = window.start * 1000 / sample_rate
+    hi_ms = window.end * 1000 / sample_rate
+    for ph in result.phonemes:
+        ph.start_ms, ph.end_ms = clamp_span(ph.start_ms, ph.end_ms, lo_ms, hi_ms)
+    for word in result.words:
+        if isinstance(word.get("start_ms"), (int, float)) and isinstance(
+            word.get("end_ms"), (int, float)
+        ):
+            word["start_ms"], word["end_ms"] = clamp_span(
+                word["start_ms"], word["end_ms"], lo_ms, hi_ms
+            )
+    return result
+
+
+async def _run_alignment(
+    text: str, audio_wav: "torch.Tensor", admission: AsyncContextManager
+) -> AlignResponse:
+    """
+    Align a decoded waveform, reusing the cached result for repeated audio
+
+    The cache is checked first and only a miss enters `admission` (an
+    "align" slot), so repeats are served while the aligner is saturated.
+    """
+    if not alignment_cache.enabled:
+        async with admission:
+            return await _compute_alignment(text, audio_wav)
+
+    samples = audio_wav.reshape(-1).float().cpu().numpy()
+    key = await asyncio.to_thread(alignment_cache.key, text, samples, _aligner_sample_rate())
+
+    cached = alignment_cache.get(key)
+    if cached is None:
+        cached = await asyncio.to_thread(alignment_cache.get_disk, key)
+    if cached is not None:
+        return AlignResponse(**cached, processing_time_ms=0.0)
+
+    async with admission:
+        response = await _compute_alignment(text, audio_wav)
+    result = response.model_dump(include={"phonemes", "words"})
+    alignment_cache.put(key, result)
+    if alignment_cache.disk_dir:
+        await asyncio.to_thread(alignment_cache.put_disk, key, result)
+    return response
+
+
+async def _compute_alignment(text: str, audio_wav: "torch.Tensor") -> AlignResponse:
+    """
+    Align a decoded waveform, splitting long audio into windows
+
+    Windows are dispatched together and run on the aligner pool, so at most
+    ALIGNER_WORKERS (or ALIGNER_PROCESSES) of them are on the model at once.
+    """
+    sample_rate = _aligner_sample_rate()
+    duration_s = audio_wav.shape[-1] / sample_rate
+
+    if duration_s <= ALIGN_WINDOW_S:
+        timestamps = await _align(text, audio_wav)
+        return _alignment_response(timestamps, 0.0)
+
+    # Admit the request once; its windows then queue behind each other
+    _admit_alignment()
+    windows = await inference_executor.run("aligner", _plan_windows, text, audio_wav)
+    logger.info(
+        f"Long-form alignment: {duration_s:.1f}s audio in {len(windows)} windows"
+    )
+
+    results = await asyncio.gather(
+        *[_align_window(window, audio_wav, sample_rate) for window in windows]
+    )
+
+    phonemes = []
+    words = []
+    for result in results:
+        phonemes.extend(result.phonemes)
+        words.extend(result.words)
+
+    return AlignResponse(phonemes=phonemes, words=words, processing_time_ms=0.0)
+
+
+async def _align_bytes(
+    text: str, data: bytes, admission: AsyncContextManager, **decode_args
+) -> AlignResponse:
+    """Shared path for the in-memory alignment endpoints"""
+    await _ensure_aligner()
+
+    try:
+        start_time = time.perf_counter()
+
+        audio_wav = await inference_executor.run(
+            "audio", _decode_audio, data, **decode_args
+        )
+        response = await _run_alignment(text, audio_wav, admission)
+
+        response.processing_time_ms = (time.perf_counter() - start_time) * 1000
+        return response
+
+    except (HTTPException, Overloaded):
+        raise
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid audio: {str(e)}")
+    except Exception as e:
+        logger.error(f"Phoneme alignment failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Alignment failed: {str(e)}")
+
+
+@app.post("/align/phonemes", response_model=AlignResponse)
+async def align_phonemes(request: AlignRequest):
+    """
+    Align phonemes to audio using Bournemouth Forced Aligner (BFA)
+
+    Takes audio file path and text, returns precise phoneme timestamps.
+    Audio longer than ALIGN_WINDOW_S is aligned in windows and stitched.
+    """
+    await _ensure_aligner()
+
     if not os.path.exists(request.audio_path):
         raise HTTPException(
             status_code=400, detail=f"Audio file not found: {request.audio_path}"
         )
 
     try:
-        start_time = time.time()
+        start_time = time.perf_counter()
 
-        # Load audio
-        audio_wav = aligner_model.load_audio(request.audio_path)
+        # Decode on the audio pool; only a cache miss takes an "align" slot
+        audio_wav = await inference_executor.run(
+            "audio", _load_audio_file, request.audio_path
+        )
+        response = await _run_alignment(request.text, audio_wav, _admission("align"))
+
+        response.processing_time_ms = (time.perf_counter() - start_time) * 1000
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Phoneme alignment failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Alignment failed: {str(e)}")
+
+
+def _form_int(form, name: str) -> Optional[int]:
+    """Optional integer field of a parsed form (422 if malformed)"""
+    value = form.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=422, detail=f"Invalid form field: {name}")
+
+
+@app.post("/align/phonemes/upload", response_model=AlignResponse)
+async def align_phonemes_upload(request: Request):
+    """
+    Align phonemes to uploaded audio (multipart/form-data)
+
+    Form fields:
+      text           - transcript (required)
+      audio          - a WAV/FLAC/OGG file, or raw PCM when sample_rate is given
+      sample_rate, channels, sample_format - describe raw PCM
+    The form is parsed here rather than by FastAPI, so a request shed by
+    admission control is rejected before its upload is read.
+    """
+    _check_admission("align")
+    with stage("receive"):
+        form = await request.form()
+    try:
+        text = form.get("text")
+        audio = form.get("audio")
+        if not isinstance(text, str) or not text:
+            raise HTTPException(status_code=422, detail="Missing form field: text")
+        if audio is None or isinstance(audio, str):
+            raise HTTPException(status_code=422, detail="Missing form file: audio")
 
-        # Process alignment
-        timestamps = aligner_model.process_sentence(
-            text=request.text, audio_wav=audio_wav, do_groups=True, debug=False
+        data = await audio.read()
+        return await _align_bytes(
+            text,
+            data,
+            _admission("align"),
+            content_type=audio.content_type,
+            sample_rate=_form_int(form, "sample_rate"),
+            channels=_form_int(form, "channels"),
+            sample_format=form.get("sample_format") or "s16",
         )
+    finally:
+        await form.close()
 
-        # Extract phoneme timestamps
-        phonemes = []
-        if timestamps and "segments" in timestamps and len(timestamps["segments"]) > 0:
-            segment = timestamps["segments"][0]
-
-            # Get phoneme timestamps
-            if "phoneme_ts" in segment:
-                for ph in segment["phoneme_ts"]:
-                    phonemes.append(
-                        PhonemeTimestamp(
-                            phoneme=ph.get("phoneme_label", ""),
-                            ipa=ph.get("phoneme_label", ""),  # BFA uses IPA labels
-                            start_ms=ph.get("start_ms", 0),
-                            end_ms=ph.get("end_ms", 0),
-                            confidence=ph.get("confidence", 0),
-                        )
-                    )
 
-        # Extract word timestamps
-        words = []
-        if timestamps and "segments" in timestamps and len(timestamps["segments"]) > 0:
-            segment = timestamps["segments"][0]
-            if "words_ts" in segment:
-                words = segment["words_ts"]
+@app.post("/align/phonemes/raw", response_model=AlignResponse)
+async def align_phonemes_raw(request: Request, text: str = Query(...)):
+    """
+    Align phonemes to audio sent as the request body
+
+    The body is a WAV/FLAC/OGG file, or raw PCM described by headers:
+      X-Sample-Rate    - required for raw PCM (or `audio/L16; rate=...`)
+      X-Channels       - interleaved channel count (default 1)
+      X-Sample-Format  - s16 (default) or f32, little-endian
+    `audio/L16` bodies are big-endian, as RFC 2586 defines them (add
+    `; endianness=little-endian` for little-endian L16).
+    """
+    headers = request.headers
+    try:
+        sample_rate = int(headers["x-sample-rate"]) if "x-sample-rate" in headers else None
+        channels = int(headers["x-channels"]) if "x-channels" in headers else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid audio format headers")
+
+    # Shed before reading the body so rejected requests don't buffer their
+    # audio; the slot itself is only taken if the cache misses
+    _check_admission("align")
+    with stage("receive"):
+        data = await request.body()
+    return await _align_bytes(
+        text,
+        data,
+        _admission("align"),
+        content_type=headers.get("content-type"),
+        sample_rate=sample_rate,
+        channels=channels,
+        sample_format=headers.get("x-sample-format", "s16"),
+    )
 
-        processing_time = (time.time() - start_time) * 1000
 
-        return AlignResponse(
-            phonemes=phonemes, words=words, processing_time_ms=processing_time
+@app.websocket("/align/stream")
+async def align_stream(websocket: WebSocket):
+    """
+    Streaming phoneme alignment for chunked TTS audio
+
+    Client sends:
+      {"type": "start", "sample_rate": 24000, "channels": 1,
+       "sample_format": "s16", "text": "full transcript"}   - first message
+      <binary frames>                  - raw little-endian PCM as TTS produces it
+      {"type": "segment", "text": "..."} - audio since the last mark speaks this
+      {"type": "end"}                  - align what's left, then close
+
+    Server pushes one event per region, in order, with global timestamps:
+      {"type": "phonemes", "segment": n, "text": "...", "offset_ms": ...,
+       "phonemes": [...], "words": [...], "processing_time_ms": ...}
+    followed by {"type": "done"} after "end". A segment shed by the "align"
+    admission gate gets an error event with "segment" and "retry_after".
+    """
+    await websocket.accept()
+
+    try:
+        await _ensure_aligner()
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "detail": e.detail})
+        await websocket.close(code=1013)
+        return
+
+    session: Optional[AlignmentStreamSession] = None
+    # Regions are aligned as soon as they're marked but sent back in order
+    outbox: asyncio.Queue = asyncio.Queue()
+
+    def enqueue(region: Optional[AudioRegion]):
+        if region is None:
+            return
+        # Each segment takes an "align" slot on a cache miss, like an
+        # /align/phonemes request
+        task = asyncio.create_task(
+            _align_bytes(
+                region.text,
+                region.data,
+                admission_gates["align"].slot(),
+                sample_rate=session.sample_rate,
+                channels=session.channels,
+                sample_format=session.sample_format,
+            )
         )
+        outbox.put_nowait((region, task))
 
-    except Exception as e:
-        logger.error(f"Phoneme alignment failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Alignment failed: {str(e)}")
+    async def sender():
+        while True:
+            region, task = await outbox.get()
+            if region is None:
+                await websocket.send_json({"type": "done"})
+                await websocket.close()
+                return
+            try:
+                result = _offset_alignment(await task, region.offset_ms)
+            except Overloaded as e:
+                await websocket.send_json(_overloaded_event(e, segment=region.index))
+                continue
+            except HTTPException as e:
+                await websocket.send_json(
+                    {"type": "error", "segment": region.index, "detail": e.detail}
+                )
+                continue
+            await websocket.send_json(
+                {
+                    "type": "phonemes",
+                    "segment": region.index,
+                    "text": region.text,
+                    "offset_ms": region.offset_ms,
+                    **result.model_dump(),
+                }
+            )
+
+    sender_task = asyncio.create_task(sender())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            if message.get("bytes") is not None:
+                if session is None:
+                    await websocket.send_json(
+                        {"type": "error", "detail": "Send a start message first"}
+                    )
+                    continue
+                try:
+                    session.append(message["bytes"])
+                except ValueError as e:
+                    await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+
+            try:
+                control = json.loads(message.get("text") or "")
+            except json.JSONDecodeError:
+                await websocket.send_json({"type": "error", "detail": "Invalid JSON"})
+                continue
+
+            kind = control.get("type")
+            if kind == "start":
+                try:
+                    session = AlignmentStreamSession(
+                        sample_rate=int(control.get("sample_rate", 0)),
+                        channels=int(control.get("channels", 1)),
+                        sample_format=control.get("sample_format", "s16"),
+                        transcript=str(control.get("text", "")),
+                        max_buffer_s=ALIGN_STREAM_MAX_BUFFER_S,
+                    )
+                except (TypeError, ValueError) as e:
+                    await websocket.send_json({"type": "error", "detail": str(e)})
+            elif session is None:
+                await websocket.send_json(
+                    {"type": "error", "detail": "Send a start message first"}
+                )
+            elif kind == "segment":
+                enqueue(session.commit(str(control.get("text", ""))))
+            elif kind == "end":
+                enqueue(session.finish())
+                outbox.put_nowait((None, None))
+                await sender_task
+                break
+            else:
+                await websocket.send_json(
+                    {"type": "error", "detail": f"Unknown message type: {kind}"}
+                )
+
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender_task.cancel()
+        while not outbox.empty():
+            _, task = outbox.get_nowait()
+            if task is not None:
+                task.cancel()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,297 @@
+#
+# Prometheus-style metrics
+#
+# Per-response processing_time_ms says how long a request took, not where
+# the time went. This module keeps latency histograms for each endpoint and
+# each stage of the hot paths (queue waits, tokenize, forward, post-process,
+# audio decode, align) plus batch sizes, and renders them together with
+# point-in-time values (cache counters, in-flight work, process RSS and
+# threads) in the Prometheus text exposition format for GET /metrics.
+#
+# Self-contained (no prometheus_client dependency): histograms are plain
+# bucket counters behind a lock, safe to observe from worker threads.
+# Process stats come from /proc on Linux, psutil elsewhere (resource as a
+# fallback on other POSIX systems without it).
+# Values are per process; with pre-forked workers each one reports its own.
+#
+
+import bisect
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Seconds; spans sub-millisecond cache hits to long-form alignment
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[str, ...]
+# A callback returns (label values, value) pairs for its metric
+Collector = Callable[[], Iterable[Tuple[Labels, float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination"""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # labels -> [bucket counts..., +Inf count], sum
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[labels] = series
+            series[0][index] += 1
+            series[1][0] += value
+
+    def time(self, *labels: str) -> "_Timer":
+        """Context manager that observes the elapsed seconds"""
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [
+                (labels, list(counts), total[0])
+                for labels, (counts, total) in self._series.items()
+            ]
+
+        for labels, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Counter:
+    """Monotonic counter, one series per label combination"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            )
+        return lines
+
+
+class Callback:
+    """Gauge or counter whose values are read at scrape time"""
+
+    def __init__(
+        self, name: str, kind: str, help: str, labelnames: Sequence[str], collect: Collector
+    ):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in self.collect():
+            if value is None:
+                continue
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            )
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self._metrics: List = []
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(f"{self.namespace}_{name}", help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(f"{self.namespace}_{name}", help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_callback(
+        self, name: str, help: str, labelnames: Sequence[str], collect: Collector
+    ):
+        self._metrics.append(
+            Callback(f"{self.namespace}_{name}", "gauge", help, labelnames, collect)
+        )
+
+    def counter_callback(
+        self, name: str, help: str, labelnames: Sequence[str], collect: Collector
+    ):
+        self._metrics.append(
+            Callback(f"{self.namespace}_{name}", "counter", help, labelnames, collect)
+        )
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:  # A broken collector shouldn't break the scrape
+                lines.append(f"# {metric.name}: collection failed: {e}")
+        return "\n".join(lines) + "\n"
+
+
+def process_stats() -> Dict[str, Optional[float]]:
+    """RSS, OS / Python thread counts and CPU seconds of this process"""
+    rss = None
+    threads = None
+    cpu = None
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = float(line.split()[1]) * 1024
+                elif line.startswith("Threads:"):
+                    threads = float(line.split()[1])
+    except OSError:
+        # Not Linux
+        if psutil is not None:
+            process = psutil.Process()
+            rss = float(process.memory_info().rss)
+            threads = float(process.num_threads())
+        elif resource is not None:
+            # Peak rather than current RSS (kilobytes on Linux/BSD, bytes on macOS)
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            rss = float(maxrss if sys.platform == "darwin" else maxrss * 1024)
+
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        cpu = usage.ru_utime + usage.ru_stime
+    elif psutil is not None:
+        times = psutil.Process().cpu_times()
+        cpu = times.user + times.system
+
+    return {
+        "rss_bytes": rss,
+        "os_threads": threads,
+        "python_threads": float(threading.active_count()),
+        "cpu_seconds": cpu,
+    }
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and tracks in-flight requests per path"""
+
+    def __init__(self, app, duration: Histogram, requests: Counter, in_flight: Dict[str, int]):
+        self.app = app
+        self.duration = duration
+        self.requests = requests
+        self.in_flight = in_flight
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        self.in_flight[path] = self.in_flight.get(path, 0) + 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_flight[path] -= 1
+            if not self.in_flight[path]:
+                del self.in_flight[path]
+            # Label by route template so unknown paths don't add series
+            endpoint = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.duration.observe(time.perf_counter() - start, endpoint)
+            self.requests.inc(endpoint, status)
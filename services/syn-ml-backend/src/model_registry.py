@@ -0,0 +1,162 @@
+#
+# Single-flight model registry
+#
+# Each model moves through: unloaded -> loading -> ready
+#                                             \-> failed -> (backoff) -> loading
+#
+# - Concurrent callers during a load all wait on the same load task instead
+#   of each constructing their own copy (which would double peak memory)
+# - A failed load is not retried until its backoff expires; callers get a
+#   ModelUnavailable with a retry-after hint instead
+#
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+UNLOADED = "unloaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+Loader = Callable[[], Awaitable[Any]]
+
+
+class ModelUnavailable(Exception):
+    """A model failed to load and is waiting out its retry backoff"""
+
+    def __init__(self, name: str, detail: str, retry_after: Optional[float] = None):
+        super().__init__(f"{name}: {detail}")
+        self.name = name
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class _Slot:
+    def __init__(self, name: str, loader: Loader):
+        self.name = name
+        self.loader = loader
+        self.state = UNLOADED
+        self.model: Any = None
+        self.task: Optional[asyncio.Task] = None
+        self.error: Optional[str] = None
+        self.failures = 0
+        self.loads = 0
+        self.retry_at = 0.0
+
+
+class ModelRegistry:
+    """Loads each registered model at most once at a time"""
+
+    def __init__(self, backoff_base_s: float = 5.0, backoff_max_s: float = 300.0):
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self._slots: Dict[str, _Slot] = {}
+        # Guards state transitions; read by /health and worker threads
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Loader):
+        with self._lock:
+            self._slots[name] = _Slot(name, loader)
+
+    def set_ready(self, name: str, model: Any):
+        """Publish a model that was loaded outside the registry"""
+        with self._lock:
+            slot = self._slots[name]
+            slot.model = model
+            slot.state = READY
+            slot.error = None
+            slot.failures = 0
+
+    def peek(self, name: str) -> Any:
+        """The loaded model, or None if it isn't ready"""
+        slot = self._slots.get(name)
+        return slot.model if slot is not None and slot.state == READY else None
+
+    def state(self, name: str) -> str:
+        return self._slots[name].state
+
+    async def get(self, name: str) -> Any:
+        """Return the model, loading it (once) if needed"""
+        slot = self._slots[name]
+
+        with self._lock:
+            if slot.state == READY:
+                return slot.model
+
+            if slot.state == FAILED:
+                wait = slot.retry_at - time.monotonic()
+                if wait > 0:
+                    raise ModelUnavailable(name, slot.error or "load failed", wait)
+
+            if slot.task is None or slot.task.done():
+                slot.state = LOADING
+                slot.loads += 1
+                slot.task = asyncio.create_task(self._load(slot), name=f"load-{name}")
+
+            task = slot.task
+
+        # Shield so one caller giving up doesn't cancel the shared load
+        return await asyncio.shield(task)
+
+    async def _load(self, slot: _Slot) -> Any:
+        try:
+            model = await slot.loader()
+        except asyncio.CancelledError:
+            with self._lock:
+                slot.state = UNLOADED
+            raise
+        except Exception as e:
+            with self._lock:
+                slot.failures += 1
+                delay = min(
+                    self.backoff_base_s * 2 ** (slot.failures - 1), self.backoff_max_s
+                )
+                slot.state = FAILED
+                slot.error = str(e) or type(e).__name__
+                slot.retry_at = time.monotonic() + delay
+            logger.error(
+                f"{slot.name}: load failed ({slot.error}); "
+                f"retrying no sooner than {delay:.0f}s"
+            )
+            raise
+
+        with self._lock:
+            slot.model = model
+            slot.state = READY
+            slot.error = None
+            slot.failures = 0
+        return model
+
+    def unload(self, name: str):
+        with self._lock:
+            slot = self._slots[name]
+            if slot.task is not None and not slot.task.done():
+                slot.task.cancel()
+            slot.model = None
+            slot.task = None
+            slot.state = UNLOADED
+
+    def states(self) -> Dict[str, str]:
+        with self._lock:
+            return {name: slot.state for name, slot in self._slots.items()}
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    "state": slot.state,
+                    "loads": slot.loads,
+                    "failures": slot.failures,
+                    "error": slot.error,
+                    "retry_in_s": max(slot.retry_at - now, 0.0)
+                    if slot.state == FAILED
+                    else None,
+                }
+                for name, slot in self._slots.items()
+            }
@@ -0,0 +1,162 @@
+#
+# Pre-fork multi-worker server
+#
+# A single uvicorn process runs all emotion inference in one interpreter,
+# behind one GIL. This server loads the models once in a parent process,
+# binds the listening socket, then forks N workers that each run their own
+# event loop on the shared socket:
+#
+# - Workers inherit the weights copy-on-write; tensor storage is never
+#   written, so it stays shared. gc.freeze() keeps the parent's objects out
+#   of the workers' garbage collections, which would otherwise touch (and
+#   copy) the pages they live on
+# - Each worker is pinned to its own slice of the CPU cores, with torch's
+#   intra-op threads sized to match, so workers don't oversubscribe cores
+# - Workers that die are restarted; SIGTERM / SIGINT stop all of them, and
+#   workers shut themselves down if the parent goes away
+#
+# POSIX only. With CUDA each worker loads its own copy (CUDA contexts
+# don't survive fork).
+#
+# Usage (from src/):
+#   ML_BACKEND_WORKERS=4 python prefork.py   (0 = one worker per core)
+#
+
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Dict, List
+
+import uvicorn
+
+import main
+
+logger = logging.getLogger("prefork")
+
+RESTART_DELAY_S = 1.0
+
+
+def available_cores() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+WORKERS = int(os.getenv("ML_BACKEND_WORKERS", "1")) or len(available_cores())
+
+
+def worker_cores(index: int, workers: int, cores: List[int]) -> List[int]:
+    """The slice of cores a worker is pinned to"""
+    per_worker = max(len(cores) // workers, 1)
+    start = (index * per_worker) % len(cores)
+    return cores[start : start + per_worker]
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def watch_parent(parent: int):
+    """Stop this worker once its parent has exited (runs in a thread)"""
+    while os.getppid() == parent:
+        time.sleep(1.0)
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def run_worker(index: int, cores: List[int], sock: socket.socket):
+    """Worker process body: pin to cores and serve on the shared socket"""
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(len(cores))
+
+    threading.Thread(
+        target=watch_parent, args=(os.getppid(),), name="parent-watch", daemon=True
+    ).start()
+
+    logger.info(f"worker {index}: pid {os.getpid()}, cores {cores}")
+    config = uvicorn.Config(main.app, log_level="info", access_log=True)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(host: str, port: int, workers: int):
+    if workers <= 1 or not hasattr(os, "fork"):
+        if workers > 1:
+            logger.warning("fork() not available; running a single worker")
+        uvicorn.run(main.app, host=host, port=port, log_level="info", access_log=True)
+        return
+
+    main.preload_models()
+    sock = bind_socket(host, port)
+    cores = available_cores()
+
+    # Everything allocated so far is shared with the workers; stop the
+    # collector from touching it
+    gc.collect()
+    gc.freeze()
+
+    children: Dict[int, int] = {}  # pid -> worker index
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                run_worker(index, worker_cores(index, workers, cores), sock)
+            except BaseException:
+                logger.exception(f"worker {index} crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    logger.info(f"Starting {workers} workers on http://{host}:{port}")
+    for index in range(workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+
+        index = children.pop(pid, None)
+        if index is None or stopping:
+            continue
+
+        logger.warning(f"worker {index} (pid {pid}) exited ({status}); restarting")
+        time.sleep(RESTART_DELAY_S)
+        if not stopping:
+            spawn(index)
+
+    sock.close()
+    logger.info("All workers stopped")
+
+
+if __name__ == "__main__":
+    serve(main.HOST, main.PORT, WORKERS)
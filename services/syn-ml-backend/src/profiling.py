@@ -0,0 +1,253 @@
+#
+# On-demand profiling of a running service
+#
+# When latency spikes on a user's machine there is no way to attach a
+# profiler to the sidecar the launcher started. These profilers run inside
+# the service for a fixed number of seconds and need no restart:
+#
+# - SamplingProfiler: samples the Python stack of every thread at a fixed
+#   interval and returns collapsed stacks ("thread;outer;...;inner count"),
+#   the input format of flamegraph.pl, speedscope and similar tools.
+#   "wall" mode counts every sample; "cpu" mode only counts a thread when
+#   its CPU clock advanced since the previous sample, so threads that stay
+#   blocked on locks, queues or sockets drop out (a thread that ran for part
+#   of an interval is counted at the stack it was sampled in)
+# - TorchProfile: a torch.profiler trace (Chrome trace JSON, for Perfetto
+#   or chrome://tracing) of the inference worker pools. Inference stages are
+#   labelled with annotate(), so tokenize / forward / align show up as named
+#   ranges. torch 2.6 (the pinned version) can only record the thread that
+#   started a profiler, and only one kineto profiler runs per process, so
+#   each pool job that starts during the capture window is recorded on its
+#   own worker thread with the thread-local legacy profiler (profile_job(),
+#   the executors' job hook) and the jobs are merged into one trace
+#
+# Only one profile of each kind runs at a time.
+#
+
+import asyncio
+import contextlib
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+MODES = ("wall", "cpu")
+
+# Marks worker threads whose job is being recorded, so annotate() costs
+# nothing otherwise
+_recording = threading.local()
+
+
+class ProfilerBusy(Exception):
+    """A profile of the same kind is already running"""
+
+
+def _frame_label(code) -> str:
+    path = code.co_filename
+    parent = os.path.basename(os.path.dirname(path))
+    return f"{code.co_name} ({parent}/{os.path.basename(path)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples the Python stacks of all threads from a background thread"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, interval_s: float = 0.01, mode: str = "wall"):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if mode == "cpu" and not hasattr(time, "pthread_getcpuclockid"):
+            raise ValueError("cpu mode needs per-thread CPU clocks (not available here)")
+
+        self.interval_s = interval_s
+        self.mode = mode
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._cpu_times: Dict[int, int] = {}
+
+    def start(self):
+        if not SamplingProfiler._lock.acquire(blocking=False):
+            raise ProfilerBusy("A sampling profile is already running")
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        """Stop sampling and return the collapsed stacks (blocking)"""
+        self._stop.set()
+        self._thread.join()
+        SamplingProfiler._lock.release()
+        return "".join(
+            f"{stack} {count}\n" for stack, count in sorted(self._stacks.items())
+        )
+
+    def _on_cpu(self, ident: int) -> bool:
+        """Whether the thread used CPU since the last sample"""
+        try:
+            now = time.clock_gettime_ns(time.pthread_getcpuclockid(ident))
+        except (OSError, OverflowError):
+            return True
+        previous = self._cpu_times.get(ident)
+        self._cpu_times[ident] = now
+        return previous is not None and now > previous
+
+    def _run(self):
+        own = threading.get_ident()
+        next_sample = time.perf_counter()
+        while not self._stop.is_set():
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if self.mode == "cpu" and not self._on_cpu(ident):
+                    continue
+
+                frames = []
+                while frame is not None:
+                    frames.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                frames.append(names.get(ident, f"thread-{ident}"))
+                self._stacks[";".join(reversed(frames))] += 1
+            self.samples += 1
+
+            # Fixed rate; skip ticks that were missed rather than bursting
+            next_sample += self.interval_s
+            delay = next_sample - time.perf_counter()
+            if delay < 0:
+                next_sample = time.perf_counter()
+                delay = 0
+            self._stop.wait(delay)
+
+
+def annotate(name: str) -> ContextManager:
+    """Label a block in torch profiles (no-op unless one is recording)"""
+    if not getattr(_recording, "active", False):
+        return contextlib.nullcontext()
+    import torch
+
+    return torch.profiler.record_function(name)
+
+
+class TorchProfile:
+    """Records torch.profiler traces of worker pool jobs for a number of seconds"""
+
+    _lock = threading.Lock()
+    # The capture jobs join, while its window is open
+    _active: Optional["TorchProfile"] = None
+
+    def __init__(self, cuda: bool = False):
+        self.cuda = cuda
+        self.jobs = 0
+        self._profile = None
+        self._start_ns = 0
+        self._events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+        self._running = 0
+        self._state = threading.Condition()
+
+    async def record(self, seconds: float) -> Dict[str, Any]:
+        """
+        Profile the jobs that start in the next `seconds` and return the
+        Chrome trace
+
+        Jobs still running when the window closes are waited for, so a long
+        alignment that started inside it is recorded whole.
+        """
+        from torch.autograd.profiler_legacy import profile
+
+        if not TorchProfile._lock.acquire(blocking=False):
+            raise ProfilerBusy("A torch profile is already running")
+        try:
+            self._profile = profile
+            self._start_ns = time.perf_counter_ns()
+            TorchProfile._active = self
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                TorchProfile._active = None
+
+            await asyncio.to_thread(self._wait_for_jobs)
+            return self._trace()
+        finally:
+            TorchProfile._lock.release()
+
+    @contextlib.contextmanager
+    def _job(self, pool: str) -> Iterator[None]:
+        """Record one job on the calling worker thread"""
+        prof = self._profile(use_cuda=self.cuda)
+        with self._state:
+            self._running += 1
+        try:
+            start_ns = time.perf_counter_ns()
+            try:
+                with prof:
+                    _recording.active = True
+                    try:
+                        yield
+                    finally:
+                        _recording.active = False
+            finally:
+                if prof.function_events is not None:
+                    self._add(prof.function_events, start_ns, pool)
+        finally:
+            with self._state:
+                self._running -= 1
+                self._state.notify_all()
+
+    def _add(self, function_events, start_ns: int, pool: str):
+        # Legacy profiles time events from their own start
+        offset_us = (start_ns - self._start_ns) / 1000
+        pid = os.getpid()
+        tid = threading.get_native_id()
+        events = []
+        for event in function_events:
+            trace_event = {
+                "name": event.name,
+                "cat": pool,
+                "ph": "X",
+                "ts": offset_us + event.time_range.start,
+                "dur": event.time_range.elapsed_us(),
+                "pid": pid,
+                "tid": tid,
+            }
+            if self.cuda:
+                trace_event["args"] = {"device_time_us": event.device_time_total}
+            events.append(trace_event)
+
+        with self._state:
+            self.jobs += 1
+            self._events.extend(events)
+            self._threads[tid] = threading.current_thread().name
+
+    def _wait_for_jobs(self):
+        with self._state:
+            self._state.wait_for(lambda: self._running == 0)
+
+    def _trace(self) -> Dict[str, Any]:
+        pid = os.getpid()
+        with self._state:
+            events = [
+                {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                for tid, name in sorted(self._threads.items())
+            ]
+            events.extend(sorted(self._events, key=lambda event: event["ts"]))
+            return {
+                "traceEvents": events,
+                "displayTimeUnit": "ms",
+                "otherData": {"jobs": self.jobs},
+            }
+
+
+def profile_job(pool: str) -> ContextManager:
+    """
+    Executor job hook: record the job if a torch profile is capturing
+
+    Runs on the worker thread; a no-op outside a capture window.
+    """
+    capture = TorchProfile._active
+    if capture is None:
+        return contextlib.nullcontext()
+    return capture._job(pool)
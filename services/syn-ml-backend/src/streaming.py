@@ -0,0 +1,85 @@
+#
+# Incremental text segmentation for streamed LLM output
+#
+# Tokens arrive a few characters at a time. The segmenter buffers them and
+# splits off a chunk as soon as a sentence or clause boundary is confirmed,
+# so each chunk can be classified while the rest of the reply is still
+# being generated.
+#
+# Boundaries:
+# - Sentence: . ! ? … followed by whitespace (or a newline on its own)
+# - Clause:   , ; : — followed by whitespace, once the chunk is long enough
+#   to carry an emotion on its own
+# - Hard cap: a chunk longer than max_chars is cut at the last space
+#
+
+from typing import List, Optional
+
+SENTENCE_END = ".!?…"
+CLAUSE_END = ",;:—"
+CLOSERS = "\"')]}”’"
+
+
+class SentenceSegmenter:
+    """Splits a token stream into sentence / clause chunks"""
+
+    def __init__(self, min_clause_chars: int = 24, max_chars: int = 300):
+        self.min_clause_chars = min_clause_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+
+    @property
+    def pending(self) -> str:
+        return self._buffer
+
+    def push(self, token: str) -> List[str]:
+        """Add streamed text and return any chunks it completed"""
+        self._buffer += token
+
+        chunks = []
+        while True:
+            end = self._next_boundary()
+            if end is None:
+                break
+            chunk = self._buffer[:end].strip()
+            self._buffer = self._buffer[end:]
+            if chunk:
+                chunks.append(chunk)
+        return chunks
+
+    def flush(self) -> Optional[str]:
+        """Return whatever is buffered (end of stream) and reset"""
+        chunk = self._buffer.strip()
+        self._buffer = ""
+        return chunk or None
+
+    def reset(self):
+        self._buffer = ""
+
+    def _next_boundary(self) -> Optional[int]:
+        """Index just past the first confirmed boundary, or None"""
+        buf = self._buffer
+
+        for i, ch in enumerate(buf):
+            if ch == "\n" and buf[:i].strip():
+                return i + 1
+
+            is_sentence = ch in SENTENCE_END
+            is_clause = ch in CLAUSE_END and len(buf[:i].strip()) >= self.min_clause_chars
+            if not (is_sentence or is_clause):
+                continue
+
+            # Swallow runs like "?!", "..." and closing quotes/brackets
+            j = i + 1
+            while j < len(buf) and (buf[j] in SENTENCE_END or buf[j] in CLOSERS):
+                j += 1
+
+            # Need to see the following whitespace to rule out "3.14", "e.g"
+            if j < len(buf) and buf[j].isspace():
+                return j
+
+        if len(buf) >= self.max_chars:
+            cut = buf.rfind(" ", 0, self.max_chars)
+            return cut if cut > 0 else self.max_chars
+
+        return None
@@ -0,0 +1,146 @@
+#
+# Per-request stage timing (Server-Timing)
+#
+# processing_time_ms is one number; it can't say whether a slow call spent
+# its time queued, in the model or on the wire. A client that sends
+# `X-Server-Timing: 1` gets a Server-Timing header on the response with the
+# time the request spent in each stage, in milliseconds:
+#
+#   Server-Timing: queue;dur=0.41, tokenize;dur=0.22, forward;dur=8.93,
+#                  postprocess;dur=0.05, serialize;dur=0.12, total;dur=10.1
+#
+# - queue: admission gate, micro-batcher and worker pool waits
+# - tokenize / audio_decode, forward / align, postprocess: the work itself.
+#   Work done once for a micro-batch counts in full for every request in it
+# - serialize: from the handler returning to the response headers going out
+#   (response model validation and JSON encoding)
+# - total: from the request arriving to the response headers going out
+#
+# The difference between the client's round trip and total is transport.
+# Stages are measured with perf_counter_ns. Requests that don't ask pay
+# only a context variable lookup per stage.
+#
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+TIMING_HEADER = b"x-server-timing"
+
+
+class Timings:
+    """Nanoseconds spent per stage by one request"""
+
+    def __init__(self):
+        self.start_ns = time.perf_counter_ns()
+        self.handled_ns: Optional[int] = None
+        self.stages: Dict[str, int] = {}
+        # Stages can finish on worker threads
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, ns: int):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0) + ns
+
+    def header(self, end_ns: int) -> str:
+        """Server-Timing header value, with serialize and total up to end_ns"""
+        with self._lock:
+            stages = dict(self.stages)
+        if self.handled_ns is not None:
+            stages["serialize"] = end_ns - self.handled_ns
+        stages["total"] = end_ns - self.start_ns
+        return ", ".join(f"{stage};dur={ns / 1e6:.2f}" for stage, ns in stages.items())
+
+
+class _FanOut:
+    """Adds each stage to several requests' timings (a shared batch)"""
+
+    def __init__(self, timings: List[Timings]):
+        self.timings = timings
+
+    def add(self, stage: str, ns: int):
+        for timings in self.timings:
+            timings.add(stage, ns)
+
+
+# Timings of the request being handled, if the client asked for them
+current: contextvars.ContextVar[Optional[Timings]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def record(stage: str, ns: int):
+    """Add ns to a stage of the current request (no-op unless requested)"""
+    timings = current.get()
+    if timings is not None:
+        timings.add(stage, ns)
+
+
+@contextmanager
+def stage(name: str, histogram=None) -> Iterator[None]:
+    """Time a block as a stage, also observing it on histogram (in seconds)"""
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter_ns() - start
+        if histogram is not None:
+            histogram.observe(elapsed / 1e9, name)
+        record(name, elapsed)
+
+
+@contextmanager
+def shared_by(timings: Iterable[Optional[Timings]]) -> Iterator[None]:
+    """Attribute stages timed inside the block to each of several requests"""
+    targets = [t for t in timings if t is not None]
+    token = current.set(_FanOut(targets) if targets else None)
+    try:
+        yield
+    finally:
+        current.reset(token)
+
+
+def handler_done():
+    """Mark the end of the handler's own work; what follows is serialization"""
+    timings = current.get()
+    if isinstance(timings, Timings):
+        timings.handled_ns = time.perf_counter_ns()
+
+
+class ServerTimingMiddleware:
+    """Adds a Server-Timing header to HTTP responses that ask for one"""
+
+    def __init__(self, app, always: bool = False):
+        self.app = app
+        self.always = always
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (self.always or _requested(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        timings = Timings()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                header = timings.header(time.perf_counter_ns())
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", header.encode())
+                ]
+            await send(message)
+
+        token = current.set(timings)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current.reset(token)
+
+
+def _requested(scope) -> bool:
+    for name, value in scope.get("headers", []):
+        if name == TIMING_HEADER:
+            return value.strip().lower() not in (b"", b"0", b"false")
+    return False
@@ -0,0 +1,185 @@
+#
+# Length-bucketed tokenization for the emotion model
+#
+# A batch is padded to its longest text, so one long paragraph in a batch
+# of short interjections multiplies the work for all of them. Texts are
+# tokenized once without padding, grouped into power-of-two length buckets,
+# and each bucket gets its own forward pass padded only to its own longest
+# text. Callers scatter the results back into request order.
+#
+# Tokenization is its own stage so it can run on a separate worker while
+# the previous batch is on the model. Its output is cached by text: chat
+# traffic repeats short phrases, and for those tokenizing is a noticeable
+# share of the request. Fast tokenizers get a private copy of the Rust
+# tokenizer with truncation configured once, since the HF wrapper
+# reconfigures (mutates) it on every call and isn't safe to share between
+# threads.
+#
+
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    import torch
+
+VALID_TRUNCATION_SIDES = ("right", "left")
+
+
+def length_buckets(max_length: int, smallest: int = 16) -> List[int]:
+    """Power-of-two bucket limits up to (and including) max_length"""
+    limits = []
+    limit = smallest
+    while limit < max_length:
+        limits.append(limit)
+        limit *= 2
+    limits.append(max_length)
+    return limits
+
+
+class EmotionTokenizer:
+    """Thread-safe, cached text -> token ids (unpadded, truncated)"""
+
+    def __init__(
+        self,
+        tokenizer,
+        max_length: int,
+        truncation_side: str = "right",
+        cache_size: int = 4096,
+    ):
+        if truncation_side not in VALID_TRUNCATION_SIDES:
+            raise ValueError(f"Invalid truncation side: {truncation_side}")
+
+        self.max_length = max_length
+        self.pad_token_id = tokenizer.pad_token_id
+        self.cache_size = cache_size
+
+        self._tokenizer = tokenizer
+        self._backend = None
+        if getattr(tokenizer, "is_fast", False):
+            from tokenizers import Tokenizer
+
+            self._backend = Tokenizer.from_str(tokenizer.backend_tokenizer.to_str())
+            self._backend.no_padding()
+            self._backend.enable_truncation(max_length, direction=truncation_side)
+        else:
+            tokenizer.truncation_side = truncation_side
+
+        # Guards the cache; the slow-tokenizer fallback gets its own lock
+        self._lock = threading.Lock()
+        self._tokenize_lock = threading.Lock()
+        self._cache: "OrderedDict[str, List[int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, texts: Sequence[str]) -> List[List[int]]:
+        """Token ids for each text, tokenizing only cache misses (blocking)"""
+        ids: List[Optional[List[int]]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}  # text -> indices
+
+        with self._lock:
+            for index, text in enumerate(texts):
+                cached = self._cache.get(text)
+                if cached is not None:
+                    self._cache.move_to_end(text)
+                    ids[index] = cached
+                    self.hits += 1
+                else:
+                    missing.setdefault(text, []).append(index)
+                    self.misses += 1
+
+        if missing:
+            fresh = self._tokenize(list(missing))
+            with self._lock:
+                for (text, indices), token_ids in zip(missing.items(), fresh):
+                    for index in indices:
+                        ids[index] = token_ids
+                    if self.cache_size > 0:
+                        self._cache[text] = token_ids
+                        self._cache.move_to_end(text)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return ids
+
+    def _tokenize(self, texts: List[str]) -> List[List[int]]:
+        if self._backend is not None:
+            return [encoding.ids for encoding in self._backend.encode_batch(texts)]
+
+        with self._tokenize_lock:
+            encoded = self._tokenizer(
+                texts, truncation=True, max_length=self.max_length, padding=False
+            )
+        return encoded["input_ids"]
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "max_entries": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def bucket_indices(lengths: Sequence[int], limits: Sequence[int]) -> List[List[int]]:
+    """
+    Group item indices by the smallest bucket limit that fits them
+
+    Buckets are returned shortest first and each is sorted by length.
+    """
+    buckets: Dict[int, List[int]] = {}
+    for index, length in enumerate(lengths):
+        limit = next((l for l in limits if length <= l), limits[-1])
+        buckets.setdefault(limit, []).append(index)
+
+    return [
+        sorted(buckets[limit], key=lambda i: lengths[i])
+        for limit in sorted(buckets)
+    ]
+
+
+def pad_batch(input_ids: List[List[int]], pad_token_id: int) -> Dict[str, "torch.Tensor"]:
+    """Right-pad one bucket to its longest item and build the attention mask"""
+    import torch
+
+    width = max(len(ids) for ids in input_ids)
+    ids = torch.full((len(input_ids), width), pad_token_id, dtype=torch.long)
+    mask = torch.zeros((len(input_ids), width), dtype=torch.long)
+    for row, seq in enumerate(input_ids):
+        ids[row, : len(seq)] = torch.tensor(seq, dtype=torch.long)
+        mask[row, : len(seq)] = 1
+    return {"input_ids": ids, "attention_mask": mask}
+
+
+class PaddingStats:
+    """Counts real vs. padded tokens sent through the model"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.tokens = 0
+        self.padded_tokens = 0
+
+    def record(self, lengths: Sequence[int]):
+        with self._lock:
+            self.batches += 1
+            self.tokens += sum(lengths)
+            self.padded_tokens += max(lengths) * len(lengths)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "forward_passes": self.batches,
+                "tokens": self.tokens,
+                "padded_tokens": self.padded_tokens,
+                "padding_efficiency": self.tokens / self.padded_tokens
+                if self.padded_tokens
+                else None,
+            }
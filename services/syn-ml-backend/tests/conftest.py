@@ -0,0 +1,12 @@
+"""
+Shared pytest setup
+
+The service modules live in src/ and import each other as top-level
+modules (as when uvicorn runs from src/), so unit tests import them the
+same way.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,205 @@
+"""
+Unit tests for admission control gates (no service needed)
+"""
+
+import asyncio
+
+import pytest
+
+from admission import AdmissionGate, Overloaded
+
+
+async def settle():
+    """Let queued waiters run"""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+class TestAdmissionGate:
+    """Concurrency limit, FIFO handoff and the three rejection paths"""
+
+    @pytest.mark.asyncio
+    async def test_admits_up_to_max_concurrent_immediately(self):
+        gate = AdmissionGate("test", max_concurrent=2, max_queue=4, max_wait_s=1)
+        await gate.acquire()
+        await gate.acquire()
+
+        stats = gate.stats()
+        assert stats["active"] == 2
+        assert stats["queued"] == 0
+        assert stats["admitted"] == 2
+
+    @pytest.mark.asyncio
+    async def test_waiters_are_admitted_in_arrival_order(self):
+        gate = AdmissionGate("test", max_concurrent=1, max_queue=4, max_wait_s=5)
+        await gate.acquire()
+        order = []
+
+        async def wait(tag):
+            await gate.acquire()
+            order.append(tag)
+
+        tasks = [asyncio.create_task(wait(tag)) for tag in "abc"]
+        await settle()
+        assert gate.stats()["queued"] == 3
+
+        for _ in range(3):
+            gate.release(0.01)
+            await settle()
+        await asyncio.gather(*tasks)
+
+        assert order == ["a", "b", "c"]
+        # Each release handed the slot straight over
+        assert gate.active == 1
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects(self):
+        gate = AdmissionGate("test", max_concurrent=1, max_queue=1, max_wait_s=5)
+        await gate.acquire()
+        waiter = asyncio.create_task(gate.acquire())
+        await settle()
+
+        with pytest.raises(Overloaded) as exc:
+            await gate.acquire()
+        assert exc.value.gate == "test"
+        assert exc.value.reason == "queue is full"
+        assert exc.value.retry_after >= 1.0
+        assert gate.stats()["rejected"]["queue_full"] == 1
+
+        gate.release()
+        await waiter
+
+    @pytest.mark.asyncio
+    async def test_long_estimated_wait_rejects_on_arrival(self):
+        gate = AdmissionGate("test", max_concurrent=1, max_queue=8, max_wait_s=0.5)
+        await gate.acquire()
+        gate.release(2.0)  # Teaches the gate that a request takes ~2s
+        await gate.acquire()
+
+        with pytest.raises(Overloaded) as exc:
+            await gate.acquire()
+        assert exc.value.reason == "estimated wait exceeds deadline"
+        assert exc.value.retry_after == pytest.approx(2.0)
+        assert gate.stats()["rejected"]["deadline"] == 1
+        assert gate.stats()["queued"] == 0
+
+    @pytest.mark.asyncio
+    async def test_caller_budget_tightens_the_limit(self):
+        gate = AdmissionGate("test", max_concurrent=1, max_queue=8, max_wait_s=30)
+        await gate.acquire()
+        gate.release(1.0)
+        await gate.acquire()
+
+        with pytest.raises(Overloaded):
+            await gate.acquire(budget_s=0.1)
+        assert gate.stats()["rejected"]["deadline"] == 1
+
+    @pytest.mark.asyncio
+    async def test_check_sheds_without_taking_a_slot(self):
+        gate = AdmissionGate("test", max_concurrent=1, max_queue=1, max_wait_s=5)
+        gate.check()
+        await gate.acquire()
+        # Busy but with room to queue: a request would wait, not be shed
+        gate.check()
+        waiter = asyncio.create_task(gate.acquire())
+        await settle()
+
+        with pytest.raises(Overloaded) as exc:
+            gate.check()
+        assert exc.value.reason == "queue is full"
+
+        stats = gate.stats()
+        assert stats["active"] == 1
+        assert stats["queued"] == 1
+        assert stats["admitted"] == 1
+        assert stats["rejected"]["queue_full"] == 1
+
+        gate.release()
+        await waiter
+
+    @pytest.mark.asyncio
+    async def test_check_holds_the_caller_budget(self):
+        gate = AdmissionGate("test", max_concurrent=1, max_queue=8, max_wait_s=30)
+        await gate.acquire()
+        gate.release(1.0)
+        await gate.acquire()
+
+        gate.check(budget_s=5)
+        with pytest.raises(Overloaded) as exc:
+            gate.check(budget_s=0.1)
+        assert exc.value.reason == "estimated wait exceeds deadline"
+
+    @pytest.mark.asyncio
+    async def test_waiter_times_out_and_leaves_the_queue(self):
+        gate = AdmissionGate("test", max_concurrent=1, max_queue=8, max_wait_s=0.05)
+        await gate.acquire()
+
+        with pytest.raises(Overloaded) as exc:
+            await gate.acquire()
+        assert exc.value.reason == "timed out waiting"
+
+        stats = gate.stats()
+        assert stats["rejected"]["timed_out"] == 1
+        assert stats["queued"] == 0
+        assert stats["active"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_take_a_slot(self):
+        gate = AdmissionGate("test", max_concurrent=1, max_queue=8, max_wait_s=5)
+        await gate.acquire()
+        waiter = asyncio.create_task(gate.acquire())
+        await settle()
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert gate.stats()["queued"] == 0
+
+        gate.release()
+        assert gate.active == 0
+
+    @pytest.mark.asyncio
+    async def test_cancellation_after_handoff_passes_the_slot_on(self):
+        gate = AdmissionGate("test", max_concurrent=1, max_queue=8, max_wait_s=5)
+        await gate.acquire()
+        first = asyncio.create_task(gate.acquire())
+        second = asyncio.create_task(gate.acquire())
+        await settle()
+
+        # Hand the slot to the first waiter, then cancel it before it resumes
+        gate.release()
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+        await asyncio.wait_for(second, timeout=1)
+        assert gate.active == 1
+        assert gate.stats()["queued"] == 0
+
+    @pytest.mark.asyncio
+    async def test_slot_releases_and_records_service_time(self):
+        gate = AdmissionGate("test", max_concurrent=1, max_queue=0, max_wait_s=1)
+
+        async with gate.slot():
+            assert gate.active == 1
+            with pytest.raises(Overloaded):
+                await gate.acquire()
+
+        stats = gate.stats()
+        assert stats["active"] == 0
+        assert stats["completed"] == 1
+        assert stats["avg_service_ms"] is not None
+
+    @pytest.mark.asyncio
+    async def test_slot_releases_when_the_block_raises(self):
+        gate = AdmissionGate("test", max_concurrent=1, max_queue=0, max_wait_s=1)
+
+        with pytest.raises(RuntimeError):
+            async with gate.slot():
+                raise RuntimeError("boom")
+
+        assert gate.active == 0
+
+    def test_rejects_zero_concurrency(self):
+        with pytest.raises(ValueError):
+            AdmissionGate("test", max_concurrent=0, max_queue=1, max_wait_s=1)
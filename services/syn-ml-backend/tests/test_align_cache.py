@@ -0,0 +1,201 @@
+"""
+Unit tests for the alignment result cache (no service needed)
+"""
+
+import os
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from align_cache import STALE_TMP_S, AlignmentCache
+
+
+def result(n: int):
+    return {"phonemes": [{"phoneme": "a", "start_ms": n, "end_ms": n + 10}], "words": []}
+
+
+def audio(seed: int, seconds: float = 0.1):
+    return np.random.default_rng(seed).standard_normal(int(16000 * seconds)).astype(np.float32)
+
+
+class TestCacheKey:
+    """What the content hash does and doesn't depend on"""
+
+    def test_same_input_same_key(self):
+        cache = AlignmentCache("ns")
+        assert cache.key("hello world", audio(1), 16000) == cache.key("hello world", audio(1), 16000)
+
+    def test_transcript_whitespace_is_normalized(self):
+        cache = AlignmentCache("ns")
+        assert cache.key("hello   world\n", audio(1), 16000) == cache.key("hello world", audio(1), 16000)
+
+    def test_key_depends_on_every_input(self):
+        cache = AlignmentCache("ns")
+        base = cache.key("hello", audio(1), 16000)
+        assert cache.key("hullo", audio(1), 16000) != base
+        assert cache.key("hello", audio(2), 16000) != base
+        assert cache.key("hello", audio(1), 24000) != base
+        assert AlignmentCache("other").key("hello", audio(1), 16000) != base
+
+    def test_sample_dtype_does_not_matter(self):
+        cache = AlignmentCache("ns")
+        samples = audio(1)
+        assert cache.key("a", samples.astype(np.float64), 16000) == cache.key("a", samples, 16000)
+
+
+class TestMemoryTier:
+    """LRU behaviour and counters"""
+
+    def test_put_then_get(self):
+        cache = AlignmentCache("ns", max_entries=4)
+        cache.put("k", result(1))
+        assert cache.get("k") == result(1)
+        assert cache.stats()["hits"] == 1
+
+    def test_memory_lookup_does_not_count_a_miss(self):
+        cache = AlignmentCache("ns", max_entries=4)
+        assert cache.get("missing") is None
+        assert cache.stats()["misses"] == 0
+
+        # The miss is counted once the disk tier (here: none) also misses
+        assert cache.get_disk("missing") is None
+        assert cache.stats()["misses"] == 1
+
+    def test_least_recently_used_is_evicted(self):
+        cache = AlignmentCache("ns", max_entries=2)
+        cache.put("a", result(1))
+        cache.put("b", result(2))
+        cache.get("a")
+        cache.put("c", result(3))
+
+        assert cache.get("b") is None
+        assert cache.get("a") == result(1)
+        assert cache.get("c") == result(3)
+        assert cache.stats()["evictions"] == 1
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = AlignmentCache("ns", enabled=False)
+        cache.put("k", result(1))
+        assert cache.get("k") is None
+        assert cache.get_disk("k") is None
+        assert cache.stats()["enabled"] is False
+
+    def test_clear(self):
+        cache = AlignmentCache("ns", max_entries=4)
+        cache.put("k", result(1))
+        cache.clear()
+        assert cache.get("k") is None
+
+
+class TestDiskTier:
+    """Persistence, promotion, size-bounded eviction and recovery"""
+
+    def test_survives_restart(self, tmp_path):
+        cache = AlignmentCache("ns", disk_dir=str(tmp_path))
+        cache.put_disk("ab12", result(1))
+
+        reopened = AlignmentCache("ns", disk_dir=str(tmp_path))
+        reopened.ensure_disk_index()
+        assert reopened.stats()["disk"]["entries"] == 1
+        assert reopened.get("ab12") is None
+        assert reopened.get_disk("ab12") == result(1)
+        # Promoted to memory
+        assert reopened.get("ab12") == result(1)
+
+        stats = reopened.stats()
+        assert stats["disk_hits"] == 1
+        assert stats["hits"] == 1
+        assert stats["hit_rate"] == 1.0
+
+    def test_evicts_least_recently_used_over_budget(self, tmp_path):
+        size = len('{"phonemes":[{"phoneme":"a","start_ms":1,"end_ms":11}],"words":[]}')
+        cache = AlignmentCache("ns", max_entries=0, disk_dir=str(tmp_path), disk_max_bytes=size * 2)
+        cache.put_disk("aa01", result(1))
+        cache.put_disk("bb02", result(2))
+        cache.get_disk("aa01")
+        cache.put_disk("cc03", result(3))
+
+        assert cache.get_disk("bb02") is None
+        assert cache.get_disk("aa01") == result(1)
+        assert cache.get_disk("cc03") == result(3)
+        disk = cache.stats()["disk"]
+        assert disk["evictions"] == 1
+        assert disk["bytes"] <= disk["max_bytes"]
+        assert not os.path.exists(tmp_path / "bb" / "bb02.json")
+
+    def test_rewrite_does_not_double_count(self, tmp_path):
+        cache = AlignmentCache("ns", disk_dir=str(tmp_path))
+        cache.put_disk("ab12", result(1))
+        before = cache.stats()["disk"]["bytes"]
+        cache.put_disk("ab12", result(1))
+        assert cache.stats()["disk"]["bytes"] == before
+        assert cache.stats()["disk"]["entries"] == 1
+
+    def test_unreadable_entry_is_dropped(self, tmp_path):
+        cache = AlignmentCache("ns", disk_dir=str(tmp_path))
+        cache.put_disk("ab12", result(1))
+        (tmp_path / "ab" / "ab12.json").write_text("{not json")
+
+        assert cache.get_disk("ab12") is None
+        assert cache.stats()["disk"]["entries"] == 0
+        assert not os.path.exists(tmp_path / "ab" / "ab12.json")
+
+    def test_entry_removed_by_another_process(self, tmp_path):
+        cache = AlignmentCache("ns", disk_dir=str(tmp_path))
+        cache.put_disk("ab12", result(1))
+        os.unlink(tmp_path / "ab" / "ab12.json")
+
+        assert cache.get_disk("ab12") is None
+        assert cache.stats()["disk"]["bytes"] == 0
+
+    def test_stale_partial_writes_are_removed(self, tmp_path):
+        (tmp_path / "ab").mkdir()
+        stale = tmp_path / "ab" / "ab12.json.1.2.tmp"
+        fresh = tmp_path / "ab" / "cd34.json.1.2.tmp"
+        stale.write_text("{")
+        fresh.write_text("{")
+        old = time.time() - STALE_TMP_S - 60
+        os.utime(stale, (old, old))
+
+        cache = AlignmentCache("ns", disk_dir=str(tmp_path))
+        cache.ensure_disk_index()
+
+        assert not stale.exists()
+        # May still be being written by another worker
+        assert fresh.exists()
+        assert cache.stats()["disk"]["entries"] == 0
+
+    def test_unusable_directory_disables_disk_tier(self, tmp_path):
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        cache = AlignmentCache("ns", disk_dir=str(blocker / "cache"))
+
+        cache.put_disk("ab12", result(1))
+        assert cache.stats()["disk"] is None
+        assert cache.get_disk("ab12") is None
+
+    def test_directory_is_not_walked_until_used(self, tmp_path, monkeypatch):
+        AlignmentCache("ns", disk_dir=str(tmp_path)).put_disk("ab12", result(1))
+        walked = []
+        real_walk = os.walk
+        monkeypatch.setattr(os, "walk", lambda *a, **k: walked.append(a) or real_walk(*a, **k))
+
+        cache = AlignmentCache("ns", disk_dir=str(tmp_path))
+        assert walked == []
+        assert cache.stats()["disk"]["indexed"] is False
+
+        # The first lookup indexes, once
+        assert cache.get_disk("ab12") == result(1)
+        cache.get_disk("ab12")
+        cache.ensure_disk_index()
+        assert len(walked) == 1
+        assert cache.stats()["disk"]["indexed"] is True
+
+    def test_write_before_index_keeps_existing_entries(self, tmp_path):
+        AlignmentCache("ns", disk_dir=str(tmp_path)).put_disk("ab12", result(1))
+
+        cache = AlignmentCache("ns", disk_dir=str(tmp_path))
+        cache.put_disk("cd34", result(2))
+        assert cache.stats()["disk"]["entries"] == 2
@@ -0,0 +1,211 @@
+"""
+Unit tests for the alignment routes' admission (no service or models needed)
+"""
+
+import asyncio
+import json
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("uvicorn")
+pytest.importorskip("multipart")
+
+import main
+from align_cache import AlignmentCache
+from executors import InferenceExecutor
+
+CHUNK = 64 * 1024
+
+
+class Upload:
+    """One HTTP request driven straight through the ASGI app"""
+
+    def __init__(self, path, body_chunks, headers=(), query=b""):
+        self.scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query,
+            "root_path": "",
+            "headers": list(headers),
+            "client": ("127.0.0.1", 40000),
+            "server": ("127.0.0.1", 8001),
+        }
+        self.chunks = list(body_chunks)
+        self.read = 0
+        self.sent = []
+
+    async def receive(self):
+        if self.read < len(self.chunks):
+            chunk = self.chunks[self.read]
+            self.read += 1
+            return {
+                "type": "http.request",
+                "body": chunk,
+                "more_body": self.read < len(self.chunks),
+            }
+        # Body done; the client waits for the response
+        await asyncio.Event().wait()
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    async def run(self):
+        await main.app(self.scope, self.receive, self.send)
+        return self
+
+    @property
+    def status(self):
+        return next(m["status"] for m in self.sent if m["type"] == "http.response.start")
+
+    @property
+    def json(self):
+        return json.loads(
+            b"".join(m.get("body", b"") for m in self.sent if m["type"] == "http.response.body")
+        )
+
+
+def multipart_chunks(size):
+    """A multipart form with a `size`-byte audio file, split into chunks"""
+    boundary = b"testboundary"
+    body = (
+        b"--" + boundary + b"\r\n"
+        b'Content-Disposition: form-data; name="text"\r\n\r\nhello\r\n'
+        b"--" + boundary + b"\r\n"
+        b'Content-Disposition: form-data; name="audio"; filename="a.wav"\r\n'
+        b"Content-Type: audio/wav\r\n\r\n" + b"\0" * size + b"\r\n"
+        b"--" + boundary + b"--\r\n"
+    )
+    headers = [(b"content-type", b"multipart/form-data; boundary=" + boundary)]
+    return [body[i : i + CHUNK] for i in range(0, len(body), CHUNK)], headers
+
+
+@pytest.fixture
+def align_gate_full(monkeypatch):
+    """Every align slot taken and no queue, so new alignments are shed"""
+    gate = main.admission_gates["align"]
+    monkeypatch.setattr(gate, "max_queue", 0)
+    taken = gate.max_concurrent - gate.active
+    gate.active += taken
+    yield gate
+    gate.active -= taken
+
+
+WAVEFORM = torch.zeros(1, 1600)
+CACHED = {"phonemes": [], "words": [{"word": "hello", "start_ms": 0.0, "end_ms": 100.0}]}
+
+
+class SaturatedAligner:
+    """Loaded, but every alignment must be served without it"""
+
+    resampler_sample_rate = 16000
+
+    def process_sentence(self, **kwargs):
+        raise AssertionError("aligner used for a cached alignment")
+
+
+@pytest.fixture
+def aligner(monkeypatch):
+    """Decoding on a real audio pool, a stand-in aligner and an empty cache"""
+    executor = InferenceExecutor({"audio": 1, "aligner": 1})
+    cache = AlignmentCache("test")
+    monkeypatch.setattr(main, "inference_executor", executor)
+    monkeypatch.setattr(main, "aligner_model", SaturatedAligner())
+    monkeypatch.setattr(main, "alignment_cache", cache)
+    monkeypatch.setattr(main, "_decode_audio", lambda data, **decode_args: WAVEFORM)
+    monkeypatch.setattr(main, "_load_audio_file", lambda path: WAVEFORM)
+    yield cache
+    executor.shutdown()
+
+
+def remember(cache, text):
+    """Cache an alignment of WAVEFORM for text"""
+    cache.put(cache.key(text, WAVEFORM.reshape(-1).numpy(), 16000), CACHED)
+
+
+def path_request(text, audio_path):
+    body = json.dumps({"text": text, "audio_path": audio_path}).encode()
+    return Upload("/align/phonemes", [body], [(b"content-type", b"application/json")])
+
+
+class TestCacheBeforeAdmission:
+    """Repeated audio is served from the cache without an align slot"""
+
+    @pytest.mark.asyncio
+    async def test_hit_is_served_while_the_gate_is_full(self, aligner, align_gate_full, tmp_path):
+        audio_path = tmp_path / "a.wav"
+        audio_path.write_bytes(b"")
+        remember(aligner, "hello")
+
+        upload = await path_request("hello", str(audio_path)).run()
+
+        assert upload.status == 200
+        assert upload.json["words"] == CACHED["words"]
+        assert align_gate_full.stats()["admitted"] == 0
+
+    @pytest.mark.asyncio
+    async def test_miss_is_still_shed(self, aligner, align_gate_full, tmp_path):
+        audio_path = tmp_path / "a.wav"
+        audio_path.write_bytes(b"")
+        remember(aligner, "hello")
+
+        upload = await path_request("goodbye", str(audio_path)).run()
+
+        assert upload.status == 429
+
+    @pytest.mark.asyncio
+    async def test_raw_hit_does_not_wait_for_a_slot(self, aligner, align_gate_full, monkeypatch):
+        # Room to queue, so the body is read; a miss would wait behind the slots
+        monkeypatch.setattr(align_gate_full, "max_queue", 1)
+        remember(aligner, "hello")
+
+        upload = await Upload(
+            "/align/phonemes/raw",
+            [b"\0" * 3200],
+            [(b"x-sample-rate", b"16000")],
+            query=b"text=hello",
+        ).run()
+
+        assert upload.status == 200
+        assert upload.json["words"] == CACHED["words"]
+        assert align_gate_full.stats()["queued"] == 0
+
+
+class TestEarlyRejection:
+    """Shed requests are refused before their audio is read"""
+
+    @pytest.mark.asyncio
+    async def test_upload_is_rejected_before_the_form_is_read(self, align_gate_full):
+        chunks, headers = multipart_chunks(4 * 1024 * 1024)
+        upload = await Upload("/align/phonemes/upload", chunks, headers).run()
+
+        assert upload.status == 429
+        # At most the middleware's read-ahead, not the whole upload
+        assert upload.read <= 2
+
+    @pytest.mark.asyncio
+    async def test_raw_is_rejected_before_the_body_is_read(self, align_gate_full):
+        chunks = [b"\0" * CHUNK] * 64
+        upload = await Upload(
+            "/align/phonemes/raw",
+            chunks,
+            [(b"x-sample-rate", b"16000")],
+            query=b"text=hello",
+        ).run()
+
+        assert upload.status == 429
+        assert upload.read < len(chunks)
+
+    @pytest.mark.asyncio
+    async def test_upload_form_is_validated(self):
+        # Admitted and parsed by the handler, so field errors are its own
+        chunks, headers = multipart_chunks(16)
+        chunks = [b"".join(chunks).replace(b'name="text"', b'name="other"')]
+        upload = await Upload("/align/phonemes/upload", chunks, headers).run()
+
+        assert upload.status == 422
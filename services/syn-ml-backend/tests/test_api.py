@@ -1,19 +1,23 @@
-/**
- * ML Backend Test Suite
- * 
- * Comprehensive testing for the ML Backend Service
- * Run with: cd airi-mods/services/ml-backend && python -m pytest tests/ -v
- * 
- * Tests cover:
- * - Service startup/shutdown
- * - All API endpoints
- * - Error handling
- * - Performance benchmarks
- * - Resource monitoring
- * - Model inference quality
- */
+"""
+ML Backend Test Suite
+
+Comprehensive testing for the ML Backend Service
+Run with: cd services/syn-ml-backend && python -m pytest tests/ -v
+
+Tests cover:
+- Service startup/shutdown
+- All API endpoints
+- Error handling
+- Performance benchmarks
+- Resource monitoring
+- Model inference quality
+
+These tests talk to a running service at BASE_URL and are skipped when
+none is listening.
+"""
 
 import pytest
+import pytest_asyncio
 import asyncio
 import aiohttp
 import time
@@ -100,10 +104,15 @@ def service_process():
     except subprocess.TimeoutExpired:
         process.kill()
 
-@pytest.fixture
+@pytest_asyncio.fixture
 async def http_client():
-    """Create async HTTP client"""
+    """Create async HTTP client (skips the test if the service isn't running)"""
     async with aiohttp.ClientSession() as session:
+        try:
+            async with session.get(f"{BASE_URL}/health", timeout=aiohttp.ClientTimeout(total=2)):
+                pass
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pytest.skip(f"ML backend not running at {BASE_URL}")
         yield session
 
 # Helper functions
@@ -158,7 +167,48 @@ class TestHealth:
         async with http_client.get(f"{BASE_URL}/health") as resp:
             data = await resp.json()
             assert data["models_loaded"]["emotion"] == True
-            assert data["models_loaded"]["aligner"] == True
+            # Aligner reports its real state (it may still be loading)
+            assert data["models_loaded"]["aligner"] == (
+                data["model_states"]["aligner"] == "ready"
+            )
+    
+    @pytest.mark.asyncio
+    async def test_health_load_state(self, http_client):
+        """Verify per-model load states and timings are reported"""
+        async with http_client.get(f"{BASE_URL}/health") as resp:
+            data = await resp.json()
+            valid_states = {"unloaded", "loading", "ready", "failed"}
+            assert set(data["model_states"].keys()) == {"emotion", "aligner"}
+            assert set(data["model_states"].values()) <= valid_states
+            assert "emotion" in data["load_times_ms"]
+    
+    @pytest.mark.asyncio
+    async def test_health_emotion_backend(self, http_client):
+        """Verify the emotion backend in use is reported"""
+        async with http_client.get(f"{BASE_URL}/health") as resp:
+            data = await resp.json()
+            if data["models_loaded"]["emotion"]:
+                assert data["emotion_backend"] in {"torch", "torch-int8", "onnx", "onnx-int8"}
+    
+    @pytest.mark.asyncio
+    async def test_health_live(self, http_client):
+        """Liveness answers regardless of model state"""
+        async with http_client.get(f"{BASE_URL}/health/live") as resp:
+            assert resp.status == 200
+            data = await resp.json()
+            assert data["status"] == "alive"
+    
+    @pytest.mark.asyncio
+    async def test_health_ready(self, http_client):
+        """Readiness is 200 only when the emotion model is loaded"""
+        async with http_client.get(f"{BASE_URL}/health/ready") as resp:
+            data = await resp.json()
+            assert data["status"] in {"starting", "ready", "failed"}
+            if data["ready"]:
+                assert resp.status == 200
+                assert data["model_states"]["emotion"] == "ready"
+            else:
+                assert resp.status == 503
     
     @pytest.mark.asyncio
     async def test_health_timestamp_valid(self, http_client):
@@ -248,6 +298,428 @@ class TestEmotionDetection:
             data = await resp.json()
             assert "emotion" in data
 
+# Batch Emotion Detection Tests
+class TestBatchEmotionDetection:
+    """Test suite for batch emotion detection endpoint"""
+    
+    @pytest.mark.asyncio
+    async def test_batch_preserves_order(self, http_client):
+        """Results come back one per text, in request order"""
+        labels = ["joy", "anger", "sadness", "fear"]
+        texts = [TEST_TEXTS[label][0] for label in labels]
+        async with http_client.post(
+            f"{BASE_URL}/emotion/detect/batch",
+            json={"texts": texts}
+        ) as resp:
+            assert resp.status == 200
+            data = await resp.json()
+            assert "processing_time_ms" in data
+            assert len(data["results"]) == len(texts)
+            for label, result in zip(labels, data["results"]):
+                assert result["emotion"] == label
+                assert "processing_time_ms" in result
+    
+    @pytest.mark.asyncio
+    async def test_batch_mixed_lengths_keep_order(self, http_client):
+        """Length bucketing doesn't reorder results"""
+        long_text = TEST_TEXTS["sadness"][0] + " " + "It has been a long week. " * 30
+        texts = ["Yay!", long_text, TEST_TEXTS["anger"][0], "Ugh.", long_text]
+        
+        async with http_client.post(
+            f"{BASE_URL}/emotion/detect/batch",
+            json={"texts": texts}
+        ) as resp:
+            assert resp.status == 200
+            results = (await resp.json())["results"]
+        
+        for text, result in zip(texts, results):
+            async with http_client.post(
+                f"{BASE_URL}/emotion/detect",
+                json={"text": text}
+            ) as resp:
+                single = await resp.json()
+                assert result["emotion"] == single["emotion"]
+                assert abs(result["confidence"] - single["confidence"]) < 1e-3
+    
+    @pytest.mark.asyncio
+    async def test_batch_empty_items(self, http_client):
+        """Empty texts inside a batch are neutral"""
+        async with http_client.post(
+            f"{BASE_URL}/emotion/detect/batch",
+            json={"texts": ["", "I am so happy today!", "   "]}
+        ) as resp:
+            assert resp.status == 200
+            data = await resp.json()
+            assert [r["emotion"] for r in data["results"]] == ["neutral", "joy", "neutral"]
+    
+    @pytest.mark.asyncio
+    async def test_batch_empty_list(self, http_client):
+        """An empty batch returns no results"""
+        async with http_client.post(
+            f"{BASE_URL}/emotion/detect/batch",
+            json={"texts": []}
+        ) as resp:
+            assert resp.status == 200
+            data = await resp.json()
+            assert data["results"] == []
+    
+    @pytest.mark.asyncio
+    async def test_batch_too_many_texts(self, http_client):
+        """Oversized batches are rejected"""
+        async with http_client.post(
+            f"{BASE_URL}/emotion/detect/batch",
+            json={"texts": ["hello"] * 10000}
+        ) as resp:
+            assert resp.status == 400
+
+# Streaming Emotion Detection Tests
+class TestEmotionStream:
+    """Test suite for the streaming emotion WebSocket"""
+    
+    @pytest.mark.asyncio
+    async def test_stream_emits_per_sentence(self, http_client):
+        """Each completed sentence gets its own ordered emotion event"""
+        reply = "I am so happy today! I am furious right now! I feel so sad about this"
+        
+        async with http_client.ws_connect(f"{BASE_URL}/emotion/stream") as ws:
+            # Stream a few characters at a time like an LLM would
+            for i in range(0, len(reply), 4):
+                await ws.send_json({"type": "token", "text": reply[i:i + 4]})
+            await ws.send_json({"type": "flush"})
+            
+            events = []
+            while True:
+                message = await ws.receive_json(timeout=10)
+                if message["type"] == "flushed":
+                    break
+                events.append(message)
+        
+        assert [e["type"] for e in events] == ["emotion"] * 3
+        assert [e["index"] for e in events] == [0, 1, 2]
+        assert [e["emotion"] for e in events] == ["joy", "anger", "sadness"]
+    
+    @pytest.mark.asyncio
+    async def test_stream_invalid_message(self, http_client):
+        """Invalid messages get an error event without closing the socket"""
+        async with http_client.ws_connect(f"{BASE_URL}/emotion/stream") as ws:
+            await ws.send_str("not json")
+            message = await ws.receive_json(timeout=10)
+            assert message["type"] == "error"
+            
+            await ws.send_json({"type": "flush"})
+            message = await ws.receive_json(timeout=10)
+            assert message["type"] == "flushed"
+
+# Emotion Cache Tests
+class TestEmotionCache:
+    """Test suite for the emotion result cache"""
+    
+    @pytest.mark.asyncio
+    async def test_stats_endpoint(self, http_client):
+        """Verify stats endpoint reports cache counters"""
+        async with http_client.get(f"{BASE_URL}/stats") as resp:
+            assert resp.status == 200
+            data = await resp.json()
+            cache = data["emotion_cache"]
+            for field in ["enabled", "size", "hits", "misses", "hit_rate"]:
+                assert field in cache
+    
+    @pytest.mark.asyncio
+    async def test_repeated_text_hits_cache(self, http_client):
+        """A repeated text is served from the cache with the same result"""
+        async with http_client.get(f"{BASE_URL}/stats") as resp:
+            before = (await resp.json())["emotion_cache"]
+        if not before["enabled"]:
+            pytest.skip("Emotion cache disabled")
+        
+        text = f"Cache test {time.time()}"
+        results = []
+        for _ in range(2):
+            async with http_client.post(
+                f"{BASE_URL}/emotion/detect",
+                json={"text": text}
+            ) as resp:
+                results.append(await resp.json())
+        
+        async with http_client.get(f"{BASE_URL}/stats") as resp:
+            after = (await resp.json())["emotion_cache"]
+        
+        assert results[0]["all_emotions"] == results[1]["all_emotions"]
+        assert after["hits"] >= before["hits"] + 1
+    
+    @pytest.mark.asyncio
+    async def test_store_stats(self, http_client):
+        """The persistent store reports its usage and model version"""
+        async with http_client.get(f"{BASE_URL}/stats") as resp:
+            cache = (await resp.json())["emotion_cache"]
+        if cache["store"] is None:
+            pytest.skip("Emotion store disabled")
+        
+        store = cache["store"]
+        assert store["version"]
+        assert store["bytes"] <= store["max_bytes"]
+        assert cache["store_hits"] <= cache["hits"]
+        # The writer keeps up with the test suite's load
+        assert store["dropped"] == 0
+        assert store["pending"] >= 0
+
+# Admission Control Tests
+class TestAdmission:
+    """Test suite for per-endpoint admission gates"""
+    
+    async def _gates(self, http_client):
+        async with http_client.get(f"{BASE_URL}/stats") as resp:
+            assert resp.status == 200
+            return (await resp.json())["admission"]
+    
+    @pytest.mark.asyncio
+    async def test_stats_admission(self, http_client):
+        """Every endpoint group reports a consistent gate"""
+        gates = await self._gates(http_client)
+        assert set(gates) >= {"emotion", "emotion_batch", "align"}
+        for gate in gates.values():
+            assert gate["max_concurrent"] >= 1
+            assert 0 <= gate["active"] <= gate["max_concurrent"]
+            assert 0 <= gate["queued"] <= gate["max_queue"]
+            assert gate["completed"] <= gate["admitted"]
+            assert set(gate["rejected"]) == {"queue_full", "deadline", "timed_out"}
+    
+    @pytest.mark.asyncio
+    async def test_request_passes_through_gate(self, http_client):
+        """A detect request is admitted and completed by the emotion gate"""
+        before = (await self._gates(http_client))["emotion"]
+        async with http_client.post(
+            f"{BASE_URL}/emotion/detect",
+            json={"text": f"Admission test {time.time()}"}
+        ) as resp:
+            assert resp.status == 200
+        after = (await self._gates(http_client))["emotion"]
+        
+        assert after["admitted"] >= before["admitted"] + 1
+        assert after["completed"] >= before["completed"] + 1
+        assert after["avg_service_ms"] is not None
+    
+    @pytest.mark.asyncio
+    async def test_stream_chunks_pass_through_gate(self, http_client):
+        """Each emotion stream chunk takes a slot on the emotion gate"""
+        before = (await self._gates(http_client))["emotion"]
+        async with http_client.ws_connect(f"{BASE_URL}/emotion/stream") as ws:
+            await ws.send_json({"type": "token", "text": f"First {int(time.time())}. Second one. "})
+            await ws.send_json({"type": "flush"})
+            events = []
+            while True:
+                message = await ws.receive_json(timeout=10)
+                if message["type"] == "flushed":
+                    break
+                events.append(message)
+        after = (await self._gates(http_client))["emotion"]
+        
+        assert [e["type"] for e in events] == ["emotion", "emotion"]
+        assert after["admitted"] >= before["admitted"] + 2
+
+# Request Deadline Tests
+class TestDeadlines:
+    """Test suite for X-Deadline-Ms handling"""
+    
+    @pytest.mark.asyncio
+    async def test_expired_deadline(self, http_client):
+        """A request whose X-Deadline-Ms has already run out gets 504"""
+        async with http_client.get(f"{BASE_URL}/stats") as resp:
+            before = (await resp.json())["requests"]["deadline_exceeded"]
+        
+        async with http_client.post(
+            f"{BASE_URL}/emotion/detect",
+            json={"text": "Deadline test"},
+            headers={"X-Deadline-Ms": "0"}
+        ) as resp:
+            assert resp.status == 504
+            assert (await resp.json())["detail"] == "Deadline exceeded"
+        
+        async with http_client.get(f"{BASE_URL}/stats") as resp:
+            after = (await resp.json())["requests"]["deadline_exceeded"]
+        assert after >= before + 1
+    
+    @pytest.mark.asyncio
+    async def test_generous_deadline(self, http_client):
+        """A request well within its deadline is unaffected"""
+        async with http_client.post(
+            f"{BASE_URL}/emotion/detect",
+            json={"text": "Plenty of time"},
+            headers={"X-Deadline-Ms": "30000"}
+        ) as resp:
+            assert resp.status == 200
+            data = await resp.json()
+            assert data["emotion"] in TEST_TEXTS
+            assert 0.0 <= data["confidence"] <= 1.0
+    
+    @pytest.mark.asyncio
+    async def test_unparseable_deadline_is_ignored(self, http_client):
+        """A malformed X-Deadline-Ms is treated as no deadline"""
+        async with http_client.post(
+            f"{BASE_URL}/emotion/detect",
+            json={"text": "Whenever"},
+            headers={"X-Deadline-Ms": "soon"}
+        ) as resp:
+            assert resp.status == 200
+
+# Metrics Tests
+class TestMetrics:
+    """Test suite for the Prometheus /metrics endpoint"""
+    
+    async def _scrape(self, http_client):
+        async with http_client.get(f"{BASE_URL}/metrics") as resp:
+            assert resp.status == 200
+            assert resp.headers["Content-Type"].startswith("text/plain")
+            return await resp.text()
+    
+    @staticmethod
+    def _sample(body, series):
+        for line in body.splitlines():
+            if line.startswith(series + " "):
+                return float(line.rsplit(" ", 1)[1])
+        return 0.0
+    
+    @pytest.mark.asyncio
+    async def test_metrics_endpoint(self, http_client):
+        """Verify /metrics exposes stage histograms in Prometheus text format"""
+        body = await self._scrape(http_client)
+        assert "# TYPE ml_backend_request_duration_seconds histogram" in body
+        assert "# TYPE ml_backend_stage_duration_seconds histogram" in body
+        assert self._sample(body, "ml_backend_process_resident_memory_bytes") > 0
+    
+    @pytest.mark.asyncio
+    async def test_request_is_counted(self, http_client):
+        """A request shows up in its endpoint's duration histogram"""
+        count = 'ml_backend_request_duration_seconds_count{endpoint="/emotion/detect"}'
+        inf = 'ml_backend_request_duration_seconds_bucket{endpoint="/emotion/detect",le="+Inf"}'
+        before = self._sample(await self._scrape(http_client), count)
+        
+        async with http_client.post(
+            f"{BASE_URL}/emotion/detect",
+            json={"text": f"Metrics test {time.time()}"}
+        ) as resp:
+            assert resp.status == 200
+        
+        body = await self._scrape(http_client)
+        assert self._sample(body, count) >= before + 1
+        # The +Inf bucket holds every observation
+        assert self._sample(body, inf) == self._sample(body, count)
+    
+    @pytest.mark.asyncio
+    async def test_buckets_are_cumulative(self, http_client):
+        """Bucket counts never decrease as le grows"""
+        body = await self._scrape(http_client)
+        prefix = 'ml_backend_request_duration_seconds_bucket{endpoint="/emotion/detect",le="'
+        counts = [
+            float(line.rsplit(" ", 1)[1])
+            for line in body.splitlines()
+            if line.startswith(prefix)
+        ]
+        assert counts
+        assert counts == sorted(counts)
+
+# Server-Timing Tests
+class TestServerTiming:
+    """Test suite for the opt-in Server-Timing breakdown"""
+    
+    async def _timed(self, http_client, text):
+        async with http_client.post(
+            f"{BASE_URL}/emotion/detect",
+            json={"text": text},
+            headers={"X-Server-Timing": "1"}
+        ) as resp:
+            assert resp.status == 200
+            header = resp.headers["Server-Timing"]
+        
+        stages = {}
+        for entry in header.split(","):
+            name, duration = entry.strip().split(";dur=")
+            stages[name] = float(duration)
+        return stages
+    
+    @pytest.mark.asyncio
+    async def test_server_timing(self, http_client):
+        """Requests that opt in get a per-stage Server-Timing header"""
+        stages = await self._timed(http_client, f"Where did the time go? {time.time()}")
+        
+        assert {"queue", "tokenize", "forward", "serialize", "total"} <= set(stages)
+        assert all(ms >= 0 for ms in stages.values())
+        # Every stage happened within the request (header values are rounded)
+        assert all(ms <= stages["total"] + 0.01 for ms in stages.values())
+    
+    @pytest.mark.asyncio
+    async def test_cache_hit_skips_model_stages(self, http_client):
+        """A cached result reports no tokenize or forward time"""
+        async with http_client.get(f"{BASE_URL}/stats") as resp:
+            if not (await resp.json())["emotion_cache"]["enabled"]:
+                pytest.skip("Emotion cache disabled")
+        
+        text = f"Timing cache test {time.time()}"
+        await self._timed(http_client, text)
+        stages = await self._timed(http_client, text)
+        assert "forward" not in stages
+        assert "tokenize" not in stages
+        assert "total" in stages
+    
+    @pytest.mark.asyncio
+    async def test_no_header_without_opt_in(self, http_client):
+        """Requests that don't ask get no Server-Timing header"""
+        async with http_client.post(
+            f"{BASE_URL}/emotion/detect",
+            json={"text": "No timing please"}
+        ) as resp:
+            assert resp.status == 200
+            assert "Server-Timing" not in resp.headers
+
+# Profiling Tests
+class TestProfiling:
+    """Test suite for the admin-only profiling endpoints"""
+    
+    @pytest.mark.asyncio
+    async def test_profile_requires_admin(self, http_client):
+        """Profiling endpoints are hidden or refused without the admin token"""
+        for path in ["/debug/profile?seconds=1", "/debug/profile/torch?seconds=1"]:
+            async with http_client.get(f"{BASE_URL}{path}") as resp:
+                assert resp.status in (403, 404)
+            
+            async with http_client.get(
+                f"{BASE_URL}{path}",
+                headers={"Authorization": "Bearer wrong-token"}
+            ) as resp:
+                assert resp.status in (403, 404)
+                # Refused before anything is recorded
+                assert "X-Profile-Samples" not in resp.headers
+
+# Tokenization Tests
+class TestTokenization:
+    """Test suite for the emotion tokenizer stage"""
+    
+    @pytest.mark.asyncio
+    async def test_stats_token_cache(self, http_client):
+        """A new text is tokenized on the tokenizer pool and counted by its cache"""
+        async with http_client.get(f"{BASE_URL}/stats") as resp:
+            before = await resp.json()
+        
+        async with http_client.post(
+            f"{BASE_URL}/emotion/detect",
+            json={"text": f"Token cache test {time.time()}"}
+        ) as resp:
+            assert resp.status == 200
+        
+        async with http_client.get(f"{BASE_URL}/stats") as resp:
+            after = await resp.json()
+        
+        lookups = [
+            stats["token_cache"]["hits"] + stats["token_cache"]["misses"]
+            for stats in (before, after)
+        ]
+        assert lookups[1] >= lookups[0] + 1
+        assert 0.0 <= after["token_cache"]["hit_rate"] <= 1.0
+        assert (
+            after["executor"]["tokenizer"]["completed"]
+            >= before["executor"]["tokenizer"]["completed"] + 1
+        )
+
 # Phoneme Alignment Tests
 class TestPhonemeAlignment:
     """Test suite for phoneme alignment endpoint"""
@@ -276,6 +748,164 @@ class TestPhonemeAlignment:
                 # Should either succeed with empty result or fail gracefully
                 assert resp.status in [200, 400, 422]
 
+    @pytest.mark.asyncio
+    async def test_stats_aligner_pool(self, http_client):
+        """Verify stats reports the alignment process pool (null when disabled)"""
+        async with http_client.get(f"{BASE_URL}/stats") as resp:
+            data = await resp.json()
+            pool = data["aligner_pool"]
+            if pool is not None:
+                for field in ["processes", "alive", "queued", "queue_limit", "rejected", "restarts"]:
+                    assert field in pool
+                assert pool["alive"] <= pool["processes"]
+
+    @pytest.mark.asyncio
+    async def test_align_upload(self, http_client):
+        """Test alignment from an uploaded WAV file"""
+        if not os.path.exists(TEST_AUDIO_PATH):
+            pytest.skip(f"Missing test asset: {TEST_AUDIO_PATH}")
+        
+        form = aiohttp.FormData()
+        form.add_field("text", "hello world")
+        with open(TEST_AUDIO_PATH, "rb") as f:
+            form.add_field("audio", f.read(), filename="test.wav", content_type="audio/wav")
+        
+        async with http_client.post(f"{BASE_URL}/align/phonemes/upload", data=form) as resp:
+            assert resp.status == 200
+            data = await resp.json()
+            assert "phonemes" in data
+            assert "words" in data
+    
+    @pytest.mark.asyncio
+    async def test_align_repeat_hits_cache(self, http_client):
+        """Re-aligning identical audio and text is served from the cache"""
+        if not os.path.exists(TEST_AUDIO_PATH):
+            pytest.skip(f"Missing test asset: {TEST_AUDIO_PATH}")
+        async with http_client.get(f"{BASE_URL}/stats") as resp:
+            before = (await resp.json())["alignment_cache"]
+        if not before["enabled"]:
+            pytest.skip("Alignment cache disabled")
+        
+        with open(TEST_AUDIO_PATH, "rb") as f:
+            audio = f.read()
+        results = []
+        for _ in range(2):
+            async with http_client.post(
+                f"{BASE_URL}/align/phonemes/raw",
+                params={"text": "hello world"},
+                data=audio,
+                headers={"Content-Type": "audio/wav"}
+            ) as resp:
+                assert resp.status == 200
+                results.append(await resp.json())
+        
+        async with http_client.get(f"{BASE_URL}/stats") as resp:
+            after = (await resp.json())["alignment_cache"]
+        
+        assert results[0]["phonemes"] == results[1]["phonemes"]
+        assert after["hits"] + after["disk_hits"] >= before["hits"] + before["disk_hits"] + 1
+    
+    @pytest.mark.asyncio
+    async def test_align_raw_pcm_without_sample_rate(self, http_client):
+        """Raw PCM without a sample rate is rejected"""
+        async with http_client.post(
+            f"{BASE_URL}/align/phonemes/raw",
+            params={"text": "hello"},
+            data=b"\x00\x00" * 1600,
+            headers={"Content-Type": "application/octet-stream"}
+        ) as resp:
+            assert resp.status in [400, 503]
+    
+    @pytest.mark.asyncio
+    async def test_align_raw_invalid_format(self, http_client):
+        """Nonsensical sample rates and channel counts are client errors"""
+        for headers in [
+            {"X-Sample-Rate": "-16000"},
+            {"X-Sample-Rate": "16000", "X-Channels": "0"},
+            {"Content-Type": "audio/L16; rate=0"},
+        ]:
+            async with http_client.post(
+                f"{BASE_URL}/align/phonemes/raw",
+                params={"text": "hello"},
+                data=b"\x00\x00" * 1600,
+                headers=headers
+            ) as resp:
+                assert resp.status in [400, 503]
+    
+    @pytest.mark.asyncio
+    async def test_align_raw_empty_body(self, http_client):
+        """Empty audio body is rejected"""
+        async with http_client.post(
+            f"{BASE_URL}/align/phonemes/raw",
+            params={"text": "hello"},
+            data=b"",
+            headers={"X-Sample-Rate": "16000"}
+        ) as resp:
+            assert resp.status in [400, 503]
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_first_requests_share_load(self, http_client):
+        """Concurrent alignments share one aligner load and agree on the outcome"""
+        async with http_client.get(f"{BASE_URL}/stats") as resp:
+            before = (await resp.json())["models"]["aligner"]
+        
+        async def align():
+            async with http_client.post(
+                f"{BASE_URL}/align/phonemes/raw",
+                params={"text": "hello"},
+                data=b"\x00\x00" * 16000,
+                headers={"X-Sample-Rate": "16000"}
+            ) as resp:
+                return resp.status
+        
+        statuses = await asyncio.gather(*[align() for _ in range(4)])
+        assert len(set(statuses)) == 1
+        
+        async with http_client.get(f"{BASE_URL}/stats") as resp:
+            after = (await resp.json())["models"]["aligner"]
+        assert after["state"] in {"ready", "failed"}
+        # Four concurrent callers start at most one load between them
+        assert after["loads"] - before["loads"] <= 1
+        if before["state"] == "ready":
+            assert after["loads"] == before["loads"]
+
+# Streaming Phoneme Alignment Tests
+class TestAlignmentStream:
+    """Test suite for the streaming alignment WebSocket"""
+    
+    @pytest.mark.asyncio
+    async def test_stream_requires_start(self, http_client):
+        """Audio before a start message is rejected"""
+        async with http_client.ws_connect(f"{BASE_URL}/align/stream") as ws:
+            await ws.send_bytes(b"\x00\x00" * 160)
+            message = await ws.receive_json(timeout=60)
+            assert message["type"] == "error"
+    
+    @pytest.mark.asyncio
+    async def test_stream_segments_in_order(self, http_client):
+        """Each marked segment gets an ordered event with its offset"""
+        sample_rate = 16000
+        half_second = b"\x00\x00" * (sample_rate // 2)
+        
+        async with http_client.ws_connect(f"{BASE_URL}/align/stream") as ws:
+            await ws.send_json({"type": "start", "sample_rate": sample_rate, "text": "hello world"})
+            await ws.send_bytes(half_second)
+            await ws.send_json({"type": "segment", "text": "hello"})
+            await ws.send_bytes(half_second)
+            await ws.send_json({"type": "end"})
+            
+            events = []
+            while True:
+                message = await ws.receive_json(timeout=60)
+                if message["type"] == "done":
+                    break
+                events.append(message)
+        
+        assert [e["segment"] for e in events] == [0, 1]
+        phoneme_events = [e for e in events if e["type"] == "phonemes"]
+        for event in phoneme_events:
+            assert event["offset_ms"] == event["segment"] * 500.0
+
 # Performance Tests
 class TestPerformance:
     """Performance benchmarking tests"""
@@ -321,6 +951,30 @@ class TestPerformance:
         avg_latency = np.mean(latencies)
         assert avg_latency < 50, f"Health check too slow: {avg_latency:.2f}ms"
     
+    @pytest.mark.asyncio
+    async def test_health_fast_during_alignment(self, http_client):
+        """Verify health check isn't blocked by an in-flight alignment"""
+        if not os.path.exists(TEST_AUDIO_PATH):
+            pytest.skip(f"Missing test asset: {TEST_AUDIO_PATH}")
+        
+        async def align():
+            async with http_client.post(
+                f"{BASE_URL}/align/phonemes",
+                json={"text": "hello world", "audio_path": os.path.abspath(TEST_AUDIO_PATH)}
+            ) as resp:
+                return resp.status
+        
+        align_task = asyncio.create_task(align())
+        await asyncio.sleep(0.01)
+        
+        start = time.time()
+        async with http_client.get(f"{BASE_URL}/health") as resp:
+            assert resp.status == 200
+        latency = (time.time() - start) * 1000
+        
+        await align_task
+        assert latency < 50, f"Health check blocked by alignment: {latency:.2f}ms"
+    
     @pytest.mark.asyncio
     async def test_concurrent_requests(self, http_client):
         """Test handling of concurrent requests"""
@@ -339,6 +993,36 @@ class TestPerformance:
         assert all(status == 200 for status in results), \
             f"Some requests failed: {results}"
 
+# Micro-batching Tests
+class TestBatching:
+    """Test that batched requests each get their own result"""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_results_not_mixed(self, http_client):
+        """Concurrent requests with different emotions get their own answer"""
+        texts = {
+            "joy": TEST_TEXTS["joy"][0],
+            "anger": TEST_TEXTS["anger"][0],
+            "sadness": TEST_TEXTS["sadness"][0],
+            "fear": TEST_TEXTS["fear"][0],
+        }
+        
+        async def detect(text):
+            async with http_client.post(
+                f"{BASE_URL}/emotion/detect",
+                json={"text": text}
+            ) as resp:
+                assert resp.status == 200
+                return await resp.json()
+        
+        # Repeat so requests overlap inside one batching window
+        labels = list(texts.keys()) * 4
+        results = await asyncio.gather(*[detect(texts[label]) for label in labels])
+        
+        for label, data in zip(labels, results):
+            assert data["emotion"] == label, \
+                f"Expected {label}, got {data['emotion']}"
+
 # Resource Monitoring Tests
 class TestResourceUsage:
     """Test resource consumption"""
@@ -0,0 +1,106 @@
+"""
+Unit tests for in-memory audio decoding (no service needed)
+"""
+
+import io
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("torchaudio")
+sf = pytest.importorskip("soundfile")
+
+from audio_io import AudioDecodeError, decode_audio_bytes, parse_content_type
+
+RATE = 16000
+
+
+def tone(seconds=0.1, rate=RATE):
+    t = np.arange(int(seconds * rate)) / rate
+    return (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+
+def to_s16(samples, byteorder="<"):
+    return (samples * 32767).astype(f"{byteorder}i2").tobytes()
+
+
+class TestParseContentType:
+    """Content-Type parsing for raw PCM parameters"""
+
+    def test_params_are_lowercased_keys(self):
+        mime, params = parse_content_type("audio/L16; Rate=24000; channels=2")
+        assert mime == "audio/l16"
+        assert params == {"rate": "24000", "channels": "2"}
+
+    def test_missing(self):
+        assert parse_content_type(None) == ("", {})
+
+
+class TestDecodeAudioBytes:
+    """Containers, raw PCM byte order and format validation"""
+
+    def test_wav_container(self):
+        buf = io.BytesIO()
+        sf.write(buf, tone(), RATE, format="WAV", subtype="PCM_16")
+        wav = decode_audio_bytes(buf.getvalue())
+        assert wav.shape == (1, int(0.1 * RATE))
+        np.testing.assert_allclose(wav[0].numpy(), tone(), atol=1e-3)
+
+    def test_raw_s16_is_little_endian(self):
+        wav = decode_audio_bytes(to_s16(tone()), "application/octet-stream", sample_rate=RATE)
+        np.testing.assert_allclose(wav[0].numpy(), tone(), atol=1e-3)
+
+    def test_l16_is_big_endian(self):
+        wav = decode_audio_bytes(to_s16(tone(), ">"), f"audio/L16; rate={RATE}")
+        np.testing.assert_allclose(wav[0].numpy(), tone(), atol=1e-3)
+
+    def test_l16_explicit_little_endian(self):
+        wav = decode_audio_bytes(
+            to_s16(tone()), f"audio/L16; rate={RATE}; endianness=little-endian"
+        )
+        np.testing.assert_allclose(wav[0].numpy(), tone(), atol=1e-3)
+
+    def test_l16_rejects_float_format(self):
+        with pytest.raises(AudioDecodeError, match="16-bit"):
+            decode_audio_bytes(b"\0" * 8, f"audio/L16; rate={RATE}", sample_format="f32")
+
+    def test_raw_f32_stereo_downmixed(self):
+        samples = tone()
+        stereo = np.stack([samples, samples], axis=1).astype("<f4").tobytes()
+        wav = decode_audio_bytes(stereo, sample_rate=RATE, channels=2, sample_format="f32")
+        np.testing.assert_allclose(wav[0].numpy(), samples, atol=1e-6)
+
+    def test_resampled_to_target_rate(self):
+        wav = decode_audio_bytes(to_s16(tone(rate=24000), "<"), sample_rate=24000)
+        assert wav.shape[1] == int(0.1 * RATE)
+
+    @pytest.mark.parametrize(
+        "kwargs, content_type",
+        [
+            ({}, None),
+            ({"sample_rate": 0}, None),
+            ({"sample_rate": -16000}, None),
+            ({"sample_rate": RATE, "channels": 0}, None),
+            ({"sample_rate": RATE, "channels": -2}, None),
+            ({}, "audio/L16; rate=-8000"),
+            ({}, "audio/L16; rate=abc"),
+            ({}, f"audio/L16; rate={RATE}; endianness=middle"),
+            ({"sample_rate": RATE, "sample_format": "u8"}, None),
+        ],
+    )
+    def test_bad_format_is_a_decode_error(self, kwargs, content_type):
+        with pytest.raises(AudioDecodeError):
+            decode_audio_bytes(b"\0" * 8, content_type, **kwargs)
+
+    def test_partial_frame(self):
+        with pytest.raises(AudioDecodeError, match="frame size"):
+            decode_audio_bytes(b"\0" * 3, sample_rate=RATE)
+
+    def test_empty(self):
+        with pytest.raises(AudioDecodeError, match="Empty"):
+            decode_audio_bytes(b"", sample_rate=RATE)
+
+    def test_corrupt_container(self):
+        with pytest.raises(AudioDecodeError):
+            decode_audio_bytes(b"RIFF" + b"\0" * 40)
@@ -0,0 +1,148 @@
+"""
+Unit tests for the micro-batching scheduler (no service needed)
+"""
+
+import asyncio
+
+import pytest
+
+from batching import MicroBatcher
+
+
+async def echo_upper(items):
+    return [item.upper() for item in items]
+
+
+class TestMicroBatcher:
+    """Batch formation, result routing and failure handling"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_items_share_a_batch(self):
+        batches = []
+
+        async def batch_fn(items):
+            batches.append(list(items))
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=50)
+        batcher.start()
+        try:
+            results = await asyncio.gather(*[batcher.submit(i) for i in range(5)])
+        finally:
+            await batcher.stop()
+
+        assert results == [0, 2, 4, 6, 8]
+        assert batches == [[0, 1, 2, 3, 4]]
+        assert batcher.stats()["largest_batch"] == 5
+
+    @pytest.mark.asyncio
+    async def test_full_batch_dispatches_without_waiting(self):
+        batcher = MicroBatcher(echo_upper, max_batch_size=2, max_wait_ms=10_000)
+        batcher.start()
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(batcher.submit("a"), batcher.submit("b")), timeout=1
+            )
+        finally:
+            await batcher.stop()
+
+        assert results == ["A", "B"]
+
+    @pytest.mark.asyncio
+    async def test_batches_split_at_max_size(self):
+        sizes = []
+
+        async def batch_fn(items):
+            sizes.append(len(items))
+            return items
+
+        batcher = MicroBatcher(batch_fn, max_batch_size=3, max_wait_ms=20)
+        batcher.start()
+        try:
+            results = await asyncio.gather(*[batcher.submit(i) for i in range(7)])
+        finally:
+            await batcher.stop()
+
+        assert results == list(range(7))
+        assert sizes == [3, 3, 1]
+
+    @pytest.mark.asyncio
+    async def test_batch_failure_reaches_every_caller(self):
+        async def batch_fn(items):
+            raise ValueError("model exploded")
+
+        batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=20)
+        batcher.start()
+        try:
+            results = await asyncio.gather(
+                batcher.submit(1), batcher.submit(2), return_exceptions=True
+            )
+        finally:
+            await batcher.stop()
+
+        assert all(isinstance(r, ValueError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_wrong_result_count_is_an_error(self):
+        async def batch_fn(items):
+            return items[:-1]
+
+        batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=20)
+        batcher.start()
+        try:
+            with pytest.raises(RuntimeError, match="returned 1 results for 2 items"):
+                await asyncio.gather(batcher.submit(1), batcher.submit(2))
+        finally:
+            await batcher.stop()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_callers_are_dropped(self):
+        seen = []
+        release = asyncio.Event()
+
+        async def batch_fn(items):
+            seen.extend(items)
+            await release.wait()
+            return items
+
+        batcher = MicroBatcher(batch_fn, max_batch_size=1, max_wait_ms=0)
+        batcher.start()
+        try:
+            first = asyncio.ensure_future(batcher.submit("first"))
+            await asyncio.sleep(0.01)
+            gone = asyncio.ensure_future(batcher.submit("gone"))
+            await asyncio.sleep(0.01)
+            gone.cancel()
+            release.set()
+            assert await first == "first"
+            assert await batcher.submit("last") == "last"
+        finally:
+            await batcher.stop()
+
+        assert seen == ["first", "last"]
+        assert batcher.stats()["items_dropped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_submit_requires_start(self):
+        batcher = MicroBatcher(echo_upper)
+        with pytest.raises(RuntimeError, match="not running"):
+            await batcher.submit("x")
+
+    @pytest.mark.asyncio
+    async def test_stop_fails_queued_items(self):
+        release = asyncio.Event()
+
+        async def batch_fn(items):
+            await release.wait()
+            return items
+
+        batcher = MicroBatcher(batch_fn, max_batch_size=1, max_wait_ms=0)
+        batcher.start()
+        running = asyncio.ensure_future(batcher.submit(1))
+        queued = asyncio.ensure_future(batcher.submit(2))
+        await asyncio.sleep(0.01)
+        await batcher.stop()
+
+        for future in (running, queued):
+            with pytest.raises(RuntimeError, match="stopped"):
+                await future
@@ -0,0 +1,271 @@
+"""
+Unit tests for the deadline / disconnect middleware (no service needed)
+"""
+
+import asyncio
+import json
+
+import pytest
+
+import deadlines
+from deadlines import DeadlineMiddleware, remaining
+
+
+class Client:
+    """One HTTP request's receive/send channels, driven by the test"""
+
+    def __init__(self, body_chunks=(b"",), headers=()):
+        self.scope = {"type": "http", "path": "/test", "headers": list(headers)}
+        self.incoming = asyncio.Queue()
+        for i, chunk in enumerate(body_chunks):
+            self.incoming.put_nowait(
+                {"type": "http.request", "body": chunk, "more_body": i < len(body_chunks) - 1}
+            )
+        self.sent = []
+        self.receive_calls = 0
+
+    async def receive(self):
+        self.receive_calls += 1
+        return await self.incoming.get()
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    def disconnect(self):
+        self.incoming.put_nowait({"type": "http.disconnect"})
+
+    @property
+    def status(self):
+        starts = [m for m in self.sent if m["type"] == "http.response.start"]
+        return starts[0]["status"] if starts else None
+
+    @property
+    def body(self):
+        return b"".join(m.get("body", b"") for m in self.sent if m["type"] == "http.response.body")
+
+
+async def respond(send, status=200, body=b"ok"):
+    await send({"type": "http.response.start", "status": status, "headers": []})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise OSError("client disconnected")
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            return body
+
+
+@pytest.fixture(autouse=True)
+def reset_counters():
+    saved = dict(deadlines._counters)
+    for key in deadlines._counters:
+        deadlines._counters[key] = 0
+    yield
+    deadlines._counters.update(saved)
+
+
+class TestDeadlines:
+    """X-Deadline-Ms: 504s, counters and remaining()"""
+
+    @pytest.mark.asyncio
+    async def test_expired_on_arrival_gets_504_without_running(self):
+        ran = []
+
+        async def app(scope, receive, send):
+            ran.append(True)
+
+        client = Client(headers=[(b"x-deadline-ms", b"0")])
+        await DeadlineMiddleware(app)(client.scope, client.receive, client.send)
+
+        assert ran == []
+        assert client.status == 504
+        assert json.loads(client.body) == {"detail": "Deadline exceeded"}
+        assert deadlines.stats() == {"deadline_exceeded": 1, "disconnected": 0}
+
+    @pytest.mark.asyncio
+    async def test_deadline_cancels_slow_handler(self):
+        cancelled = asyncio.Event()
+
+        async def app(scope, receive, send):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            await respond(send)
+
+        client = Client(headers=[(b"x-deadline-ms", b"50")])
+        await asyncio.wait_for(
+            DeadlineMiddleware(app)(client.scope, client.receive, client.send), timeout=2
+        )
+
+        assert cancelled.is_set()
+        assert client.status == 504
+        assert json.loads(client.body)["detail"] == "Deadline exceeded"
+        assert deadlines.stats()["deadline_exceeded"] == 1
+
+    @pytest.mark.asyncio
+    async def test_handler_sees_its_remaining_budget(self):
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(remaining())
+            await respond(send)
+
+        client = Client(headers=[(b"x-deadline-ms", b"5000")])
+        await DeadlineMiddleware(app)(client.scope, client.receive, client.send)
+
+        assert client.status == 200
+        assert 4.0 < seen[0] <= 5.0
+        assert remaining() is None
+
+    @pytest.mark.asyncio
+    async def test_unparseable_deadline_is_ignored(self):
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(remaining())
+            await respond(send)
+
+        client = Client(headers=[(b"x-deadline-ms", b"soon")])
+        await DeadlineMiddleware(app)(client.scope, client.receive, client.send)
+
+        assert seen == [None]
+        assert client.status == 200
+        assert deadlines.stats() == {"deadline_exceeded": 0, "disconnected": 0}
+
+    @pytest.mark.asyncio
+    async def test_started_response_is_allowed_to_finish(self):
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await asyncio.sleep(0.1)
+            await send({"type": "http.response.body", "body": b"late"})
+
+        client = Client(headers=[(b"x-deadline-ms", b"20")])
+        await DeadlineMiddleware(app)(client.scope, client.receive, client.send)
+
+        assert client.status == 200
+        assert client.body == b"late"
+        assert deadlines.stats()["deadline_exceeded"] == 0
+
+
+class TestDisconnect:
+    """A client that goes away cancels the handler's work"""
+
+    @pytest.mark.asyncio
+    async def test_disconnect_before_body_is_read(self):
+        # The handler is stuck (e.g. waiting for admission) before it reads
+        # its body; the middleware must still notice the client leaving
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def app(scope, receive, send):
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            await read_body(receive)
+            await respond(send)
+
+        client = Client(body_chunks=(b"x" * 1000, b"y" * 1000))
+        call = asyncio.ensure_future(
+            DeadlineMiddleware(app)(client.scope, client.receive, client.send)
+        )
+        await started.wait()
+        client.disconnect()
+        await asyncio.wait_for(call, timeout=2)
+
+        assert cancelled.is_set()
+        assert client.sent == []
+        assert deadlines.stats() == {"deadline_exceeded": 0, "disconnected": 1}
+
+    @pytest.mark.asyncio
+    async def test_disconnect_without_body(self):
+        cancelled = asyncio.Event()
+
+        async def app(scope, receive, send):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        client = Client()
+        call = asyncio.ensure_future(
+            DeadlineMiddleware(app)(client.scope, client.receive, client.send)
+        )
+        await asyncio.sleep(0.01)
+        client.disconnect()
+        await asyncio.wait_for(call, timeout=2)
+
+        assert cancelled.is_set()
+        assert deadlines.stats()["disconnected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_disconnect_after_body_is_read(self):
+        cancelled = asyncio.Event()
+
+        async def app(scope, receive, send):
+            assert await read_body(receive) == b"hello"
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        client = Client(body_chunks=(b"hel", b"lo"))
+        call = asyncio.ensure_future(
+            DeadlineMiddleware(app)(client.scope, client.receive, client.send)
+        )
+        await asyncio.sleep(0.01)
+        client.disconnect()
+        await asyncio.wait_for(call, timeout=2)
+
+        assert cancelled.is_set()
+        assert deadlines.stats()["disconnected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_body_reaches_handler_intact(self):
+        chunks = [bytes([i]) * 300 for i in range(10)]
+        received = []
+
+        async def app(scope, receive, send):
+            received.append(await read_body(receive))
+            await respond(send)
+
+        client = Client(body_chunks=chunks)
+        await DeadlineMiddleware(app)(client.scope, client.receive, client.send)
+
+        assert received == [b"".join(chunks)]
+        assert client.status == 200
+
+    @pytest.mark.asyncio
+    async def test_read_ahead_is_bounded(self, monkeypatch):
+        # A handler that hasn't started reading doesn't get its whole body
+        # pulled off the connection
+        monkeypatch.setattr(deadlines, "READ_AHEAD_BYTES", 1000)
+        release = asyncio.Event()
+        received = []
+
+        async def app(scope, receive, send):
+            await release.wait()
+            received.append(await read_body(receive))
+            await respond(send)
+
+        client = Client(body_chunks=[b"z" * 600] * 5)
+        call = asyncio.ensure_future(
+            DeadlineMiddleware(app)(client.scope, client.receive, client.send)
+        )
+        await asyncio.sleep(0.01)
+        assert client.receive_calls == 2
+
+        release.set()
+        await asyncio.wait_for(call, timeout=2)
+        assert received == [b"z" * 3000]
@@ -0,0 +1,34 @@
+"""
+Unit tests for emotion backend selection (no service needed)
+"""
+
+import pytest
+
+from emotion_backends import load_emotion_pipeline, quantization_target
+
+
+@pytest.mark.parametrize("machine", ["arm64", "aarch64", "ARM64"])
+def test_arm_machines_use_arm64_kernels(machine):
+    # Even if the flags read like x86 ones, ARM never gets an x86 preset
+    assert quantization_target(machine, {"avx2", "avx512f"}) == "arm64"
+
+
+def test_vnni_preferred_over_plain_avx512():
+    assert quantization_target("x86_64", {"avx2", "avx512f", "avx512_vnni"}) == "avx512_vnni"
+    # macOS spells it without the underscore
+    assert quantization_target("x86_64", {"avx2", "avx512f", "avx512vnni"}) == "avx512_vnni"
+
+
+def test_avx512_without_vnni():
+    assert quantization_target("AMD64", {"avx2", "avx512f"}) == "avx512"
+
+
+def test_avx2_is_the_fallback():
+    assert quantization_target("x86_64", {"avx2"}) == "avx2"
+    # Flags that couldn't be read (Windows)
+    assert quantization_target("AMD64", set()) == "avx2"
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError, match="Unknown emotion backend"):
+        load_emotion_pipeline("tensorrt", "some/model", "cpu")
@@ -0,0 +1,326 @@
+"""
+Unit tests for the persistent emotion store (no service needed)
+"""
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+import emotion_store
+from emotion_cache import EmotionCache
+from emotion_store import EmotionStore
+
+SCORES = [{"label": "joy", "score": 0.9}, {"label": "neutral", "score": 0.1}]
+
+needs_fork = pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "emotion.sqlite3")
+
+
+def run_in_child(body) -> int:
+    """Fork, run body() in the child and return its exit code"""
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            code = 0 if body() else 2
+        except BaseException:
+            import traceback
+
+            traceback.print_exc()
+        finally:
+            sys.stderr.flush()
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+
+class TestEmotionStore:
+    """Reads, writes, versioning and eviction in one process"""
+
+    def test_put_then_get(self, db_path):
+        store = EmotionStore(db_path)
+        store.open("v1")
+        try:
+            assert store.get("hello") is None
+            store.put("hello", SCORES)
+            store.flush()
+            assert store.get("hello") == SCORES
+
+            stats = store.stats()
+            assert stats["hits"] == 1
+            assert stats["misses"] == 1
+            assert stats["writes"] == 1
+            assert stats["entries"] == 1
+            assert stats["dropped"] == 0
+        finally:
+            store.close()
+
+    def test_survives_reopen(self, db_path):
+        store = EmotionStore(db_path)
+        store.open("v1")
+        store.put("hello", SCORES)
+        store.close()
+
+        reopened = EmotionStore(db_path)
+        reopened.open("v1")
+        try:
+            assert reopened.get("hello") == SCORES
+            assert reopened.stats()["entries"] == 1
+        finally:
+            reopened.close()
+
+    def test_new_version_drops_entries(self, db_path):
+        store = EmotionStore(db_path)
+        store.open("v1")
+        store.put("hello", SCORES)
+        store.close()
+
+        store.open("v2")
+        try:
+            assert store.get("hello") is None
+            assert store.stats()["entries"] == 0
+            assert store.stats()["version"] == "v2"
+        finally:
+            store.close()
+
+    def test_does_nothing_until_opened(self, db_path):
+        store = EmotionStore(db_path)
+        store.put("hello", SCORES)
+        store.flush()
+        assert store.get("hello") is None
+        assert not store.ready
+        assert not os.path.exists(db_path)
+
+    def test_evicts_least_recently_used(self, db_path):
+        entry = len("text-0") + len('[{"label":"joy","score":0.9},{"label":"neutral","score":0.1}]')
+        store = EmotionStore(db_path, max_bytes=entry * 3)
+        store.open("v1")
+        try:
+            for i in range(3):
+                store.put(f"text-{i}", SCORES)
+                store.flush()
+            # Touch the oldest so the next insert evicts text-1 instead
+            assert store.get("text-0") == SCORES
+            store.flush()
+            store.put("text-3", SCORES)
+            store.flush()
+
+            assert store.get("text-1") is None
+            assert store.get("text-0") == SCORES
+            stats = store.stats()
+            assert stats["evictions"] >= 1
+            assert stats["bytes"] <= stats["max_bytes"]
+        finally:
+            store.close()
+
+    def test_full_write_queue_drops_instead_of_growing(self, db_path, monkeypatch):
+        monkeypatch.setattr(emotion_store, "MAX_PENDING_WRITES", 2)
+        store = EmotionStore(db_path)
+        store.open("v1")
+
+        # Hold the write lock so the writer thread stalls on its first batch
+        blocker = sqlite3.connect(db_path, timeout=10)
+        blocker.execute("BEGIN IMMEDIATE")
+        try:
+            for i in range(20):
+                store.put(f"text-{i}", SCORES)
+            assert store.stats()["pending"] <= 2
+            assert store.stats()["dropped"] > 0
+        finally:
+            blocker.rollback()
+            blocker.close()
+
+        store.flush()
+        stats = store.stats()
+        assert stats["writes"] + stats["dropped"] == 20
+        assert stats["entries"] == stats["writes"]
+        store.close()
+
+
+    def test_get_many_is_one_query(self, db_path):
+        store = EmotionStore(db_path)
+        store.open("v1")
+        try:
+            store.put("a", SCORES)
+            store.put("c", SCORES)
+            store.flush()
+
+            queries = []
+            store._conn.set_trace_callback(queries.append)
+            assert store.get_many(["a", "b", "c", "a"]) == {"a": SCORES, "c": SCORES}
+            store._conn.set_trace_callback(None)
+
+            assert len(queries) == 1
+            stats = store.stats()
+            assert stats["hits"] == 2
+            assert stats["misses"] == 1
+        finally:
+            store.close()
+
+    def test_get_many_splits_long_lookups(self, db_path, monkeypatch):
+        monkeypatch.setattr(emotion_store, "READ_BATCH", 2)
+        store = EmotionStore(db_path)
+        store.open("v1")
+        try:
+            for i in range(5):
+                store.put(f"text-{i}", SCORES)
+            store.flush()
+
+            found = store.get_many([f"text-{i}" for i in range(6)])
+            assert sorted(found) == [f"text-{i}" for i in range(5)]
+        finally:
+            store.close()
+
+    def test_get_many_before_open(self, db_path):
+        assert EmotionStore(db_path).get_many(["hello"]) == {}
+
+
+@needs_fork
+class TestEmotionStoreFork:
+    """The pre-fork server path: close in the parent, reopen in each worker"""
+
+    def test_child_reopens_and_writes(self, db_path):
+        store = EmotionStore(db_path)
+        store.open("v1")
+        store.put("parent", SCORES)
+        store.close()
+
+        def child():
+            assert not store.ready
+            store.ensure_open()
+            assert store.ready
+            assert store.get("parent") == SCORES
+            store.put("child", SCORES)
+            store.close()
+            return True
+
+        assert run_in_child(child) == 0
+
+        reopened = EmotionStore(db_path)
+        reopened.open("v1")
+        try:
+            assert reopened.get("child") == SCORES
+            assert reopened.stats()["entries"] == 2
+        finally:
+            reopened.close()
+
+    def test_several_children_write_to_one_file(self, db_path):
+        store = EmotionStore(db_path)
+        store.open("v1")
+        store.close()
+
+        def child(index):
+            def body():
+                store.ensure_open()
+                for i in range(50):
+                    store.put(f"worker-{index}-{i}", SCORES)
+                store.close()
+                return store.stats()["dropped"] == 0
+
+            return body
+
+        pids = []
+        for index in range(3):
+            pid = os.fork()
+            if pid == 0:
+                code = 1
+                try:
+                    code = 0 if child(index)() else 2
+                finally:
+                    os._exit(code)
+            pids.append(pid)
+        for pid in pids:
+            _, status = os.waitpid(pid, 0)
+            assert os.waitstatus_to_exitcode(status) == 0
+
+        reopened = EmotionStore(db_path)
+        reopened.open("v1")
+        try:
+            assert reopened.stats()["entries"] == 150
+        finally:
+            reopened.close()
+
+    def test_store_left_open_is_inert_in_child(self, db_path):
+        store = EmotionStore(db_path)
+        store.open("v1")
+        store.put("parent", SCORES)
+        store.flush()
+
+        def child():
+            # Inherited connection and writer thread: nothing may use them
+            assert not store.ready
+            assert store.get("parent") is None
+            store.put("child", SCORES)
+            store.flush()
+            store.ensure_open()
+            assert not store.ready
+            assert store.stats()["version"] is None
+            store.close()
+            return True
+
+        try:
+            assert run_in_child(child) == 0
+
+            # The parent's store is unaffected
+            assert store.get("parent") == SCORES
+            store.put("after", SCORES)
+            store.flush()
+            assert store.get("after") == SCORES
+            assert store.get("child") is None
+        finally:
+            store.close()
+
+
+class TestEmotionCacheStore:
+    """Memory lookups never touch the store; misses go to it in one query"""
+
+    @pytest.fixture
+    def cache(self, db_path):
+        store = EmotionStore(db_path)
+        store.open("v1")
+        yield EmotionCache(max_entries=16, store=store)
+        store.close()
+
+    def test_memory_lookup_does_not_read_the_store(self, cache, monkeypatch):
+        cache.store.put("hello", SCORES)
+        cache.store.flush()
+
+        def fail(texts):
+            raise AssertionError("store read")
+
+        monkeypatch.setattr(cache.store, "get_many", fail)
+        assert cache.get_memory("m", "hello") is None
+        # Not counted until the store has been asked as well
+        assert cache.stats()["misses"] == 0
+
+    def test_stored_hits_are_promoted(self, cache):
+        cache.store.put("hello there", SCORES)
+        cache.store.flush()
+
+        assert cache.get_stored("m", ["hello   there", "missing"]) == [SCORES, None]
+        assert cache.get_memory("m", "hello there") == SCORES
+
+        stats = cache.stats()
+        assert stats["store_hits"] == 1
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+
+    def test_get_checks_memory_then_store(self, cache):
+        cache.put("m", "hello", SCORES)
+        cache.store.flush()
+        cache.clear()
+
+        assert cache.get("m", "hello") == SCORES
+        assert cache.get("m", "hello") == SCORES
+        assert cache.stats()["store_hits"] == 1
+
+    def test_without_store_counts_misses(self):
+        cache = EmotionCache(max_entries=16)
+        assert cache.get_stored("m", ["a", "b"]) == [None, None]
+        assert cache.stats()["misses"] == 2
@@ -0,0 +1,132 @@
+"""
+Unit tests for long-form alignment planning (no service needed)
+"""
+
+import numpy as np
+import pytest
+
+from long_align import clamp_span, plan_windows, split_text_units
+
+RATE = 16000
+WINDOW_S = 20.0
+PAD_S = 0.2
+
+
+def speech(seconds, words, seed=0):
+    """Noise bursts for each word with short pauses between them"""
+    rng = np.random.default_rng(seed)
+    samples = np.zeros(int(seconds * RATE), dtype=np.float32)
+    step = len(samples) // max(words, 1)
+    for i in range(words):
+        start = i * step
+        samples[start : start + int(step * 0.7)] = rng.normal(0, 0.2, int(step * 0.7))
+    return samples
+
+
+def check_plan(windows, samples, text):
+    total = len(samples)
+    assert windows[0].start == 0
+    assert windows[-1].end == total
+    for previous, window in zip(windows, windows[1:]):
+        assert window.start == previous.end
+
+    for i, window in enumerate(windows):
+        assert window.index == i
+        assert 0 < window.end - window.start <= WINDOW_S * RATE
+        assert window.slice_end - window.slice_start <= (WINDOW_S + 2 * PAD_S) * RATE
+        assert window.slice_start <= window.start and window.end <= window.slice_end
+
+    # Every word is spoken by exactly one window, in order
+    assert " ".join(w.text for w in windows if w.text).split() == text.split()
+
+
+SENTENCES = " ".join(f"This is sentence number {i} of the story." for i in range(30))
+
+
+class TestPlanWindows:
+    """Window bounds and transcript coverage"""
+
+    def test_short_audio_is_one_window(self):
+        samples = speech(5, 3)
+        windows = plan_windows(samples, RATE, "one two three", WINDOW_S, pad_s=PAD_S)
+        assert len(windows) == 1
+        check_plan(windows, samples, "one two three")
+
+    @pytest.mark.parametrize(
+        "seconds, text",
+        [
+            (50, " ".join(f"word{i}" for i in range(180))),
+            (65, SENTENCES),
+            (65, "One long sentence " * 40),
+            (65, "a single sentence that never ends"),
+            (65, "three words only"),
+            (65, "word"),
+            (121, SENTENCES),
+            (20.5, "just over the window"),
+        ],
+    )
+    def test_no_words_lost_and_windows_bounded(self, seconds, text):
+        samples = speech(seconds, len(text.split()))
+        windows = plan_windows(samples, RATE, text, WINDOW_S, pad_s=PAD_S)
+        assert len(windows) >= 2
+        check_plan(windows, samples, text)
+
+    def test_cuts_land_in_pauses(self):
+        text = " ".join(f"Sentence {i} is here." for i in range(12))
+        samples = speech(60, 12)
+        windows = plan_windows(samples, RATE, text, WINDOW_S, pad_s=PAD_S)
+        check_plan(windows, samples, text)
+        for window in windows[:-1]:
+            assert abs(samples[window.end]) < 1e-6
+
+    def test_single_word_goes_to_the_loudest_slice(self):
+        samples = np.zeros(65 * RATE, dtype=np.float32)
+        samples[40 * RATE : 41 * RATE] = 0.5
+        windows = plan_windows(samples, RATE, "hello", WINDOW_S, pad_s=PAD_S)
+        check_plan(windows, samples, "hello")
+        spoken = [w for w in windows if w.text]
+        assert len(spoken) == 1
+        assert spoken[0].start <= 40 * RATE < spoken[0].end
+
+
+class TestStitching:
+    """Clamping keeps every aligned item, inside its own window"""
+
+    def test_clamp_span(self):
+        assert clamp_span(100, 200, 0, 1000) == (100, 200)
+        assert clamp_span(-50, 30, 0, 1000) == (0, 30)
+        assert clamp_span(990, 1100, 0, 1000) == (990, 1000)
+        assert clamp_span(1050, 1100, 0, 1000) == (1000, 1000)
+        assert clamp_span(-80, -20, 0, 1000) == (0, 0)
+
+    def test_stitched_words_complete_and_ordered(self):
+        text = " ".join(f"word{i}" for i in range(180))
+        samples = speech(50, 180)
+        windows = plan_windows(samples, RATE, text, WINDOW_S, pad_s=PAD_S)
+
+        stitched = []
+        for window in windows:
+            # An aligner that spreads the window's words over its padded slice
+            words = window.text.split()
+            lo, hi = window.slice_start * 1000 / RATE, window.slice_end * 1000 / RATE
+            step = (hi - lo) / max(len(words), 1)
+            for i, word in enumerate(words):
+                start, end = clamp_span(
+                    lo + i * step,
+                    lo + (i + 1) * step,
+                    window.start * 1000 / RATE,
+                    window.end * 1000 / RATE,
+                )
+                stitched.append((word, start, end))
+
+        assert [word for word, _, _ in stitched] == text.split()
+        starts = [start for _, start, _ in stitched]
+        assert starts == sorted(starts)
+
+
+class TestSplitTextUnits:
+    """Sentence and word units for planning"""
+
+    def test_long_sentences_become_words(self):
+        units = split_text_units("Short one. This sentence is far too long to fit.", 20)
+        assert units == ["Short one.", "This", "sentence", "is", "far", "too", "long", "to", "fit."]
@@ -0,0 +1,234 @@
+"""
+Unit tests for the Prometheus metrics registry (no service needed)
+"""
+
+import asyncio
+import builtins
+import threading
+
+import pytest
+
+import metrics
+from metrics import Histogram, MetricsMiddleware, MetricsRegistry, process_stats
+
+
+def sample(lines, series):
+    """Value of one exposition line, or None if the series is absent"""
+    for line in lines:
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+class TestHistogram:
+    """Bucket placement, cumulative rendering, sum and count"""
+
+    def test_buckets_are_cumulative(self):
+        histogram = Histogram("h", "help", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 5.0):
+            histogram.observe(value)
+        lines = histogram.render()
+
+        assert sample(lines, 'h_bucket{le="0.1"}') == 1
+        assert sample(lines, 'h_bucket{le="1"}') == 3
+        assert sample(lines, 'h_bucket{le="+Inf"}') == 4
+        assert sample(lines, "h_count") == 4
+        assert sample(lines, "h_sum") == pytest.approx(6.25)
+
+    def test_upper_bound_is_inclusive(self):
+        # Prometheus buckets count observations <= le
+        histogram = Histogram("h", "help", buckets=(1.0, 2.0))
+        histogram.observe(1.0)
+        lines = histogram.render()
+
+        assert sample(lines, 'h_bucket{le="1"}') == 1
+
+    def test_series_per_label_combination(self):
+        histogram = Histogram("h", "help", labelnames=("stage",), buckets=(1.0,))
+        histogram.observe(0.5, "forward")
+        histogram.observe(0.5, "forward")
+        histogram.observe(3.0, "tokenize")
+        lines = histogram.render()
+
+        assert sample(lines, 'h_count{stage="forward"}') == 2
+        assert sample(lines, 'h_bucket{stage="tokenize",le="1"}') == 0
+        assert sample(lines, 'h_bucket{stage="tokenize",le="+Inf"}') == 1
+
+    def test_header_lines(self):
+        lines = Histogram("h", "Stage latency").render()
+        assert lines == ["# HELP h Stage latency", "# TYPE h histogram"]
+
+    def test_timer_observes_elapsed_seconds(self):
+        histogram = Histogram("h", "help", buckets=(60.0,))
+        with histogram.time():
+            pass
+        lines = histogram.render()
+
+        assert sample(lines, "h_count") == 1
+        assert 0 <= sample(lines, "h_sum") < 60
+
+    def test_concurrent_observations_are_not_lost(self):
+        histogram = Histogram("h", "help", buckets=(1.0,))
+
+        def observe():
+            for _ in range(1000):
+                histogram.observe(0.5)
+
+        threads = [threading.Thread(target=observe) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sample(histogram.render(), "h_count") == 8000
+
+
+class TestRegistry:
+    """Counters, callbacks and the rendered scrape"""
+
+    def test_counter_increments_per_label(self):
+        registry = MetricsRegistry("ns")
+        requests = registry.counter("requests_total", "Requests", ("endpoint", "status"))
+        requests.inc("/emotion/detect", "200")
+        requests.inc("/emotion/detect", "200")
+        requests.inc("/emotion/detect", "503", amount=3)
+        lines = registry.render().splitlines()
+
+        assert "# TYPE ns_requests_total counter" in lines
+        assert sample(lines, 'ns_requests_total{endpoint="/emotion/detect",status="200"}') == 2
+        assert sample(lines, 'ns_requests_total{endpoint="/emotion/detect",status="503"}') == 3
+
+    def test_callbacks_are_read_at_scrape_time(self):
+        registry = MetricsRegistry("ns")
+        value = {"queued": 1}
+        registry.gauge_callback(
+            "queued", "Queued jobs", ("pool",), lambda: [(("emotion",), value["queued"])]
+        )
+
+        assert sample(registry.render().splitlines(), 'ns_queued{pool="emotion"}') == 1
+        value["queued"] = 4
+        assert sample(registry.render().splitlines(), 'ns_queued{pool="emotion"}') == 4
+
+    def test_none_values_are_skipped(self):
+        registry = MetricsRegistry("ns")
+        registry.gauge_callback("rss", "RSS", (), lambda: [((), None)])
+        assert sample(registry.render().splitlines(), "ns_rss") is None
+
+    def test_broken_collector_does_not_break_the_scrape(self):
+        registry = MetricsRegistry("ns")
+
+        def broken():
+            raise RuntimeError("boom")
+
+        registry.gauge_callback("broken", "Broken", (), broken)
+        registry.counter("ok_total", "Fine").inc()
+        body = registry.render()
+
+        assert "# ns_broken: collection failed: boom" in body
+        assert sample(body.splitlines(), "ns_ok_total") == 1
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry("ns")
+        registry.counter("c", "help", ("path",)).inc('a"b\\c\nd')
+        assert 'ns_c{path="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+
+class TestMiddleware:
+    """Request duration by route template and in-flight tracking"""
+
+    @pytest.mark.asyncio
+    async def test_request_is_observed_by_route(self):
+        registry = MetricsRegistry("ns")
+        duration = registry.histogram("request_duration_seconds", "Duration", ("endpoint",))
+        requests = registry.counter("requests_total", "Requests", ("endpoint", "status"))
+        in_flight = {}
+        seen_in_flight = []
+
+        class Route:
+            path = "/items/{id}"
+
+        async def app(scope, receive, send):
+            scope["route"] = Route()
+            seen_in_flight.append(dict(in_flight))
+            await send({"type": "http.response.start", "status": 201, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def send(message):
+            pass
+
+        middleware = MetricsMiddleware(app, duration, requests, in_flight)
+        await middleware({"type": "http", "path": "/items/7"}, None, send)
+        lines = registry.render().splitlines()
+
+        assert seen_in_flight == [{"/items/7": 1}]
+        assert in_flight == {}
+        assert sample(lines, 'ns_request_duration_seconds_count{endpoint="/items/{id}"}') == 1
+        assert sample(lines, 'ns_requests_total{endpoint="/items/{id}",status="201"}') == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_request_counts_as_500(self):
+        registry = MetricsRegistry("ns")
+        duration = registry.histogram("request_duration_seconds", "Duration", ("endpoint",))
+        requests = registry.counter("requests_total", "Requests", ("endpoint", "status"))
+
+        async def app(scope, receive, send):
+            await asyncio.sleep(0)
+            raise RuntimeError("boom")
+
+        middleware = MetricsMiddleware(app, duration, requests, {})
+        with pytest.raises(RuntimeError):
+            await middleware({"type": "http", "path": "/nope"}, None, None)
+
+        lines = registry.render().splitlines()
+        assert sample(lines, 'ns_requests_total{endpoint="unmatched",status="500"}') == 1
+
+
+@pytest.fixture
+def no_proc(monkeypatch):
+    """/proc/self/status missing, as on macOS and Windows"""
+    real_open = builtins.open
+
+    def fake_open(path, *args, **kwargs):
+        if path == "/proc/self/status":
+            raise FileNotFoundError(path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", fake_open)
+
+
+class TestProcessStats:
+    """RSS and CPU time with or without /proc and the resource module"""
+
+    def test_reports_this_process(self):
+        stats = process_stats()
+        assert stats["rss_bytes"] > 0
+        assert stats["cpu_seconds"] > 0
+        assert stats["python_threads"] >= 1
+
+    def test_without_resource_module(self, monkeypatch, no_proc):
+        pytest.importorskip("psutil")
+        # Windows: no resource module, psutil gives current RSS and CPU time
+        monkeypatch.setattr(metrics, "resource", None)
+
+        stats = process_stats()
+        assert stats["rss_bytes"] > 0
+        assert stats["os_threads"] >= 1
+        assert stats["cpu_seconds"] > 0
+
+    def test_without_psutil_or_proc(self, monkeypatch, no_proc):
+        if metrics.resource is None:
+            pytest.skip("resource module not available")
+        monkeypatch.setattr(metrics, "psutil", None)
+
+        stats = process_stats()
+        assert stats["rss_bytes"] > 0
+        assert stats["os_threads"] is None
+        assert stats["cpu_seconds"] > 0
+
+    def test_without_either_reports_nothing(self, monkeypatch, no_proc):
+        monkeypatch.setattr(metrics, "resource", None)
+        monkeypatch.setattr(metrics, "psutil", None)
+
+        stats = process_stats()
+        assert stats["rss_bytes"] is None
+        assert stats["cpu_seconds"] is None
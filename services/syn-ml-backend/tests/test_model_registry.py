@@ -0,0 +1,132 @@
+"""
+Unit tests for the single-flight model registry (no service needed)
+"""
+
+import asyncio
+
+import pytest
+
+from model_registry import FAILED, READY, UNLOADED, ModelRegistry, ModelUnavailable
+
+
+class CountingLoader:
+    """A loader that counts calls and can be made to fail or block"""
+
+    def __init__(self, fail_times=0):
+        self.calls = 0
+        self.fail_times = fail_times
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.calls <= self.fail_times:
+            raise RuntimeError("out of memory")
+        return f"model-{self.calls}"
+
+
+class TestModelRegistry:
+    """Single-flight loading, failure backoff and unloading"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_load(self):
+        loader = CountingLoader()
+        loader.release.clear()
+        registry = ModelRegistry()
+        registry.register("emotion", loader)
+
+        callers = [asyncio.ensure_future(registry.get("emotion")) for _ in range(8)]
+        await asyncio.sleep(0.01)
+        assert registry.state("emotion") == "loading"
+        loader.release.set()
+
+        assert await asyncio.gather(*callers) == ["model-1"] * 8
+        assert loader.calls == 1
+        assert registry.stats()["emotion"]["loads"] == 1
+
+        # Ready models are returned without loading again
+        assert await registry.get("emotion") == "model-1"
+        assert loader.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_load_backs_off(self):
+        loader = CountingLoader(fail_times=1)
+        registry = ModelRegistry(backoff_base_s=60)
+        registry.register("aligner", loader)
+
+        with pytest.raises(RuntimeError, match="out of memory"):
+            await registry.get("aligner")
+        assert registry.state("aligner") == FAILED
+
+        with pytest.raises(ModelUnavailable) as excinfo:
+            await registry.get("aligner")
+        assert 0 < excinfo.value.retry_after <= 60
+        assert loader.calls == 1
+
+        stats = registry.stats()["aligner"]
+        assert stats["failures"] == 1
+        assert stats["error"] == "out of memory"
+        assert stats["retry_in_s"] > 0
+
+    @pytest.mark.asyncio
+    async def test_retry_after_backoff_expires(self):
+        loader = CountingLoader(fail_times=1)
+        registry = ModelRegistry(backoff_base_s=0.05)
+        registry.register("aligner", loader)
+
+        with pytest.raises(RuntimeError):
+            await registry.get("aligner")
+        await asyncio.sleep(0.06)
+
+        assert await registry.get("aligner") == "model-2"
+        assert registry.state("aligner") == READY
+        assert registry.stats()["aligner"]["failures"] == 0
+
+    @pytest.mark.asyncio
+    async def test_backoff_doubles_up_to_max(self):
+        registry = ModelRegistry(backoff_base_s=10, backoff_max_s=25)
+        registry.register("aligner", CountingLoader(fail_times=10))
+
+        delays = []
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                await registry.get("aligner")
+            delays.append(registry.stats()["aligner"]["retry_in_s"])
+            # Skip the wait instead of sleeping through it
+            registry._slots["aligner"].retry_at = 0
+
+        assert [round(d) for d in delays] == [10, 20, 25]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_the_load(self):
+        loader = CountingLoader()
+        loader.release.clear()
+        registry = ModelRegistry()
+        registry.register("emotion", loader)
+
+        impatient = asyncio.ensure_future(registry.get("emotion"))
+        patient = asyncio.ensure_future(registry.get("emotion"))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        loader.release.set()
+
+        assert await patient == "model-1"
+        assert loader.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_unload_and_set_ready(self):
+        loader = CountingLoader()
+        registry = ModelRegistry()
+        registry.register("emotion", loader)
+
+        registry.set_ready("emotion", "preloaded")
+        assert registry.peek("emotion") == "preloaded"
+        assert await registry.get("emotion") == "preloaded"
+        assert loader.calls == 0
+
+        registry.unload("emotion")
+        assert registry.state("emotion") == UNLOADED
+        assert registry.peek("emotion") is None
+        assert await registry.get("emotion") == "model-1"
+        assert registry.states() == {"emotion": READY}
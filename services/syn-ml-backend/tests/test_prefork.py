@@ -0,0 +1,91 @@
+"""
+Unit tests for the pre-fork parent's model preload (no service or models needed)
+"""
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("uvicorn")
+
+import main
+import prefork
+from model_registry import READY
+
+
+class Bound(Exception):
+    """Raised in place of binding the socket, once the parent has preloaded"""
+
+
+@pytest.fixture
+def parent(monkeypatch):
+    """A CPU-only parent with stand-in loaders and a clean registry"""
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+    monkeypatch.setattr(main, "DEVICE", None)
+    monkeypatch.setattr(main, "preforked_aligner", None)
+    monkeypatch.setattr(main, "ALIGNER_STARTUP", "background")
+    monkeypatch.setattr(main, "ALIGNER_PROCESSES", 0)
+    monkeypatch.setattr(main, "_load_aligner", lambda: "aligner")
+    monkeypatch.setattr(main, "model_load_times_ms", {})
+    yield main
+    main.model_registry.unload("emotion")
+
+
+def fail_to_load():
+    raise OSError("model download failed")
+
+
+class TestPreload:
+    """What the parent loads before forking, and what a failure leaves"""
+
+    def test_loads_models_for_the_workers(self, parent, monkeypatch):
+        monkeypatch.setattr(main, "_build_emotion_model", lambda: "emotion")
+
+        assert main.preload_models() is True
+        assert main.model_registry.peek("emotion") == "emotion"
+        # Warmed up by each worker after the fork, not published here
+        assert main.preforked_aligner == "aligner"
+        assert main.model_registry.state("aligner") != READY
+
+    def test_emotion_failure_is_logged_not_raised(self, parent, monkeypatch, caplog):
+        monkeypatch.setattr(main, "_build_emotion_model", fail_to_load)
+
+        assert main.preload_models() is True
+        assert main.model_registry.state("emotion") != READY
+        assert "emotion" not in main.model_load_times_ms
+        assert "model download failed" in caplog.text
+        # The aligner preload still happens
+        assert main.preforked_aligner == "aligner"
+
+    def test_lazy_aligner_is_left_to_the_workers(self, parent, monkeypatch):
+        monkeypatch.setattr(main, "_build_emotion_model", lambda: "emotion")
+        monkeypatch.setattr(main, "ALIGNER_STARTUP", "lazy")
+
+        main.preload_models()
+        assert main.preforked_aligner is None
+
+    def test_nothing_is_loaded_with_cuda(self, parent, monkeypatch):
+        monkeypatch.setattr(torch.cuda, "is_available", lambda: True)
+        monkeypatch.setattr(main, "_build_emotion_model", fail_to_load)
+
+        assert main.preload_models() is False
+
+
+class TestServe:
+    """The parent keeps going to the fork when a model fails to preload"""
+
+    def test_emotion_failure_does_not_stop_the_server(self, parent, monkeypatch):
+        monkeypatch.setattr(main, "_build_emotion_model", fail_to_load)
+
+        def bind_socket(host, port):
+            raise Bound()
+
+        monkeypatch.setattr(prefork, "bind_socket", bind_socket)
+        with pytest.raises(Bound):
+            prefork.serve("127.0.0.1", 0, workers=2)
+
+    def test_worker_cores_split_the_cores(self):
+        cores = list(range(8))
+        slices = [prefork.worker_cores(i, 4, cores) for i in range(4)]
+        assert slices == [[0, 1], [2, 3], [4, 5], [6, 7]]
+        # More workers than cores share them
+        assert prefork.worker_cores(3, 4, [0, 1]) == [1]
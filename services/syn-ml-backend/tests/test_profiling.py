@@ -0,0 +1,106 @@
+"""
+Unit tests for the torch profiler wrapper (no service needed)
+"""
+
+import asyncio
+import time
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from executors import InferenceExecutor
+from profiling import ProfilerBusy, TorchProfile, annotate, profile_job
+
+
+def work():
+    with annotate("forward"):
+        return (torch.ones(64, 64) @ torch.ones(64, 64)).sum().item()
+
+
+@pytest.fixture
+def executor():
+    executor = InferenceExecutor({"emotion": 1, "aligner": 2}, around_job=profile_job)
+    yield executor
+    executor.shutdown()
+
+
+class TestTorchProfile:
+    """Per-job traces from the worker pools, merged into one"""
+
+    def test_annotate_is_free_when_not_recording(self):
+        with annotate("forward") as ctx:
+            assert ctx is None
+
+    def test_job_hook_is_a_no_op_outside_a_capture(self):
+        with profile_job("emotion") as ctx:
+            assert ctx is None
+
+    @pytest.mark.asyncio
+    async def test_records_worker_threads(self, executor):
+        async def load():
+            await asyncio.sleep(0.05)
+            await asyncio.gather(
+                executor.run("emotion", work),
+                executor.run("aligner", work),
+                executor.run("aligner", work),
+            )
+
+        trace, _ = await asyncio.gather(TorchProfile().record(0.3), load())
+
+        events = trace["traceEvents"]
+        threads = {e["args"]["name"] for e in events if e["ph"] == "M"}
+        assert "emotion-inference_0" in threads
+        assert any(name.startswith("aligner-inference_") for name in threads)
+        assert trace["otherData"]["jobs"] == 3
+
+        ranges = [e for e in events if e["ph"] == "X"]
+        assert {e["cat"] for e in ranges if e["name"] == "forward"} == {"emotion", "aligner"}
+        # Placed inside the window, after the load started
+        assert all(e["ts"] >= 40_000 for e in ranges)
+
+    @pytest.mark.asyncio
+    async def test_job_running_at_the_end_is_waited_for(self, executor):
+        def slow():
+            time.sleep(0.3)
+            return work()
+
+        async def load():
+            await asyncio.sleep(0.02)
+            await executor.run("aligner", slow)
+
+        trace, _ = await asyncio.gather(TorchProfile().record(0.1), load())
+
+        assert "forward" in {e["name"] for e in trace["traceEvents"]}
+
+    @pytest.mark.asyncio
+    async def test_jobs_outside_the_window_are_not_recorded(self, executor):
+        await TorchProfile().record(0.01)
+        assert await executor.run("emotion", work) == 64 * 64 * 64
+
+        trace, _ = await asyncio.gather(TorchProfile().record(0.05), asyncio.sleep(0))
+        assert trace["otherData"]["jobs"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failing_job_is_recorded_and_raises(self, executor):
+        def fail():
+            work()
+            raise RuntimeError("boom")
+
+        async def load():
+            await asyncio.sleep(0.02)
+            with pytest.raises(RuntimeError, match="boom"):
+                await executor.run("emotion", fail)
+
+        trace, _ = await asyncio.gather(TorchProfile().record(0.1), load())
+        assert trace["otherData"]["jobs"] == 1
+
+    @pytest.mark.asyncio
+    async def test_one_profile_at_a_time(self):
+        first = asyncio.create_task(TorchProfile().record(0.2))
+        await asyncio.sleep(0.05)
+        try:
+            with pytest.raises(ProfilerBusy):
+                await TorchProfile().record(0.01)
+        finally:
+            await first
@@ -0,0 +1,59 @@
+"""
+Unit tests for streamed-text segmentation (no service needed)
+"""
+
+from streaming import SentenceSegmenter
+
+
+def feed(segmenter, text, step=3):
+    """Push text a few characters at a time, like LLM tokens"""
+    chunks = []
+    for i in range(0, len(text), step):
+        chunks.extend(segmenter.push(text[i : i + step]))
+    return chunks
+
+
+class TestSentenceSegmenter:
+    """Sentence, clause and length boundaries"""
+
+    def test_splits_sentences_as_they_complete(self):
+        segmenter = SentenceSegmenter()
+        assert segmenter.push("I love this") == []
+        assert segmenter.push("! Really") == ["I love this!"]
+        assert segmenter.pending == " Really"
+        assert segmenter.flush() == "Really"
+        assert segmenter.flush() is None
+
+    def test_waits_for_whitespace_after_period(self):
+        segmenter = SentenceSegmenter()
+        assert segmenter.push("Pi is 3.") == []
+        assert segmenter.push("14 today. ") == ["Pi is 3.14 today."]
+
+    def test_keeps_punctuation_runs_and_closers(self):
+        segmenter = SentenceSegmenter()
+        chunks = feed(segmenter, 'She said "no way?!" and left... Then ')
+        assert chunks == ['She said "no way?!"', "and left..."]
+
+    def test_clause_split_needs_minimum_length(self):
+        segmenter = SentenceSegmenter(min_clause_chars=24)
+        assert feed(segmenter, "Well, ok ") == []
+        segmenter.reset()
+        chunks = feed(segmenter, "After everything that happened, I forgive you ")
+        assert chunks == ["After everything that happened,"]
+
+    def test_newline_ends_a_chunk(self):
+        segmenter = SentenceSegmenter()
+        assert segmenter.push("\n\nTitle line\nbody") == ["Title line"]
+
+    def test_long_text_cut_at_last_space(self):
+        segmenter = SentenceSegmenter(max_chars=20)
+        chunks = feed(segmenter, "one two three four five six seven")
+        assert chunks[0] == "one two three four"
+        assert all(len(chunk) <= 20 for chunk in chunks)
+
+    def test_no_text_lost(self):
+        text = "Hi there! This is, in fact, a test... Is it? Yes. Trailing words"
+        segmenter = SentenceSegmenter(min_clause_chars=5, max_chars=30)
+        chunks = feed(segmenter, text, step=2)
+        chunks.append(segmenter.flush())
+        assert " ".join(chunks).split() == text.split()
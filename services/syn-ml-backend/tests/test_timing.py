@@ -0,0 +1,171 @@
+"""
+Unit tests for per-request stage timing / Server-Timing (no service needed)
+"""
+
+import asyncio
+import contextvars
+import threading
+
+import pytest
+
+import timing
+from metrics import Histogram
+from timing import ServerTimingMiddleware, Timings
+
+
+def parse(header):
+    """Server-Timing header value -> {stage: ms}"""
+    stages = {}
+    for entry in header.split(","):
+        name, duration = entry.strip().split(";dur=")
+        stages[name] = float(duration)
+    return stages
+
+
+async def call(app, headers=(), always=False):
+    """Run app behind the middleware; returns the response headers sent"""
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "path": "/test", "headers": list(headers)}
+    await ServerTimingMiddleware(app, always=always)(scope, None, send)
+    return dict(sent[0]["headers"])
+
+
+async def respond(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+class TestTimings:
+    """Accumulating stages and formatting the header"""
+
+    def test_header_formats_milliseconds(self):
+        timings = Timings()
+        timings.start_ns = 0
+        timings.add("queue", 410_000)
+        timings.add("forward", 8_930_000)
+        timings.handled_ns = 9_500_000
+        header = timings.header(10_100_000)
+
+        assert header == "queue;dur=0.41, forward;dur=8.93, serialize;dur=0.60, total;dur=10.10"
+
+    def test_repeated_stage_accumulates(self):
+        timings = Timings()
+        timings.start_ns = 0
+        timings.add("queue", 1_000_000)
+        timings.add("queue", 2_000_000)
+
+        assert parse(timings.header(5_000_000)) == {"queue": 3.0, "total": 5.0}
+
+    def test_no_serialize_before_handler_is_done(self):
+        timings = Timings()
+        assert "serialize" not in parse(timings.header(timings.start_ns))
+
+    def test_adds_from_worker_threads(self):
+        timings = Timings()
+
+        def add():
+            for _ in range(1000):
+                timings.add("forward", 1)
+
+        threads = [threading.Thread(target=add) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert timings.stages["forward"] == 8000
+
+
+class TestStages:
+    """record / stage / shared_by against the current request"""
+
+    def test_record_without_request_is_a_no_op(self):
+        assert timing.current.get() is None
+        timing.record("forward", 5)
+
+    def test_stage_records_and_observes(self):
+        timings = Timings()
+        histogram = Histogram("h", "help", ("stage",))
+        token = timing.current.set(timings)
+        try:
+            with timing.stage("tokenize", histogram):
+                pass
+        finally:
+            timing.current.reset(token)
+
+        assert "tokenize" in timings.stages
+        assert any(line.startswith('h_count{stage="tokenize"} 1') for line in histogram.render())
+
+    def test_stage_reaches_worker_threads_through_the_context(self):
+        timings = Timings()
+        token = timing.current.set(timings)
+        try:
+            context = contextvars.copy_context()
+        finally:
+            timing.current.reset(token)
+
+        def work():
+            with timing.stage("forward"):
+                pass
+
+        thread = threading.Thread(target=context.run, args=(work,))
+        thread.start()
+        thread.join()
+
+        assert "forward" in timings.stages
+
+    def test_shared_batch_counts_for_every_request(self):
+        first, second = Timings(), Timings()
+        with timing.shared_by([first, None, second]):
+            timing.record("forward", 7_000_000)
+            # A fan-out isn't one request's timings
+            timing.handler_done()
+
+        assert first.stages == {"forward": 7_000_000}
+        assert second.stages == {"forward": 7_000_000}
+        assert first.handled_ns is None
+        assert timing.current.get() is None
+
+    def test_shared_batch_without_requesters(self):
+        with timing.shared_by([None, None]):
+            assert timing.current.get() is None
+
+
+class TestMiddleware:
+    """Opt-in header handling"""
+
+    @pytest.mark.asyncio
+    async def test_header_when_requested(self):
+        async def app(scope, receive, send):
+            timing.record("forward", 2_000_000)
+            timing.handler_done()
+            await asyncio.sleep(0)
+            await respond(scope, receive, send)
+
+        headers = await call(app, headers=[(b"x-server-timing", b"1")])
+        stages = parse(headers[b"server-timing"].decode())
+
+        assert stages["forward"] == 2.0
+        assert {"serialize", "total"} <= set(stages)
+        assert stages["serialize"] <= stages["total"] + 0.01
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("value", [None, b"0", b"false", b""])
+    async def test_no_header_without_opt_in(self, value):
+        headers = [(b"x-server-timing", value)] if value is not None else []
+        recorded = []
+
+        async def app(scope, receive, send):
+            recorded.append(timing.current.get())
+            await respond(scope, receive, send)
+
+        assert b"server-timing" not in await call(app, headers=headers)
+        assert recorded == [None]
+
+    @pytest.mark.asyncio
+    async def test_always(self):
+        assert b"server-timing" in await call(respond, always=True)
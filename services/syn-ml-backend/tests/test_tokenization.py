@@ -0,0 +1,148 @@
+"""
+Unit tests for the emotion tokenizer stage (no service or model needed)
+"""
+
+import threading
+
+import pytest
+
+from tokenization import EmotionTokenizer, PaddingStats, bucket_indices, length_buckets
+
+
+class CountingTokenizer:
+    """A slow (non-Rust) tokenizer stand-in: one token id per word"""
+
+    is_fast = False
+    pad_token_id = 0
+
+    def __init__(self):
+        self.truncation_side = "right"
+        self.calls = []
+
+    def __call__(self, texts, truncation, max_length, padding):
+        self.calls.append(list(texts))
+        input_ids = []
+        for text in texts:
+            ids = [len(word) for word in text.split()]
+            if truncation and len(ids) > max_length:
+                ids = ids[:max_length] if self.truncation_side == "right" else ids[-max_length:]
+            input_ids.append(ids)
+        return {"input_ids": input_ids}
+
+
+class TestEmotionTokenizer:
+    """Token id caching by text"""
+
+    def test_repeated_text_is_a_cache_hit(self):
+        backend = CountingTokenizer()
+        tokenizer = EmotionTokenizer(backend, max_length=8)
+
+        first = tokenizer.encode(["hello there"])
+        second = tokenizer.encode(["hello there"])
+
+        assert first == second == [[5, 5]]
+        assert backend.calls == [["hello there"]]
+        stats = tokenizer.stats()
+        assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+        assert stats["hit_rate"] == 0.5
+
+    def test_only_misses_are_tokenized(self):
+        backend = CountingTokenizer()
+        tokenizer = EmotionTokenizer(backend, max_length=8)
+        tokenizer.encode(["a b", "c"])
+
+        ids = tokenizer.encode(["c", "dd ee", "a b", "dd ee"])
+
+        assert ids == [[1], [2, 2], [1, 1], [2, 2]]
+        # The duplicate miss in one call is tokenized once
+        assert backend.calls[-1] == ["dd ee"]
+        stats = tokenizer.stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 4
+
+    def test_least_recently_used_text_is_evicted(self):
+        backend = CountingTokenizer()
+        tokenizer = EmotionTokenizer(backend, max_length=8, cache_size=2)
+        tokenizer.encode(["one"])
+        tokenizer.encode(["two"])
+        tokenizer.encode(["one"])  # "two" is now the oldest
+        tokenizer.encode(["three"])
+
+        backend.calls.clear()
+        tokenizer.encode(["one", "three"])
+        assert backend.calls == []
+        tokenizer.encode(["two"])
+        assert backend.calls == [["two"]]
+        assert tokenizer.stats()["size"] == 2
+
+    def test_cache_size_zero_disables_caching(self):
+        backend = CountingTokenizer()
+        tokenizer = EmotionTokenizer(backend, max_length=8, cache_size=0)
+        tokenizer.encode(["same"])
+        tokenizer.encode(["same"])
+
+        assert len(backend.calls) == 2
+        assert tokenizer.stats()["size"] == 0
+
+    def test_truncation_side(self):
+        text = "a bb ccc dddd"
+        assert EmotionTokenizer(CountingTokenizer(), max_length=2).encode([text]) == [[1, 2]]
+        assert EmotionTokenizer(
+            CountingTokenizer(), max_length=2, truncation_side="left"
+        ).encode([text]) == [[3, 4]]
+
+    def test_invalid_truncation_side(self):
+        with pytest.raises(ValueError):
+            EmotionTokenizer(CountingTokenizer(), max_length=8, truncation_side="middle")
+
+    def test_clear(self):
+        backend = CountingTokenizer()
+        tokenizer = EmotionTokenizer(backend, max_length=8)
+        tokenizer.encode(["x"])
+        tokenizer.clear()
+        tokenizer.encode(["x"])
+        assert len(backend.calls) == 2
+
+    def test_concurrent_encodes_agree(self):
+        tokenizer = EmotionTokenizer(CountingTokenizer(), max_length=8)
+        texts = [f"text {i % 10}" for i in range(200)]
+        results = [None] * 4
+
+        def worker(n):
+            results[n] = tokenizer.encode(texts)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert all(result == results[0] for result in results)
+        stats = tokenizer.stats()
+        assert stats["hits"] + stats["misses"] == 800
+        assert stats["size"] == 10
+
+
+class TestBuckets:
+    """Length buckets and padding accounting"""
+
+    def test_length_buckets(self):
+        assert length_buckets(512) == [16, 32, 64, 128, 256, 512]
+        assert length_buckets(100) == [16, 32, 64, 100]
+        assert length_buckets(16) == [16]
+
+    def test_bucket_indices_shortest_first(self):
+        lengths = [40, 3, 17, 12, 600]
+        assert bucket_indices(lengths, [16, 32, 64, 512]) == [[1, 3], [2], [0], [4]]
+
+    def test_padding_stats(self):
+        stats = PaddingStats()
+        assert stats.stats()["padding_efficiency"] is None
+        stats.record([4, 2])
+        stats.record([3])
+
+        result = stats.stats()
+        assert result["forward_passes"] == 2
+        assert result["tokens"] == 9
+        assert result["padded_tokens"] == 11
+        assert result["padding_efficiency"] == pytest.approx(9 / 11)